@@ -1135,8 +1135,8 @@ def batch_process(factory: VideoFactory, scripts_dir: str):
         print(f"错误: 脚本目录不存在: {scripts_dir}")
         sys.exit(1)
 
-    # 创建任务队列
-    queue = TaskQueue(persistence_file="output/task_queue.json")
+    # 创建任务队列（状态变更合并写入，避免每次更新都重写整个文件）
+    queue = TaskQueue(persistence_file="output/task_queue.json", flush_interval=0.2)
 
     # 扫描脚本文件
     script_files = list(scripts_path.glob("*.txt"))
@@ -1192,6 +1192,7 @@ def batch_process(factory: VideoFactory, scripts_dir: str):
         }
     else:
         stats = processor.process_all_pending()
+    queue.close()
 
     print(f"\n批量处理完成!")
     print(f"  总处理: {stats['total_processed']}")
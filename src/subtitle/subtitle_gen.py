@@ -4,14 +4,89 @@
 """
 
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Callable
+from functools import lru_cache
+import logging
+import mmap
+import os
+import re
 import pysrt
 from datetime import timedelta
 
 
+# 过长句子的分隔符优先级：分号 → 逗号/顿号 → 冒号
+_PRIORITY_DELIMS = ['；', '，、,', '：']
+_PRIORITY_TABLES = [
+    str.maketrans({d: delims[0] for d in delims[1:]})
+    for delims in _PRIORITY_DELIMS
+]
+
+# SRT 字幕块：连续的非空行，块之间以空行分隔
+_SRT_BLOCK_RE = re.compile(rb'^[ \t]*\S[^\n]*(?:\n[ \t]*\S[^\n]*)*', re.MULTILINE)
+
+# 字幕块开头的序号行和时间行，之后的内容（可以为空）是字幕文本
+_SRT_HEADER_RE = re.compile(
+    rb'(?:\xef\xbb\xbf)?[ \t]*(\d+)[ \t]*\r?\n'
+    rb'(\d+):(\d\d):(\d\d)[,.](\d{1,3})[ \t]*-->[ \t]*'
+    rb'(\d+):(\d\d):(\d\d)[,.](\d{1,3})[^\n]*(?:\n|\Z)'
+)
+
+
+def _iter_srt(srt_path: str) -> Iterator[Tuple[int, float, float, str]]:
+    """
+    单遍流式解析SRT文件
+
+    通过 mmap 扫描文件，按空行切分字幕块后逐条产出，不构建 pysrt 的中间对象。
+    文本为空的字幕照常产出；缺少序号或时间行的块记录警告后跳过。
+
+    Args:
+        srt_path: SRT文件路径
+
+    Yields:
+        (索引, 开始秒数, 结束秒数, 文本) 元组
+    """
+    with open(srt_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            for block in _SRT_BLOCK_RE.finditer(buf):
+                m = _SRT_HEADER_RE.match(block.group())
+                if m is None:
+                    logging.getLogger(__name__).warning(
+                        "跳过格式错误的字幕块 (%s 第 %d 字节): %r",
+                        srt_path, block.start(), block.group()[:80]
+                    )
+                    continue
+
+                (index, h1, m1, s1, ms1, h2, m2, s2, ms2) = m.groups()
+                start = int(h1) * 3600 + int(m1) * 60 + int(s1) + int(ms1) / 1000.0
+                end = int(h2) * 3600 + int(m2) * 60 + int(s2) + int(ms2) / 1000.0
+                text = block.group()[m.end():].decode('utf-8').replace('\r\n', '\n').strip()
+                yield int(index), start, end, text
+
+
+def _seconds_to_hmsm(seconds: float) -> Tuple[int, int, int, int]:
+    """
+    将秒数拆分为 (时, 分, 秒, 毫秒)
+
+    Args:
+        seconds: 秒数
+
+    Returns:
+        (hours, minutes, seconds, milliseconds) 元组
+    """
+    millis = int((seconds % 1) * 1000)
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return hours, minutes, secs, millis
+
+
 class SubtitleSegment:
     """字幕片段类"""
 
+    __slots__ = ('text', 'start_time', 'end_time', 'index', 'duration')
+
     def __init__(
         self,
         text: str,
@@ -33,10 +108,9 @@ class SubtitleSegment:
         self.end_time = end_time
         self.index = index
 
-    @property
-    def duration(self) -> float:
-        """获取字幕持续时间"""
-        return self.end_time - self.start_time
+        # 字幕片段创建后时间不再修改（调整时间会生成新片段），
+        # 因此在构造时预先计算时长，渲染循环中直接读取
+        self.duration = end_time - start_time
 
     def __repr__(self):
         return f"SubtitleSegment({self.start_time:.2f}s-{self.end_time:.2f}s: '{self.text[:20]}...')"
@@ -55,6 +129,7 @@ class SubtitleGenerator:
         self.config = config
         self.duration_per_char = config.get('duration_per_char', 0.3)
         self.max_chars_per_line = config.get('max_chars_per_line', 25)
+        self._split_lines = self._make_line_splitter(self.max_chars_per_line)
 
     def generate_from_text(
         self,
@@ -206,12 +281,36 @@ class SubtitleGenerator:
         # 分割过长的句子
         result = []
         for sentence in sentences:
-            if len(sentence) > self.max_chars_per_line:
-                # 按逗号或顿号分割
-                sub_sentences = re.split(r'[，、,]', sentence)
-                result.extend([s.strip() for s in sub_sentences if s.strip()])
-            else:
-                result.append(sentence)
+            result.extend(self._split_long_sentence(sentence))
+
+        return result
+
+    def _split_long_sentence(self, sentence: str, level: int = 0) -> List[str]:
+        """
+        按分隔符优先级逐级分割过长的句子
+
+        先尝试优先级最高的分隔符（分号），只有分割后仍超过
+        max_chars_per_line 的片段才继续使用下一级分隔符。
+
+        Args:
+            sentence: 句子
+            level: 当前使用的分隔符优先级
+
+        Returns:
+            分割后的句子列表
+        """
+        if len(sentence) <= self.max_chars_per_line or level >= len(_PRIORITY_DELIMS):
+            return [sentence]
+
+        # 将同组分隔符统一替换为组内第一个分隔符后再分割
+        sep = _PRIORITY_DELIMS[level][0]
+        parts = sentence.translate(_PRIORITY_TABLES[level]).split(sep)
+
+        result = []
+        for part in parts:
+            part = part.strip()
+            if part:
+                result.extend(self._split_long_sentence(part, level + 1))
 
         return result
 
@@ -225,25 +324,49 @@ class SubtitleGenerator:
         Returns:
             文本行列表
         """
-        if len(text) <= self.max_chars_per_line:
-            return [text]
+        return list(self._split_lines(text))
 
-        lines = []
-        words = text.split()
-        current_line = ""
+    @staticmethod
+    def _make_line_splitter(max_chars: int) -> Callable[[str], Tuple[str, ...]]:
+        """
+        生成固定最大字符数的分行函数
 
-        for word in words:
-            if len(current_line) + len(word) + 1 <= self.max_chars_per_line:
-                current_line += word + " "
-            else:
-                if current_line:
-                    lines.append(current_line.strip())
-                current_line = word + " "
+        最大字符数在生成器生命周期内不变，直接固化到闭包中，
+        并按文本缓存分行结果。
 
-        if current_line:
-            lines.append(current_line.strip())
+        Args:
+            max_chars: 每行最大字符数
 
-        return lines
+        Returns:
+            分行函数，返回文本行元组
+        """
+        @lru_cache(maxsize=1024)
+        def split_lines(text: str) -> Tuple[str, ...]:
+            if len(text) <= max_chars:
+                return (text,)
+
+            lines = []
+            current = []
+            # 当前行长度（每个单词计入一个尾随空格）
+            current_len = 0
+
+            for word in text.split():
+                word_len = len(word) + 1
+                if current_len + word_len <= max_chars:
+                    current.append(word)
+                    current_len += word_len
+                else:
+                    if current:
+                        lines.append(" ".join(current))
+                    current = [word]
+                    current_len = word_len
+
+            if current:
+                lines.append(" ".join(current))
+
+            return tuple(lines)
+
+        return split_lines
 
     def save_to_srt(
         self,
@@ -263,20 +386,20 @@ class SubtitleGenerator:
         output_path = Path(output_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
 
-        subs = pysrt.SubRipFile()
-
-        for segment in segments:
-            start = self._seconds_to_timedelta(segment.start_time)
-            end = self._seconds_to_timedelta(segment.end_time)
+        SubRipTime = pysrt.SubRipTime
+        SubRipItem = pysrt.SubRipItem
 
-            item = pysrt.SubRipItem(
+        # 单遍构建所有字幕条目，一次性加入文件
+        subs = pysrt.SubRipFile()
+        subs.extend([
+            SubRipItem(
                 index=segment.index,
-                start=start,
-                end=end,
+                start=SubRipTime(*_seconds_to_hmsm(segment.start_time)),
+                end=SubRipTime(*_seconds_to_hmsm(segment.end_time)),
                 text=segment.text
             )
-
-            subs.append(item)
+            for segment in segments
+        ])
 
         subs.save(str(output_path), encoding='utf-8')
 
@@ -292,20 +415,10 @@ class SubtitleGenerator:
         Returns:
             SubtitleSegment列表
         """
-        subs = pysrt.open(srt_path, encoding='utf-8')
-
-        segments = []
-
-        for item in subs:
-            segment = SubtitleSegment(
-                text=item.text,
-                start_time=self._timedelta_to_seconds(item.start),
-                end_time=self._timedelta_to_seconds(item.end),
-                index=item.index
-            )
-            segments.append(segment)
-
-        return segments
+        return [
+            SubtitleSegment(text=text, start_time=start, end_time=end, index=index)
+            for index, start, end, text in _iter_srt(srt_path)
+        ]
 
     def _seconds_to_timedelta(self, seconds: float) -> pysrt.SubRipTime:
         """
@@ -317,12 +430,7 @@ class SubtitleGenerator:
         Returns:
             SubRipTime对象
         """
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        millis = int((seconds % 1) * 1000)
-
-        return pysrt.SubRipTime(hours=hours, minutes=minutes, seconds=secs, milliseconds=millis)
+        return pysrt.SubRipTime(*_seconds_to_hmsm(seconds))
 
     def _timedelta_to_seconds(self, srt_time: pysrt.SubRipTime) -> float:
         """
@@ -388,33 +496,32 @@ class SubtitleGenerator:
             return []
 
         merged = []
-        current_text = segments[0].text
+        # 用列表累积待合并文本，避免字符串反复拼接
+        buf = [segments[0].text]
         current_start = segments[0].start_time
         current_end = segments[0].end_time
 
-        for i in range(1, len(segments)):
-            seg = segments[i]
-            potential_duration = seg.end_time - current_start
-
-            if potential_duration <= max_duration:
+        for seg in segments[1:]:
+            if seg.end_time - current_start <= max_duration:
                 # 合并
-                current_text += " " + seg.text
-                current_end = seg.end_time
-            else:
-                # 保存当前片段，开始新片段
-                merged.append(SubtitleSegment(
-                    text=current_text,
-                    start_time=current_start,
-                    end_time=current_end,
-                    index=len(merged) + 1
-                ))
-                current_text = seg.text
-                current_start = seg.start_time
+                buf.append(seg.text)
                 current_end = seg.end_time
+                continue
+
+            # 保存当前片段，开始新片段
+            merged.append(SubtitleSegment(
+                text=" ".join(buf),
+                start_time=current_start,
+                end_time=current_end,
+                index=len(merged) + 1
+            ))
+            buf = [seg.text]
+            current_start = seg.start_time
+            current_end = seg.end_time
 
         # 添加最后一个片段
         merged.append(SubtitleSegment(
-            text=current_text,
+            text=" ".join(buf),
             start_time=current_start,
             end_time=current_end,
             index=len(merged) + 1
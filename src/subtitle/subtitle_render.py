@@ -3,20 +3,305 @@
 将字幕渲染到视频上
 """
 
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Any, List, Tuple, Optional, Union
-from PIL import Image, ImageDraw, ImageFont
+from typing import Dict, Any, List, Tuple, Optional, Union, Callable
+from functools import lru_cache
+import PIL
+from PIL import Image, ImageColor, ImageDraw, ImageFont
 import numpy as np
-from moviepy.editor import TextClip, CompositeVideoClip
+from moviepy.editor import ImageClip, CompositeVideoClip, VideoFileClip
+import concurrent.futures
+import hashlib
+import json
+import math
+import os
 import logging
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
 
 from .font_manager import FontManager
 from .font_size_manager import FontSizeManager
 
+# Numba 可选，用于把逐帧字幕混合编译为单次遍历的并行内核
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Pillow-SIMD 以 ".postN" 后缀区分版本号，贴图、混合和缩放内核使用 AVX2 实现
+PILLOW_SIMD = '.post' in PIL.__version__
+
+
+# 系统字体列表的磁盘缓存，避免每次启动都重新扫描并解析字体文件
+FONT_CACHE_FILE = Path.home() / '.cache' / 'ai-video-maker' / 'fonts.json'
+
+# 候选字体列表 -> 选中字体路径的磁盘缓存，避免每次启动都逐个验证候选字体
+FONT_CHOICE_CACHE_FILE = FONT_CACHE_FILE.parent / 'font_choice.json'
+
+# 常见系统字体目录，用于判断磁盘缓存是否失效
+SYSTEM_FONT_DIRS = [
+    '/usr/share/fonts',
+    '/usr/local/share/fonts',
+    '~/.fonts',
+    '~/.local/share/fonts',
+    '/Library/Fonts',
+    '/System/Library/Fonts',
+    '~/Library/Fonts',
+    'C:/Windows/Fonts',
+]
+
+# 系统字体文件扩展名
+FONT_EXTENSIONS = ('.ttf', '.otf', '.ttc', '.otc')
+
+# 字形遮罩缓存的字形数（描边和填充遮罩各一份，48px 中文约 7KB/字）
+GLYPH_CACHE_SIZE = 2048
+# 前进宽度缓存的条目数（单字符及相邻字符对）
+ADVANCE_CACHE_SIZE = 16384
+# 折行单元：连续的可见 ASCII 字符视为一个单词，其余字符（含中日韩文字）单独成单元
+_WRAP_TOKEN_RE = re.compile(r'[!-~]+|\s|.')
+
+
+class _UnprintableCharTable(dict):
+    """
+    str.translate 用的不可见字符删除表
+
+    按需填充：首次遇到某个码位时判断是否保留，之后直接命中字典，
+    避免预先为全部 0x110000 个码位建表。
+    """
+
+    # 不可见但需要保留的字符：全角空格、不换行空格
+    KEEP = frozenset((0x3000, 0x00A0))
+
+    def __missing__(self, codepoint: int) -> Optional[int]:
+        value = codepoint if chr(codepoint).isprintable() or codepoint in self.KEEP else None
+        self[codepoint] = value
+        return value
+
+
+_STRIP_UNPRINTABLE = _UnprintableCharTable()
+
+
+class _LRUCache:
+    """
+    线程安全的定长 LRU 缓存
+
+    键中不包含字体对象本身（各工作线程使用不同的字体副本），
+    因此不能直接用 functools.lru_cache，超出容量时淘汰最久未用的项。
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: 'OrderedDict[Any, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Any:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+# ASS 字幕对齐编号（小键盘布局）：水平对齐 + 垂直位置偏移
+_ASS_ALIGN = {'left': 1, 'center': 2, 'right': 3}
+_ASS_POSITION_OFFSET = {'bottom': 0, 'center': 3, 'top': 6}
+
+
+def _font_dirs_fingerprint() -> List[List[Any]]:
+    """
+    计算字体目录指纹（目录路径及其最新修改时间）
+
+    Returns:
+        [[目录, 最大mtime], ...] 列表
+    """
+    fingerprint = []
+    for font_dir in SYSTEM_FONT_DIRS:
+        font_dir = os.path.expanduser(font_dir)
+        if not os.path.isdir(font_dir):
+            continue
+
+        # 字体安装在子目录时只会更新子目录的 mtime
+        latest = 0.0
+        for root, _, _ in os.walk(font_dir):
+            try:
+                latest = max(latest, os.stat(root).st_mtime)
+            except OSError:
+                continue
+        fingerprint.append([font_dir, latest])
+
+    return fingerprint
+
+
+@lru_cache(maxsize=1)
+def _load_system_font_names() -> Tuple[str, ...]:
+    """
+    加载系统字体名称（进程内缓存 + 磁盘缓存）
+
+    Returns:
+        排序后的字体名称元组
+    """
+    logger = logging.getLogger(__name__)
+    fingerprint = _font_dirs_fingerprint()
+
+    # 1. 字体目录未变化时直接读取磁盘缓存，跳过扫描
+    try:
+        with open(FONT_CACHE_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('fingerprint') == fingerprint:
+            return tuple(data['fonts'])
+    except (OSError, ValueError, KeyError):
+        pass
+
+    # 2. 冷启动：遍历字体目录，用 FreeType 只读取字体族名（无需 matplotlib）
+    names = set()
+    for font_dir, _ in fingerprint:
+        for root, _, files in os.walk(font_dir):
+            for filename in files:
+                if not filename.lower().endswith(FONT_EXTENSIONS):
+                    continue
+                try:
+                    family = ImageFont.truetype(os.path.join(root, filename), 12).getname()[0]
+                except (OSError, ValueError):
+                    continue
+                if family:
+                    names.add(family)
+    font_names = tuple(sorted(names))
+
+    try:
+        FONT_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(FONT_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({'fingerprint': fingerprint, 'fonts': list(font_names)}, f, ensure_ascii=False)
+    except OSError as e:
+        logger.debug(f"写入字体缓存失败: {e}")
+
+    return font_names
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _blend_premultiplied(
+        roi: np.ndarray,
+        premultiplied: np.ndarray,
+        inverse_alpha: np.ndarray
+    ) -> None:
+        """
+        原地混合预乘字幕到帧区域: roi = roi × (1 - alpha) + RGB × alpha
+
+        Args:
+            roi: 帧中字幕区域 (H, W, 3) uint8，原地修改
+            premultiplied: 预乘 RGB (H, W, 3) float32
+            inverse_alpha: 1 - alpha (H, W, 1) float32
+        """
+        height, width, _ = premultiplied.shape
+        for i in prange(height):
+            for j in range(width):
+                a = inverse_alpha[i, j, 0]
+                for c in range(3):
+                    roi[i, j, c] = np.uint8(roi[i, j, c] * a + premultiplied[i, j, c])
+
+
+def _div255(values: np.ndarray) -> np.ndarray:
+    """
+    整数除以 255 并四舍五入（与 Pillow 内部的 DIV255 相同）
+
+    Args:
+        values: 不超过 255 * 255 的整数数组
+
+    Returns:
+        商数组
+    """
+    values = values + 128
+    return (values + (values >> 8)) >> 8
+
+
+@lru_cache(maxsize=8)
+def _build_mask_color_lut(
+    stroke_rgba: Tuple[int, int, int, int],
+    fill_rgba: Tuple[int, int, int, int]
+) -> np.ndarray:
+    """
+    构建 (描边遮罩值, 填充遮罩值) -> RGBA 的颜色表
+
+    按 Pillow 遮罩粘贴的规则，在透明画布上依次粘贴描边色和文字色：
+    out = (out * (255 - m) + color * m) / 255，目标像素完全透明时 RGB 直接取颜色。
+
+    Args:
+        stroke_rgba: 描边颜色
+        fill_rgba: 文字颜色
+
+    Returns:
+        65536 项的 uint32 数组（RGBA 字节打包），下标为 描边值 << 8 | 填充值
+    """
+    stroke = np.arange(256, dtype=np.int32)[:, None, None]
+    fill = np.arange(256, dtype=np.int32)[None, :, None]
+    stroke_color = np.array(stroke_rgba, dtype=np.int32)
+    fill_color = np.array(fill_rgba, dtype=np.int32)
+
+    # 第一次粘贴（描边）：透明画布上有遮罩处 RGB 直接取描边色
+    after_stroke = np.where(stroke > 0, stroke_color, 0)
+    after_stroke[..., 3] = _div255(stroke[..., 0] * stroke_rgba[3])
+    after_stroke = np.broadcast_to(after_stroke, (256, 256, 4))
+
+    # 第二次粘贴（文字）
+    lut = _div255(after_stroke * (255 - fill) + fill_color * fill)
+    still_transparent = (after_stroke[..., 3:] == 0) & (fill > 0)
+    lut[..., :3] = np.where(still_transparent, fill_color[:3], lut[..., :3])
+
+    return np.ascontiguousarray(lut.astype(np.uint8)).view(np.uint32).reshape(65536)
+
+
+@lru_cache(maxsize=16)
+def _get_font(font_path: str, size: int) -> ImageFont.FreeTypeFont:
+    """
+    加载并缓存 TrueType 字体对象
+
+    字体对象只读使用时可在多次调用（及线程）间共享，
+    避免每次渲染都重新打开并解析字体文件。
+
+    始终按路径加载：FreeType 会以只读内存映射方式打开字体文件，
+    多个字体对象、线程乃至进程共享同一份页缓存。不要改为把文件读入
+    BytesIO 再加载，那样每个字体对象都会复制一份完整的字体数据
+    （中文字体通常 10-30 MB）。
+
+    Args:
+        font_path: 字体文件路径或字体名称
+        size: 字体大小
+
+    Returns:
+        FreeTypeFont 对象
+    """
+    return ImageFont.truetype(font_path, size)
+
 
 class SubtitleRenderer:
     """字幕渲染器类"""
 
+    # 影响字体大小标准化结果的配置项
+    FONT_SIZE_CONFIG_KEYS = (
+        'adaptive_font_size',
+        'min_font_size',
+        'max_font_size',
+        'font_size_scale_factor',
+        'reference_width',
+    )
+
+    # 字体大小标准化结果缓存（所有实例共享），相同配置只计算一次
+    _font_size_cache: Dict[Tuple[Any, ...], Dict[str, int]] = {}
+
     def __init__(self, config: Dict[str, Any]):
         """
         初始化字幕渲染器
@@ -46,13 +331,20 @@ class SubtitleRenderer:
         video_height = config.get('video_height', 1080)
         video_resolution = (video_width, video_height)
 
-        # 标准化字体大小
+        # 标准化字体大小（按影响结果的配置项缓存）
         base_font_size = config.get('font_size', 48)
-        self.font_sizes = self.font_size_manager.normalize_font_size(
-            base_font_size,
-            video_resolution,
-            config
+        cache_key = (base_font_size, video_resolution) + tuple(
+            config.get(key) for key in self.FONT_SIZE_CONFIG_KEYS
         )
+        font_sizes = self._font_size_cache.get(cache_key)
+        if font_sizes is None:
+            font_sizes = self.font_size_manager.normalize_font_size(
+                base_font_size,
+                video_resolution,
+                config
+            )
+            self._font_size_cache[cache_key] = font_sizes
+        self.font_sizes = dict(font_sizes)
 
         # 为向后兼容保留原有属性 (使用MoviePy大小)
         self.font_size = self.font_sizes['moviepy_size']
@@ -65,6 +357,28 @@ class SubtitleRenderer:
         self.margin_bottom = config.get('margin_bottom', 100)
         self.align = config.get('align', 'center')
 
+        if PILLOW_SIMD:
+            self.logger.info(f"检测到 Pillow-SIMD {PIL.__version__}，图像混合与缩放使用 SIMD 内核")
+        else:
+            self.logger.debug(f"使用 Pillow {PIL.__version__}（可替换为 Pillow-SIMD 加速，见 README）")
+
+        # 预加载 PIL 字体对象，所有栅格化共用
+        try:
+            self._pil_font = _get_font(str(self.font), self.font_sizes['pil_size'])
+        except Exception as e:
+            self.logger.warning(f"加载 PIL 字体失败，使用默认字体 - 可能不支持中文: {e}")
+            self._pil_font = ImageFont.load_default()
+
+        # 基础文本片段缓存，键为 (文本, 视频宽度)；样式在实例内固定
+        self._make_base_clip = lru_cache(maxsize=512)(self._build_base_clip)
+
+        # 动画字幕的折行文本片段缓存，键为 (文本, 最大像素宽度)
+        self._make_wrapped_clip = lru_cache(maxsize=512)(self._build_wrapped_clip)
+
+        # 字形遮罩与前进宽度缓存，同一字符在所有字幕中只渲染一次；按条目数限制内存
+        self._glyph_cache = _LRUCache(GLYPH_CACHE_SIZE)
+        self._advance_cache = _LRUCache(ADVANCE_CACHE_SIZE)
+
     def _initialize_font(self, config: Dict[str, Any]) -> None:
         """
         初始化字体配置
@@ -109,6 +423,18 @@ class SubtitleRenderer:
         universal_fallback = ['Arial Unicode MS', 'DejaVu Sans']
         preferred_fonts.extend(universal_fallback)
 
+        # 相同候选列表上次选中的字体文件仍存在时，跳过逐个验证
+        cache_key = hashlib.sha1(
+            json.dumps([str(font) for font in preferred_fonts], ensure_ascii=False).encode('utf-8')
+        ).hexdigest()
+        font_choices = self._load_font_choices()
+        cached_font = font_choices.get(cache_key)
+        if cached_font and Path(cached_font).exists():
+            self.font = cached_font
+            self.font_name = None
+            self.logger.info(f"✓ 使用缓存的字体选择: {Path(cached_font).name}")
+            return
+
         # 选择最佳字体
         self.logger.info(f"从 {len(preferred_fonts)} 个候选字体中选择最佳字体...")
         best_font = self.font_manager.get_best_font(
@@ -146,11 +472,44 @@ class SubtitleRenderer:
                 self.font_name = best_font
                 self.logger.warning(f"⚠ 无法获取字体路径，使用字体名称: {best_font} (可能不支持中文)")
 
+        # 只缓存解析到文件路径的选择结果
+        if self.font_name is None:
+            font_choices[cache_key] = self.font
+            self._save_font_choices(font_choices)
+
+    def _load_font_choices(self) -> Dict[str, str]:
+        """
+        读取字体选择缓存
+
+        Returns:
+            {候选列表哈希: 字体路径} 字典，读取失败时返回空字典
+        """
+        try:
+            with open(FONT_CHOICE_CACHE_FILE, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save_font_choices(self, font_choices: Dict[str, str]) -> None:
+        """
+        写入字体选择缓存
+
+        Args:
+            font_choices: {候选列表哈希: 字体路径} 字典
+        """
+        try:
+            FONT_CHOICE_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            with open(FONT_CHOICE_CACHE_FILE, 'w', encoding='utf-8') as f:
+                json.dump(font_choices, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            self.logger.debug(f"写入字体选择缓存失败: {e}")
+
     def create_text_clips(
         self,
         subtitle_segments: List[Any],
         video_size: Tuple[int, int]
-    ) -> List[TextClip]:
+    ) -> List[ImageClip]:
         """
         创建文本片段列表
 
@@ -159,38 +518,26 @@ class SubtitleRenderer:
             video_size: 视频尺寸 (width, height)
 
         Returns:
-            TextClip列表
+            ImageClip列表（PIL 栅格化的字幕，带透明蒙版）
         """
         if not self.enabled:
             return []
 
         text_clips = []
 
-        for segment in subtitle_segments:
+        # 已过滤空字幕和零时长片段，并按开始时间排序
+        for segment, text in self._prepare_segments(subtitle_segments):
             try:
-                # 清理和截断字幕文本，确保不会太长
-                text = self._clean_subtitle_text(segment.text)
-
-                # 获取统一配置
-                config = self._get_text_clip_config(text, video_size[0])
-
-                # 创建文本片段 - 使用统一配置
+                # 获取缓存的基础文本片段，相同文本只渲染一次
                 try:
-                    txt_clip = TextClip(text, **config)
+                    base_clip = self._make_base_clip(text, video_size[0])
                 except Exception as e:
-                    # 如果label方法失败，尝试caption方法
-                    self.logger.warning(f"使用label方法创建字幕失败，尝试caption方法: {text[:20]}... ({e})")
-                    try:
-                        caption_config = config.copy()
-                        caption_config['method'] = 'caption'
-                        txt_clip = TextClip(text, **caption_config)
-                    except Exception as e2:
-                        # 如果都失败了，跳过这个字幕
-                        self.logger.error(f"字幕创建完全失败，跳过: {text[:30]}... (label: {e}, caption: {e2})")
-                        continue
-
-                # 设置显示时间
-                txt_clip = txt_clip.set_start(segment.start_time)
+                    # 如果都失败了，跳过这个字幕
+                    self.logger.error(f"字幕创建完全失败，跳过: {text[:30]}... ({e})")
+                    continue
+
+                # 设置显示时间（set_* 返回副本，不会修改缓存的基础片段）
+                txt_clip = base_clip.set_start(segment.start_time)
                 txt_clip = txt_clip.set_duration(segment.duration)
 
                 # 设置位置
@@ -210,6 +557,175 @@ class SubtitleRenderer:
 
         return text_clips
 
+    def _prepare_segments(
+        self,
+        subtitle_segments: List[Any],
+        video_duration: Optional[float] = None
+    ) -> List[Tuple[Any, str]]:
+        """
+        过滤并排序字幕片段
+
+        丢弃时长不为正、清理后文本为空或在视频结束后才开始的片段，
+        按开始时间排序，并附带清理后的文本，后续循环无需再次清理。
+
+        Args:
+            subtitle_segments: 字幕片段列表
+            video_duration: 视频时长（可选）
+
+        Returns:
+            (字幕片段, 清理后的文本) 列表
+        """
+        prepared = []
+        beyond_video = 0
+        for segment in subtitle_segments:
+            if segment.duration <= 0:
+                continue
+            if video_duration is not None and segment.start_time >= video_duration:
+                beyond_video += 1
+                continue
+            text = self._clean_subtitle_text(segment.text)
+            if text:
+                prepared.append((segment, text))
+
+        if beyond_video:
+            self.logger.info(f"跳过 {beyond_video} 个在视频结束后才开始的字幕片段")
+
+        prepared.sort(key=lambda item: item[0].start_time)
+        return prepared
+
+    def _build_base_clip(self, text: str, video_width: int) -> ImageClip:
+        """
+        创建未设置时间和位置的基础文本片段
+
+        Args:
+            text: 清理后的字幕文本
+            video_width: 视频宽度
+
+        Returns:
+            ImageClip对象（带透明蒙版）
+        """
+        # 获取统一配置（字体大小为 MoviePy 标准，需换算为 PIL 大小）
+        config = self._get_text_clip_config(text, video_width)
+        pil_size = int(config['fontsize'] * self.font_size_manager.MOVIEPY_TO_PIL_FACTOR)
+
+        rgba = self._render_text_rgba(text, font_size=pil_size)
+        return ImageClip(rgba, transparent=True)
+
+    def _build_wrapped_clip(self, text: str, max_width: int) -> ImageClip:
+        """
+        创建按宽度折行、未设置时间和位置的文本片段
+
+        Args:
+            text: 字幕文本
+            max_width: 最大像素宽度
+
+        Returns:
+            ImageClip对象（带透明蒙版）
+        """
+        rgba = self._render_text_rgba(text, max_width=max_width)
+        return ImageClip(rgba, transparent=True)
+
+    def _get_pil_font(self, font_size: Optional[int] = None) -> ImageFont.ImageFont:
+        """
+        获取指定大小的 PIL 字体对象
+
+        Args:
+            font_size: PIL 字体大小，默认使用标准化的 PIL 大小
+
+        Returns:
+            字体对象
+        """
+        if font_size is None or font_size == self.font_sizes['pil_size']:
+            return self._pil_font
+
+        try:
+            return _get_font(str(self.font), font_size)
+        except Exception as e:
+            self.logger.warning(f"加载字体失败 ({self.font}, {font_size}): {e}")
+            return self._pil_font
+
+    def _wrap_text(self, text: str, font: ImageFont.ImageFont, max_px: int) -> str:
+        """
+        按像素宽度折行
+
+        中日韩文字可在任意字符处换行，连续的 ASCII 单词只在空格处换行；
+        单个单词超过行宽时才按字符拆分。
+
+        Args:
+            text: 字幕文本
+            font: 字体对象
+            max_px: 每行最大像素宽度
+
+        Returns:
+            以换行符分隔的文本
+        """
+        lines = []
+        current = ""
+
+        for token in _WRAP_TOKEN_RE.findall(text):
+            if current and font.getlength(current + token) > max_px:
+                lines.append(current.rstrip())
+                current = token.lstrip()
+            else:
+                current += token
+
+            # 单个超长单词按字符拆分
+            while len(current) > 1 and font.getlength(current) > max_px:
+                cut = len(current) - 1
+                while cut > 1 and font.getlength(current[:cut]) > max_px:
+                    cut -= 1
+                lines.append(current[:cut])
+                current = current[cut:]
+
+        if current.strip():
+            lines.append(current.rstrip())
+
+        return "\n".join(line for line in lines if line)
+
+    def _render_text_rgba(
+        self,
+        text: str,
+        font_size: Optional[int] = None,
+        max_width: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        使用 PIL 将文本栅格化为紧贴文字边界的 RGBA 数组
+
+        Args:
+            text: 字幕文本
+            font_size: PIL 字体大小，默认使用标准化的 PIL 大小
+            max_width: 最大像素宽度，提供时自动折行
+
+        Returns:
+            (H, W, 4) uint8 数组
+        """
+        font = self._get_pil_font(font_size)
+
+        if max_width:
+            text = self._wrap_text(text, font, max_width)
+
+        # 先测量文本边界（含描边），再按边界分配画布
+        measure = ImageDraw.Draw(Image.new('RGBA', (1, 1)))
+        bbox = measure.multiline_textbbox(
+            (0, 0), text, font=font, stroke_width=self.stroke_width, align=self.align
+        )
+        # 多行居中时边界可能为小数，向外取整
+        left, top = math.floor(bbox[0]), math.floor(bbox[1])
+        right, bottom = math.ceil(bbox[2]), math.ceil(bbox[3])
+
+        img = Image.new('RGBA', (max(1, right - left), max(1, bottom - top)), (0, 0, 0, 0))
+        ImageDraw.Draw(img).multiline_text(
+            (-left, -top),
+            text,
+            font=font,
+            fill=self.font_color,
+            stroke_width=self.stroke_width,
+            stroke_fill=self.stroke_color,
+            align=self.align
+        )
+
+        return np.asarray(img)
+
     def _clean_subtitle_text(self, text: str) -> str:
         """
         清理字幕文本，确保渲染成功
@@ -232,12 +748,11 @@ class SubtitleRenderer:
             text = text[:max_length - 3] + "..."
             self.logger.warning(f"字幕文本过长，已截断: {text}")
 
-        # 检查是否包含可能导致问题的字符
-        # 移除或替换有问题的字符
-        text = text.replace('\n', ' ').replace('\r', ' ').replace('\t', ' ')
+        # 换行、制表符等空白已在上面的 split/join 中替换为空格
 
-        # 移除不可见字符
-        text = ''.join(c for c in text if c.isprintable() or c in ['\u3000', '\u00A0'])  # 保留全角空格
+        # 移除不可见字符（绝大多数文本整串可打印，直接跳过）
+        if not text.isprintable():
+            text = text.translate(_STRIP_UNPRINTABLE)
 
         return text.strip()
 
@@ -317,26 +832,56 @@ class SubtitleRenderer:
             text_size: 文本尺寸
             video_size: 视频尺寸
 
+        Returns:
+            位置元组 (x, y)
+        """
+        return self._calc_position(
+            tuple(text_size),
+            tuple(video_size),
+            self.align,
+            self.position,
+            self.margin_bottom
+        )
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _calc_position(
+        text_size: Tuple[int, int],
+        video_size: Tuple[int, int],
+        align: str,
+        position: str,
+        margin: int
+    ) -> Tuple[Union[str, float], int]:
+        """
+        计算字幕位置（纯函数，按参数缓存）
+
+        Args:
+            text_size: 文本尺寸
+            video_size: 视频尺寸
+            align: 水平对齐方式
+            position: 垂直位置
+            margin: 边距
+
         Returns:
             位置元组 (x, y)
         """
         video_width, video_height = video_size
 
         # 水平居中
-        if self.align == 'center':
+        if align == 'center':
             x = 'center'
-        elif self.align == 'left':
+        elif align == 'left':
             x = video_width * 0.05
         else:  # right
             x = video_width * 0.95 - text_size[0]
 
         # 垂直位置
-        if self.position == 'top':
-            y = self.margin_bottom
-        elif self.position == 'center':
+        if position == 'top':
+            y = margin
+        elif position == 'center':
             y = (video_height - text_size[1]) // 2
         else:  # bottom
-            y = video_height - text_size[1] - self.margin_bottom
+            y = video_height - text_size[1] - margin
 
         return (x, y)
 
@@ -416,15 +961,20 @@ class SubtitleRenderer:
 
         self.logger.info(f"开始渲染 {len(subtitle_segments)} 个字幕片段到视频")
 
-        # 创建文本片段
-        text_clips = self.create_text_clips(subtitle_segments, video_clip.size)
+        # 视频直接来自文件时交给 FFmpeg (libass) 烧录字幕，避免逐帧 Python 混合
+        if self._can_burn_with_ffmpeg(video_clip):
+            burned_clip = self._burn_clip_with_ffmpeg(video_clip, subtitle_segments)
+            if burned_clip is not None:
+                return burned_clip
+            self.logger.warning("FFmpeg 字幕烧录失败，回退到逐帧叠加")
+
+        # 创建逐帧字幕叠加函数（每条字幕只栅格化一次）
+        overlay = self._build_subtitle_overlay(subtitle_segments, video_clip)
 
-        if not text_clips:
+        if overlay is None:
             self.logger.warning("没有成功创建任何字幕片段")
             return video_clip
 
-        self.logger.info(f"成功创建 {len(text_clips)} 个字幕文本片段")
-
         # 验证字体大小一致性
         consistency_check = self._validate_font_consistency(subtitle_segments)
         if not consistency_check['is_valid']:
@@ -435,13 +985,9 @@ class SubtitleRenderer:
                 self.logger.info(f"字体大小一致性验证通过: {metrics['sample_count']}个片段, "
                                f"大小范围{metrics['min_size']}-{metrics['max_size']}px")
 
-        # 检查字幕数量，如果太多可能影响性能
-        if len(text_clips) > 50:
-            self.logger.warning(f"字幕片段数量过多 ({len(text_clips)})，可能影响渲染性能")
-
         try:
-            # 合成视频 - 按时间顺序确保正确的渲染顺序
-            final_clip = CompositeVideoClip([video_clip] + text_clips)
+            # 直接在视频帧上贴字幕，不创建合成图层（遮罩保持不变）
+            final_clip = video_clip.fl(overlay, apply_to=[])
             self.logger.info("字幕渲染完成")
             return final_clip
         except Exception as e:
@@ -449,6 +995,432 @@ class SubtitleRenderer:
             # 如果合成失败，返回原视频
             return video_clip
 
+    def _can_burn_with_ffmpeg(self, video_clip: Any) -> bool:
+        """
+        判断视频片段能否直接用 FFmpeg 烧录字幕
+
+        仅适用于直接读取自文件、未经裁剪、缩放或逐帧处理的 VideoFileClip，
+        由配置项 ffmpeg_burn 开启。MoviePy 派生片段（fl、fl_image、resize 等）
+        会复制 filename 和 reader，因此还要确认取帧函数仍是 VideoFileClip 自己的，
+        否则 FFmpeg 重新读取源文件会丢掉这些处理。
+
+        Args:
+            video_clip: 视频片段
+
+        Returns:
+            是否可以使用 FFmpeg 烧录
+        """
+        if not self.config.get('ffmpeg_burn', False):
+            return False
+
+        if not isinstance(video_clip, VideoFileClip):
+            return False
+
+        # VideoFileClip 的取帧函数定义在其模块内；派生片段的取帧函数来自 moviepy.Clip 等其他模块
+        make_frame = getattr(video_clip, 'make_frame', None)
+        if getattr(make_frame, '__module__', None) != VideoFileClip.__module__:
+            return False
+
+        filename = getattr(video_clip, 'filename', None)
+        reader = getattr(video_clip, 'reader', None)
+        if not filename or reader is None or not os.path.isfile(filename):
+            return False
+
+        if shutil.which('ffmpeg') is None:
+            self.logger.warning("未找到 ffmpeg，无法烧录字幕")
+            return False
+
+        # 片段尺寸或时长与源文件不一致说明已被处理过，源文件不能代表片段内容
+        return (
+            tuple(video_clip.size) == tuple(reader.size)
+            and abs(video_clip.duration - reader.duration) < 1e-3
+        )
+
+    def _burn_clip_with_ffmpeg(
+        self,
+        video_clip: Any,
+        subtitle_segments: List[Any]
+    ) -> Optional[Any]:
+        """
+        用 FFmpeg 把字幕烧录到视频片段的源文件，并重新打开为视频片段
+
+        Args:
+            video_clip: 视频片段
+            subtitle_segments: 字幕片段列表
+
+        Returns:
+            带字幕的视频片段，失败时返回 None
+        """
+        suffix = Path(video_clip.filename).suffix or '.mp4'
+        fd, output_path = tempfile.mkstemp(prefix='subtitled_', suffix=suffix)
+        os.close(fd)
+
+        if not self.render_via_ffmpeg(
+            video_clip.filename,
+            subtitle_segments,
+            output_path,
+            video_size=tuple(video_clip.size)
+        ):
+            os.unlink(output_path)
+            return None
+
+        # 音频沿用原片段（可能已被替换或混音），不从源文件读取
+        burned_clip = VideoFileClip(output_path, audio=False)
+        if video_clip.audio is not None:
+            burned_clip = burned_clip.set_audio(video_clip.audio)
+
+        # 临时输出文件随片段关闭一起删除
+        close_clip = burned_clip.close
+
+        def close() -> None:
+            try:
+                close_clip()
+            finally:
+                try:
+                    os.unlink(output_path)
+                except FileNotFoundError:
+                    pass
+
+        burned_clip.close = close
+
+        self.logger.info("字幕渲染完成 (FFmpeg)")
+        return burned_clip
+
+    def render_via_ffmpeg(
+        self,
+        input_path: Union[str, Path],
+        subtitle_segments: List[Any],
+        output_path: Union[str, Path],
+        video_size: Optional[Tuple[int, int]] = None
+    ) -> bool:
+        """
+        使用 FFmpeg subtitles 滤镜把字幕烧录到视频文件
+
+        字幕先导出为 ASS 文件（字体、颜色、描边与当前样式一致），
+        再由 libass 在 FFmpeg 内部逐帧绘制，音频流直接复制。
+
+        Args:
+            input_path: 输入视频路径
+            subtitle_segments: 字幕片段列表
+            output_path: 输出视频路径
+            video_size: 视频尺寸，默认取配置中的分辨率
+
+        Returns:
+            是否成功
+        """
+        if video_size is None:
+            video_size = (
+                self.config.get('video_width', 1920),
+                self.config.get('video_height', 1080)
+            )
+
+        with tempfile.TemporaryDirectory(prefix='subtitle_ass_') as tmp_dir:
+            ass_path = Path(tmp_dir) / 'subtitles.ass'
+            if self._write_ass_file(subtitle_segments, ass_path, video_size) == 0:
+                self.logger.warning("没有可烧录的字幕")
+                return False
+
+            video_filter = f"subtitles=filename={self._escape_filter_value(ass_path)}"
+            font_path = Path(str(self.font)) if self.font else None
+            if font_path is not None and font_path.is_file():
+                video_filter += f":fontsdir={self._escape_filter_value(font_path.parent)}"
+
+            cmd = [
+                'ffmpeg', '-y', '-loglevel', 'error',
+                '-i', str(input_path),
+                '-vf', video_filter,
+                *self._ffmpeg_encoder_args(),
+                '-c:a', 'copy',
+                str(output_path)
+            ]
+
+            try:
+                result = subprocess.run(cmd, capture_output=True, text=True)
+            except OSError as e:
+                self.logger.error(f"启动 FFmpeg 失败: {e}")
+                return False
+
+        if result.returncode != 0:
+            self.logger.error(f"FFmpeg 字幕烧录失败: {result.stderr.strip()}")
+            return False
+
+        return True
+
+    def _ffmpeg_encoder_args(self) -> List[str]:
+        """
+        根据配置生成 FFmpeg 烧录字幕时的视频编码参数
+
+        配置了 ffmpeg_bitrate 时按码率编码；否则 libx264/libx265 使用 ffmpeg_crf 质量参数，
+        ffmpeg_preset 也只传给这两个编码器（硬件编码器不认识 -crf 和 x264 预设名）。
+
+        Returns:
+            FFmpeg 参数列表
+        """
+        codec = self.config.get('ffmpeg_codec', 'libx264')
+        args = ['-c:v', codec]
+
+        bitrate = self.config.get('ffmpeg_bitrate')
+        if codec in ('libx264', 'libx265'):
+            args += ['-preset', self.config.get('ffmpeg_preset', 'veryfast')]
+            if not bitrate:
+                args += ['-crf', str(self.config.get('ffmpeg_crf', 18))]
+        if bitrate:
+            args += ['-b:v', str(bitrate)]
+
+        return args
+
+    def _write_ass_file(
+        self,
+        subtitle_segments: List[Any],
+        ass_path: Path,
+        video_size: Tuple[int, int]
+    ) -> int:
+        """
+        把字幕片段导出为 ASS 文件
+
+        Args:
+            subtitle_segments: 字幕片段列表
+            ass_path: ASS 文件路径
+            video_size: 视频尺寸
+
+        Returns:
+            写入的字幕条数
+        """
+        video_width, video_height = video_size
+
+        if isinstance(self._pil_font, ImageFont.FreeTypeFont):
+            font_name = self._pil_font.getname()[0]
+        else:
+            font_name = self.font_name or 'Sans'
+
+        alignment = _ASS_ALIGN.get(self.align, 2) + _ASS_POSITION_OFFSET.get(self.position, 0)
+        margin_h = int(video_width * 0.05)
+
+        lines = [
+            "[Script Info]",
+            "ScriptType: v4.00+",
+            f"PlayResX: {video_width}",
+            f"PlayResY: {video_height}",
+            "WrapStyle: 0",
+            "ScaledBorderAndShadow: yes",
+            "",
+            "[V4+ Styles]",
+            "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, "
+            "BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, "
+            "BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding",
+            f"Style: Default,{font_name},{self.font_sizes['pil_size']},"
+            f"{self._ass_color(self.font_color)},{self._ass_color(self.font_color)},"
+            f"{self._ass_color(self.stroke_color)},&H00000000,0,0,0,0,100,100,0,0,"
+            f"1,{self.stroke_width},0,{alignment},{margin_h},{margin_h},{self.margin_bottom},1",
+            "",
+            "[Events]",
+            "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+        ]
+
+        count = 0
+        for segment, text in self._prepare_segments(subtitle_segments):
+            # ASS 中花括号开始样式覆盖块、反斜杠开始转义，替换为全角字符避免被解析
+            text = text.replace('\\', '＼').replace('{', '｛').replace('}', '｝')
+
+            lines.append(
+                f"Dialogue: 0,{self._format_ass_time(segment.start_time)},"
+                f"{self._format_ass_time(segment.end_time)},Default,,0,0,0,,{text}"
+            )
+            count += 1
+
+        ass_path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        return count
+
+    @staticmethod
+    def _format_ass_time(seconds: float) -> str:
+        """
+        格式化 ASS 时间戳 (H:MM:SS.cc)
+
+        Args:
+            seconds: 秒数
+
+        Returns:
+            时间戳字符串
+        """
+        centiseconds = int(round(max(seconds, 0.0) * 100))
+        hours, remainder = divmod(centiseconds, 360000)
+        minutes, remainder = divmod(remainder, 6000)
+        secs, centiseconds = divmod(remainder, 100)
+        return f"{hours}:{minutes:02d}:{secs:02d}.{centiseconds:02d}"
+
+    @staticmethod
+    def _ass_color(color: str) -> str:
+        """
+        转换颜色为 ASS 格式 (&HAABBGGRR)
+
+        Args:
+            color: 颜色名称或十六进制值
+
+        Returns:
+            ASS 颜色字符串
+        """
+        rgba = ImageColor.getcolor(color, 'RGBA')
+        return f"&H{255 - rgba[3]:02X}{rgba[2]:02X}{rgba[1]:02X}{rgba[0]:02X}"
+
+    @staticmethod
+    def _escape_filter_value(value: Union[str, Path]) -> str:
+        """
+        转义 FFmpeg 滤镜参数值（选项层与滤镜图层两级转义）
+
+        Args:
+            value: 参数值
+
+        Returns:
+            转义后的字符串
+        """
+        value = str(value).replace('\\', '/')
+        for special_chars in ("\\':", "\\':[],;"):
+            value = ''.join('\\' + c if c in special_chars else c for c in value)
+        return value
+
+    def _build_subtitle_overlay(
+        self,
+        subtitle_segments: List[Any],
+        video_clip: Any
+    ) -> Optional[Callable[[Callable[[float], np.ndarray], float], np.ndarray]]:
+        """
+        构建逐帧字幕叠加函数
+
+        每条不同的字幕文本只用 PIL 栅格化一次（只分配文字大小的画布），
+        放入所有字幕共同的包围盒，并预先转换为预乘 RGB 和 (1 - alpha)；
+        叠加函数按时间二分查找当前字幕，只在包围盒区域内用 numpy 做一次
+        乘加混合，不再经过 CompositeVideoClip 的多图层合成。
+
+        Args:
+            subtitle_segments: 字幕片段列表
+            video_clip: 视频片段
+
+        Returns:
+            可传给 video_clip.fl 的叠加函数 (get_frame, t) -> frame，
+            没有可用字幕时返回 None
+        """
+        video_size = tuple(video_clip.size)
+
+        # 收集时间轴，相同文本只栅格化一次
+        starts, ends, frame_texts = [], [], []
+        video_duration = getattr(video_clip, 'duration', None)
+        for segment, text in self._prepare_segments(subtitle_segments, video_duration):
+            starts.append(segment.start_time)
+            ends.append(segment.end_time)
+            frame_texts.append(text)
+
+        rasters = self._rasterize_subtitles(list(dict.fromkeys(frame_texts)), video_size)
+
+        # 丢弃栅格化失败的片段
+        kept = [i for i, text in enumerate(frame_texts) if text in rasters]
+        if not kept:
+            return None
+        starts = [starts[i] for i in kept]
+        ends = [ends[i] for i in kept]
+        frame_texts = [frame_texts[i] for i in kept]
+
+        self.logger.info(f"成功栅格化 {len(rasters)} 条不同字幕，共 {len(frame_texts)} 个片段")
+
+        # 所有字幕共用一个包围盒（裁剪到画面内），降低每帧混合的像素量
+        boxes = [
+            (x, y, x + img.width, y + img.height)
+            for img, (x, y) in rasters.values()
+            if img.width and img.height
+        ]
+        if not boxes:
+            return None
+        left = max(0, min(box[0] for box in boxes))
+        top = max(0, min(box[1] for box in boxes))
+        right = min(video_size[0], max(box[2] for box in boxes))
+        bottom = min(video_size[1], max(box[3] for box in boxes))
+        if left >= right or top >= bottom:
+            return None
+
+        # 预计算混合参数: 输出 = 帧 × (1 - alpha) + RGB × alpha
+        sprites = {}
+        for text, (img, (x, y)) in rasters.items():
+            band = Image.new('RGBA', (right - left, bottom - top), (0, 0, 0, 0))
+            band.paste(img, (x - left, y - top))
+            rgba = np.asarray(band, dtype=np.float32)
+            alpha = rgba[..., 3:] / 255.0
+            # 预乘结果加 0.5，转回 uint8 时的截断即为四舍五入
+            sprites[text] = (
+                np.ascontiguousarray(rgba[..., :3] * alpha + 0.5),
+                np.ascontiguousarray(1.0 - alpha)
+            )
+        timeline = [sprites[text] for text in frame_texts]
+        starts = np.asarray(starts)
+        ends = np.asarray(ends)
+        # 无 Numba 时每帧混合复用同一块浮点缓冲区，避免逐帧分配临时数组
+        scratch = None if NUMBA_AVAILABLE else np.empty((bottom - top, right - left, 3), dtype=np.float32)
+        # 按开始时间排序后结束时间不一定有序，用前缀最大值定位仍可能显示的第一条
+        max_ends = np.maximum.accumulate(ends)
+
+        def overlay(get_frame: Callable[[float], np.ndarray], t: float) -> np.ndarray:
+            frame = get_frame(t)
+            # 候选区间 [lo, hi)：之前的都已结束，之后的都未开始
+            lo = int(np.searchsorted(max_ends, t, side='right'))
+            hi = int(np.searchsorted(starts, t, side='right'))
+            active = [i for i in range(lo, hi) if t < ends[i]]
+            if not active:
+                return frame
+
+            # 源帧可能被缓存复用，复制后只改写字幕区域
+            frame = frame.copy()
+            roi = frame[top:bottom, left:right]
+            # 时间重叠的字幕按开始时间依次叠加
+            for i in active:
+                premultiplied, inverse_alpha = timeline[i]
+                if NUMBA_AVAILABLE:
+                    _blend_premultiplied(roi, premultiplied, inverse_alpha)
+                else:
+                    # 中间结果写入复用的缓冲区
+                    np.multiply(roi, inverse_alpha, out=scratch)
+                    np.add(scratch, premultiplied, out=scratch)
+                    np.copyto(roi, scratch, casting='unsafe')
+            return frame
+
+        return overlay
+
+    def _rasterize_subtitles(
+        self,
+        texts: List[str],
+        video_size: Tuple[int, int]
+    ) -> Dict[str, Tuple[Image.Image, Tuple[int, int]]]:
+        """
+        并行栅格化多条字幕文本
+
+        各条字幕互不依赖，使用线程池并行绘制；每个工作线程使用独立的
+        字体对象副本，避免多个线程共用同一个 FreeType 字体。
+
+        Args:
+            texts: 去重后的字幕文本列表
+            video_size: 视频尺寸
+
+        Returns:
+            {文本: (紧凑字幕图像, 左上角坐标)} 字典，栅格化失败的文本不包含在内
+        """
+        local = threading.local()
+
+        def render(text: str) -> Optional[Tuple[Image.Image, Tuple[int, int]]]:
+            if not hasattr(local, 'font'):
+                font_variant = getattr(self._pil_font, 'font_variant', None)
+                local.font = font_variant() if font_variant else self._pil_font
+            try:
+                return self._render_subtitle_sprite(text, video_size, font=local.font)
+            except Exception as e:
+                self.logger.error(f"字幕栅格化失败，跳过: {text[:30]}... ({e})")
+                return None
+
+        max_workers = min(len(texts), os.cpu_count() or 1)
+        if max_workers <= 1:
+            results = [render(text) for text in texts]
+        else:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(render, texts))
+
+        return {text: result for text, result in zip(texts, results) if result is not None}
+
     def create_subtitle_image(
         self,
         text: str,
@@ -466,70 +1438,235 @@ class SubtitleRenderer:
         Returns:
             PIL Image对象
         """
-        # 创建透明背景
+        sprite, offset = self._render_subtitle_sprite(text, image_size, font_path)
+
+        # 创建透明背景并放入紧凑字幕图像
         img = Image.new('RGBA', image_size, (0, 0, 0, 0))
-        draw = ImageDraw.Draw(img)
+        img.paste(sprite, offset)
+
+        return img
+
+    def _render_subtitle_sprite(
+        self,
+        text: str,
+        image_size: Tuple[int, int],
+        font_path: Optional[str] = None,
+        font: Optional[ImageFont.ImageFont] = None
+    ) -> Tuple[Image.Image, Tuple[int, int]]:
+        """
+        按文字包围盒创建紧凑的字幕图像
+
+        画布只覆盖文字及描边所占区域，而非整个视频画面。
 
-        # 加载字体
-        font = None
+        Args:
+            text: 字幕文本
+            image_size: 视频画面尺寸（用于计算位置）
+            font_path: 字体文件路径
+            font: 已加载的字体对象（优先于 font_path）
 
-        # 1. 优先使用传入的字体路径
-        if font_path and Path(font_path).exists():
+        Returns:
+            (PIL Image对象, 在画面中的左上角坐标)
+        """
+        # 1. 传入了不同于初始化字体的路径时才重新加载
+        if font is None and font_path and font_path != self.font and Path(font_path).exists():
             try:
-                font = ImageFont.truetype(font_path, self.font_sizes['pil_size'])  # 使用PIL标准化大小
+                font = _get_font(font_path, self.font_sizes['pil_size'])  # 使用PIL标准化大小
                 self.logger.debug(f"使用传入的字体路径: {font_path}")
             except Exception as e:
                 self.logger.warning(f"加载字体失败 ({font_path}): {e}")
 
-        # 2. 使用初始化时选择的字体
-        if font is None and self.font:
-            try:
-                font = ImageFont.truetype(str(self.font), self.font_sizes['pil_size'])  # 使用PIL标准化大小
-                self.logger.debug(f"使用初始化字体: {self.font}")
-            except Exception as e:
-                self.logger.warning(f"加载初始化字体失败: {e}")
-
-        # 3. 回退到默认字体（仅作为最后手段）
+        # 2. 直接复用初始化时加载的字体对象（加载失败时已回退到默认字体）
         if font is None:
-            self.logger.warning("使用默认字体 - 可能不支持中文")
-            font = ImageFont.load_default()
-
-        # 计算文本位置
-        bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-
-        x = (image_size[0] - text_width) // 2
-        if self.position == 'bottom':
-            y = image_size[1] - text_height - self.margin_bottom
-        elif self.position == 'top':
-            y = self.margin_bottom
-        else:  # center
-            y = (image_size[1] - text_height) // 2
-
-        # 绘制描边
-        if self.stroke_width > 0:
-            for offset_x in range(-self.stroke_width, self.stroke_width + 1):
-                for offset_y in range(-self.stroke_width, self.stroke_width + 1):
-                    draw.text(
-                        (x + offset_x, y + offset_y),
-                        text,
-                        font=font,
-                        fill=self.stroke_color
-                    )
-
-        # 绘制主文本
-        draw.text((x, y), text, font=font, fill=self.font_color)
+            font = self._pil_font
 
-        return img
+        if self._can_use_glyph_cache(font) and '\n' not in text:
+            # 由缓存的单字形遮罩拼合，每个字形只需 FreeType 渲染一次（只支持单行）
+            stroke_mask, fill_mask = self._compose_glyph_masks(text, font)
+            sprite = self._colorize_masks(stroke_mask, fill_mask)
+        else:
+            # 计算文本边界（包含描边，确保描边也落在边距内）；多行文本按行距逐行排版
+            if '\n' in text:
+                bbox = ImageDraw.Draw(Image.new('L', (1, 1))).multiline_textbbox(
+                    (0, 0), text, font=font, stroke_width=self.stroke_width
+                )
+            else:
+                bbox = font.getbbox(text, stroke_width=self.stroke_width)
+
+            # 只分配文字大小的画布，绘制主文本和描边（PIL 原生描边，一次绘制完成）
+            sprite = Image.new('RGBA', (bbox[2] - bbox[0], bbox[3] - bbox[1]), (0, 0, 0, 0))
+            ImageDraw.Draw(sprite).text(
+                (-bbox[0], -bbox[1]),
+                text,
+                font=font,
+                fill=self.font_color,
+                stroke_width=self.stroke_width,
+                stroke_fill=self.stroke_color
+            )
+
+        # 与 TextClip 路径一样按对齐方式和垂直位置定位
+        x, y = self._calculate_position(sprite.size, image_size)
+        if x == 'center':
+            x = (image_size[0] - sprite.width) // 2
+
+        return sprite, (int(round(x)), int(y))
+
+    @staticmethod
+    def _can_use_glyph_cache(font: ImageFont.ImageFont) -> bool:
+        """
+        判断能否用单字形缓存拼合文本
+
+        只有基础排版（无 raqm 复杂文字整形）下，字形位置才完全由
+        前进宽度和字距对决定，逐字拼合与整串绘制的结果一致。
+
+        Args:
+            font: 字体对象
+
+        Returns:
+            可以使用字形缓存时返回 True
+        """
+        return (
+            isinstance(font, ImageFont.FreeTypeFont)
+            and font.layout_engine == ImageFont.Layout.BASIC
+        )
+
+    def _get_glyph(
+        self,
+        font: ImageFont.FreeTypeFont,
+        char: str
+    ) -> Tuple[np.ndarray, np.ndarray, int, int]:
+        """
+        获取单个字形的描边遮罩和填充遮罩（按字体、大小、描边宽度缓存）
+
+        Args:
+            font: 字体对象
+            char: 字符
+
+        Returns:
+            (描边遮罩, 填充遮罩, 相对基线原点的左偏移, 上偏移)
+        """
+        key = (font.path, font.size, self.stroke_width, char)
+        glyph = self._glyph_cache.get(key)
+        if glyph is None:
+            left, top, right, bottom = font.getbbox(char, stroke_width=self.stroke_width, anchor='ls')
+            size = (max(0, right - left), max(0, bottom - top))
+
+            stroke_mask = Image.new('L', size, 0)
+            ImageDraw.Draw(stroke_mask).text(
+                (-left, -top), char, font=font, fill=255, anchor='ls',
+                stroke_width=self.stroke_width, stroke_fill=255
+            )
+            fill_mask = Image.new('L', size, 0)
+            ImageDraw.Draw(fill_mask).text((-left, -top), char, font=font, fill=255, anchor='ls')
+
+            glyph = (np.asarray(stroke_mask), np.asarray(fill_mask), left, top)
+            self._glyph_cache.put(key, glyph)
+        return glyph
+
+    def _get_advance(self, font: ImageFont.FreeTypeFont, chars: str) -> float:
+        """
+        获取单字符前进宽度或字符对的宽度（按字体和大小缓存）
+
+        Args:
+            font: 字体对象
+            chars: 一个字符或相邻的两个字符
+
+        Returns:
+            像素宽度
+        """
+        key = (font.path, font.size, chars)
+        advance = self._advance_cache.get(key)
+        if advance is None:
+            advance = font.getlength(chars)
+            self._advance_cache.put(key, advance)
+        return advance
+
+    def _compose_glyph_masks(
+        self,
+        text: str,
+        font: ImageFont.FreeTypeFont
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        由缓存的字形遮罩拼合整行文本的描边遮罩和填充遮罩
+
+        字形按前进宽度与字距对累加的笔位放置，重叠处取最大值，
+        与 FreeType 整串渲染的合成方式一致。
+
+        Args:
+            text: 单行文本
+            font: 字体对象
+
+        Returns:
+            (描边遮罩, 填充遮罩)，尺寸为文本（含描边）的包围盒
+        """
+        placements = []
+        pen = 0.0
+        previous = None
+        for char in text:
+            if previous is not None:
+                # 字距调整 = 字符对宽度 - 两个字符各自的宽度
+                pen += (
+                    self._get_advance(font, previous + char)
+                    - self._get_advance(font, previous)
+                    - self._get_advance(font, char)
+                )
+            stroke, fill, left, top = self._get_glyph(font, char)
+            if stroke.size:
+                placements.append((round(pen) + left, top, stroke, fill))
+            pen += self._get_advance(font, char)
+            previous = char
+
+        if not placements:
+            empty = np.zeros((0, 0), dtype=np.uint8)
+            return empty, empty
+
+        min_x = min(x for x, _, _, _ in placements)
+        min_y = min(y for _, y, _, _ in placements)
+        width = max(x + stroke.shape[1] for x, _, stroke, _ in placements) - min_x
+        height = max(y + stroke.shape[0] for _, y, stroke, _ in placements) - min_y
+
+        stroke_canvas = np.zeros((height, width), dtype=np.uint8)
+        fill_canvas = np.zeros((height, width), dtype=np.uint8)
+        for x, y, stroke, fill in placements:
+            region = (slice(y - min_y, y - min_y + stroke.shape[0]), slice(x - min_x, x - min_x + stroke.shape[1]))
+            np.maximum(stroke_canvas[region], stroke, out=stroke_canvas[region])
+            np.maximum(fill_canvas[region], fill, out=fill_canvas[region])
+
+        return stroke_canvas, fill_canvas
+
+    def _colorize_masks(self, stroke_mask: np.ndarray, fill_mask: np.ndarray) -> Image.Image:
+        """
+        用描边色和文字色给遮罩着色，生成 RGBA 字幕图像
+
+        每个像素的结果只取决于 (描边遮罩值, 填充遮罩值)，直接查颜色表，
+        结果与依次两次 Image.paste 逐像素一致，但只需一次数组索引。
+
+        Args:
+            stroke_mask: 描边遮罩
+            fill_mask: 填充遮罩
+
+        Returns:
+            RGBA 字幕图像
+        """
+        lut = _build_mask_color_lut(
+            ImageColor.getcolor(self.stroke_color, 'RGBA') if self.stroke_width else (0, 0, 0, 0),
+            ImageColor.getcolor(self.font_color, 'RGBA')
+        )
+
+        index = fill_mask.astype(np.uint16)
+        if self.stroke_width:
+            index |= stroke_mask.astype(np.uint16) << 8
+
+        sprite = lut[index].view(np.uint8).reshape(fill_mask.shape + (4,))
+        return Image.fromarray(sprite, 'RGBA')
 
     def create_animated_subtitle(
         self,
         text: str,
         duration: float,
         video_size: Tuple[int, int],
-        effect: str = "fade"
-    ) -> TextClip:
+        effect: str = "fade",
+        fps: Optional[float] = None
+    ) -> ImageClip:
         """
         创建带动画效果的字幕
 
@@ -538,24 +1675,18 @@ class SubtitleRenderer:
             duration: 持续时间
             video_size: 视频尺寸
             effect: 动画效果 (fade, slide, zoom)
+            fps: 视频帧率，用于预计算动画查找表（默认取配置中的 fps 或 30）
 
         Returns:
-            TextClip对象
+            ImageClip对象
         """
-        # 创建基础文本片段
-        txt_clip = TextClip(
-            text,
-            fontsize=self.font_sizes['moviepy_size'],  # 使用标准化字体大小
-            font=self.font,
-            color=self.font_color,
-            stroke_color=self.stroke_color,
-            stroke_width=self.stroke_width,
-            method='caption',
-            size=(video_size[0] * 0.9, None),
-            align=self.align
-        )
+        fps = fps or self.config.get('fps', 30)
+
+        # 获取缓存的基础文本片段（按 90% 视频宽度自动折行），相同文本只渲染一次
+        base_clip = self._make_wrapped_clip(text, int(video_size[0] * 0.9))
 
-        txt_clip = txt_clip.set_duration(duration)
+        # set_* 返回副本，不会修改缓存的基础片段
+        txt_clip = base_clip.set_duration(duration)
 
         # 设置位置
         pos = self._calculate_position(txt_clip.size, video_size)
@@ -569,23 +1700,49 @@ class SubtitleRenderer:
             txt_clip = txt_clip.crossfadeout(fade_duration)
 
         elif effect == "slide":
-            # 从底部滑入
-            start_pos = (pos[0], video_size[1])
+            # 从底部滑入（按帧预计算轨迹，逐帧只做一次查表）
+            start_y = video_size[1]
+            y_table = self._build_animation_table(
+                lambda progress: start_y - (start_y - pos[1]) * progress, 0.5, fps
+            )
+            last = len(y_table) - 1
             txt_clip = txt_clip.set_position(
-                lambda t: (
-                    pos[0],
-                    start_pos[1] - (start_pos[1] - pos[1]) * min(t / 0.5, 1.0)
-                )
+                lambda t: (pos[0], y_table[min(int(t * fps + 0.5), last)])
             )
 
         elif effect == "zoom":
-            # 缩放效果
+            # 缩放效果（按帧预计算缩放比例）
+            scale_table = self._build_animation_table(
+                lambda progress: 0.5 + 0.5 * progress, 0.3, fps
+            )
+            last = len(scale_table) - 1
             txt_clip = txt_clip.resize(
-                lambda t: 0.5 + 0.5 * min(t / 0.3, 1.0)
+                lambda t: scale_table[min(int(t * fps + 0.5), last)]
             )
 
         return txt_clip
 
+    @staticmethod
+    def _build_animation_table(
+        curve: Callable[[np.ndarray], np.ndarray],
+        animation_duration: float,
+        fps: float
+    ) -> List[float]:
+        """
+        预计算动画每帧的取值
+
+        Args:
+            curve: 由进度 (0~1) 计算取值的函数，需支持 numpy 数组
+            animation_duration: 动画时长（秒），之后保持最终值
+            fps: 帧率
+
+        Returns:
+            按帧索引的取值列表，最后一项为动画结束后的最终值
+        """
+        frame_count = int(math.ceil(animation_duration * fps))
+        progress = np.minimum(np.arange(frame_count + 1) / fps / animation_duration, 1.0)
+        return curve(progress).tolist()
+
     def batch_render_subtitles(
         self,
         video_clip: Any,
@@ -606,43 +1763,33 @@ class SubtitleRenderer:
         if not self.enabled or not subtitle_segments:
             return video_clip
 
-        text_clips = []
+        # 无动画效果时与 render_on_video 走同一条路径（逐帧叠加或 FFmpeg 烧录）
+        if not effect:
+            return self.render_on_video(video_clip, subtitle_segments)
 
-        for segment in subtitle_segments:
-            if effect:
-                txt_clip = self.create_animated_subtitle(
-                    segment.text,
-                    segment.duration,
-                    video_clip.size,
-                    effect
-                )
-            else:
-                # 清理字幕文本
-                text = self._clean_subtitle_text(segment.text)
-                
-                # 获取统一配置
-                config = self._get_text_clip_config(text, video_clip.size[0])
+        text_clips = []
 
-                try:
-                    # 使用统一配置创建字幕
-                    txt_clip = TextClip(text, **config)
-                except Exception as e:
-                    # 如果label方法失败，尝试caption方法
-                    self.logger.warning(f"使用label方法创建字幕失败，尝试caption方法: {text[:20]}... ({e})")
-                    try:
-                        caption_config = config.copy()
-                        caption_config['method'] = 'caption'
-                        txt_clip = TextClip(text, **caption_config)
-                    except Exception as e2:
-                        # 如果都失败了，跳过这个字幕
-                        self.logger.error(f"字幕创建完全失败，跳过: {text[:30]}... (label: {e}, caption: {e2})")
-                        continue
+        # 循环内不变量提到循环外
+        video_size = video_clip.size
+        video_duration = getattr(video_clip, 'duration', None)
+
+        # 跳过空字幕、零时长和超出视频的片段（动画按原文本折行，不使用清理后的文本）
+        for segment, _ in self._prepare_segments(subtitle_segments, video_duration):
+            # 截断到视频结尾，避免合成时继续查询已结束的图层
+            duration = segment.duration
+            if video_duration is not None:
+                duration = min(duration, video_duration - segment.start_time)
+
+            txt_clip = self.create_animated_subtitle(
+                segment.text,
+                duration,
+                video_size,
+                effect,
+                fps=getattr(video_clip, 'fps', None)
+            )
 
+            # 时长和位置（含滑入动画轨迹）已在 create_animated_subtitle 中设置
             txt_clip = txt_clip.set_start(segment.start_time)
-            txt_clip = txt_clip.set_duration(segment.duration)
-
-            pos = self._calculate_position(txt_clip.size, video_clip.size)
-            txt_clip = txt_clip.set_position(pos)
 
             text_clips.append(txt_clip)
 
@@ -658,9 +1805,4 @@ class SubtitleRenderer:
         Returns:
             字体名称列表
         """
-        import matplotlib.font_manager as fm
-
-        fonts = fm.findSystemFonts()
-        font_names = [fm.FontProperties(fname=f).get_name() for f in fonts]
-
-        return sorted(set(font_names))
+        return list(_load_system_font_names())
@@ -4,8 +4,12 @@
 """
 
 from pathlib import Path
-from typing import Dict, Any, Optional, Callable
+from typing import Dict, Any, List, Optional, Callable, Tuple
 import concurrent.futures
+import logging
+import multiprocessing
+import os
+import threading
 import traceback
 from datetime import datetime
 
@@ -13,6 +17,75 @@ from tasks.task_queue import TaskQueue, VideoTask, TaskStatus
 from utils import setup_logger, ProgressTracker
 
 
+# 进程池工作进程使用的视频生成器
+# 以 fork 方式启动时随父进程内存写时复制继承，不需要序列化绑定方法及其持有的配置和模型
+_worker_video_generator: Optional[Callable] = None
+
+
+def _generate_in_worker(
+    task: VideoTask,
+    max_retries: int,
+    with_traceback: bool
+) -> Tuple[bool, Any, Optional[str], Optional[str]]:
+    """
+    在工作进程中执行视频生成（含重试）
+
+    任务状态和统计信息只在父进程中更新，工作进程仅返回执行结果。
+    异常的堆栈无法跨进程传递，只在最终失败且需要保存日志时格式化一次。
+
+    Args:
+        task: VideoTask对象
+        max_retries: 最大尝试次数
+        with_traceback: 失败时是否返回堆栈跟踪
+
+    Returns:
+        (是否成功, 生成结果, 错误信息, 堆栈跟踪)
+    """
+    # fork 出的子进程已继承父进程配置好的日志器（含 log_level），无需重新设置
+    logger = logging.getLogger("batch_processor")
+    last_error: Optional[Exception] = None
+
+    for retry_count in range(1, max_retries + 1):
+        try:
+            if _worker_video_generator is None:
+                raise ValueError("未设置视频生成器")
+            return True, _worker_video_generator(task), None, None
+
+        except Exception as e:
+            last_error = e
+            logger.error("任务失败 (%d/%d): %s", retry_count, max_retries, task.task_id)
+            logger.error("错误信息: %s", e)
+
+    stack_trace = _format_exception(last_error) if with_traceback and last_error else None
+    return False, None, str(last_error), stack_trace
+
+
+def _available_cpu_count() -> int:
+    """
+    获取当前进程可用的 CPU 数量（考虑 CPU 亲和性和容器限制）
+
+    Returns:
+        可用 CPU 数量
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    # macOS / Windows 没有 sched_getaffinity
+    return os.cpu_count() or 1
+
+
+def _format_exception(error: BaseException) -> str:
+    """
+    格式化异常及其堆栈
+
+    Args:
+        error: 异常对象
+
+    Returns:
+        堆栈跟踪文本
+    """
+    return ''.join(traceback.format_exception(type(error), error, error.__traceback__))
+
+
 class BatchProcessor:
     """批量处理器类"""
 
@@ -34,10 +107,24 @@ class BatchProcessor:
         self.config = config
         self.video_generator = video_generator
 
-        self.max_workers = config.get('max_workers', 2)
+        # 未配置或配置为 auto 时按可用 CPU 数决定，保留一个核心给主进程
+        max_workers = config.get('max_workers')
+        if not max_workers or max_workers == 'auto':
+            max_workers = max(1, _available_cpu_count() - 1)
+        self.max_workers = max_workers
         self.retry_on_error = config.get('retry_on_error', True)
         self.retry_times = config.get('retry_times', 3)
         self.save_logs = config.get('save_logs', True)
+        # 默认使用线程池；设为 True 时生成器在 fork 出的进程池中执行以绕开 GIL。
+        # 进程池要求父进程中没有持锁的后台线程、生成结果可序列化，且所有任务会先统一标记为处理中
+        self.use_processes = config.get('use_processes', False)
+
+        # 批处理期间缓冲任务状态更新，每累积 status_flush_size 条写入一次持久化文件
+        self.batch_status_updates = config.get('batch_status_updates', True)
+        self.status_flush_size = config.get('status_flush_size', 16)
+        self._pending_updates: List[Tuple[str, TaskStatus, Dict[str, Any]]] = []
+        self._updates_lock = threading.Lock()
+        self._buffering_updates = False
 
         self.logger = setup_logger("batch_processor", config.get('log_level', 'INFO'))
 
@@ -60,10 +147,10 @@ class BatchProcessor:
         Returns:
             是否成功
         """
-        self.logger.info(f"开始处理任务: {task.task_id}")
+        self.logger.info("开始处理任务: %s", task.task_id)
 
         # 更新状态为处理中
-        self.task_queue.update_task_status(task.task_id, TaskStatus.PROCESSING)
+        self._update_status(task.task_id, TaskStatus.PROCESSING)
 
         retry_count = 0
         max_retries = self.retry_times if self.retry_on_error else 1
@@ -73,16 +160,7 @@ class BatchProcessor:
                 # 调用视频生成器
                 if self.video_generator:
                     result = self.video_generator(task)
-
-                    # 更新任务状态为完成
-                    self.task_queue.update_task_status(
-                        task.task_id,
-                        TaskStatus.COMPLETED,
-                        result=result
-                    )
-
-                    self.logger.info(f"任务完成: {task.task_id}")
-                    self.stats['successful'] += 1
+                    self._finish_task(task, True, result=result)
                     return True
                 else:
                     raise ValueError("未设置视频生成器")
@@ -96,21 +174,92 @@ class BatchProcessor:
 
                 if retry_count >= max_retries:
                     # 达到最大重试次数，标记为失败
-                    self.task_queue.update_task_status(
-                        task.task_id,
-                        TaskStatus.FAILED,
-                        error_message=error_msg
-                    )
+                    self._finish_task(task, False, error_msg=error_msg, error=e)
+                    return False
 
-                    self.stats['failed'] += 1
+        return False
 
-                    # 保存错误日志
-                    if self.save_logs:
-                        self._save_error_log(task, error_msg)
+    def _finish_task(
+        self,
+        task: VideoTask,
+        success: bool,
+        result: Any = None,
+        error_msg: Optional[str] = None,
+        error: Optional[BaseException] = None,
+        stack_trace: Optional[str] = None
+    ) -> None:
+        """
+        记录任务的最终结果
 
-                    return False
+        Args:
+            task: 任务对象
+            success: 是否成功
+            result: 生成结果
+            error_msg: 错误信息
+            error: 异常对象（堆栈在保存日志时才格式化）
+            stack_trace: 已格式化的堆栈跟踪（来自工作进程）
+        """
+        if success:
+            # 更新任务状态为完成
+            self._update_status(task.task_id, TaskStatus.COMPLETED, result=result)
 
-        return False
+            self.logger.info("任务完成: %s", task.task_id)
+            self.stats['successful'] += 1
+            return
+
+        self._update_status(task.task_id, TaskStatus.FAILED, error_message=error_msg)
+
+        self.stats['failed'] += 1
+
+        # 保存错误日志
+        if self.save_logs:
+            self._save_error_log(task, error_msg, error, stack_trace)
+
+    def _update_status(self, task_id: str, status: TaskStatus, **kwargs: Any) -> None:
+        """
+        更新任务状态，批处理期间先缓冲再批量写入
+
+        Args:
+            task_id: 任务ID
+            status: 新状态
+            **kwargs: 传给 update_task_status 的其他参数
+        """
+        if not (self.batch_status_updates and self._buffering_updates):
+            self.task_queue.update_task_status(task_id, status, **kwargs)
+            return
+
+        with self._updates_lock:
+            self._pending_updates.append((task_id, status, kwargs))
+            if len(self._pending_updates) >= self.status_flush_size:
+                self._flush_status_updates_locked()
+
+    def _flush_status_updates(self) -> None:
+        """写入所有缓冲的任务状态更新"""
+        with self._updates_lock:
+            self._flush_status_updates_locked()
+
+    def _flush_status_updates_locked(self) -> None:
+        """写入所有缓冲的任务状态更新（调用方需持有锁）"""
+        if self._pending_updates:
+            updates, self._pending_updates = self._pending_updates, []
+            self.task_queue.update_many(updates)
+
+    def _use_process_pool(self) -> bool:
+        """
+        判断是否使用进程池并行处理
+
+        Returns:
+            是否使用进程池
+        """
+        if not self.use_processes:
+            return False
+
+        # 依赖 fork 写时复制共享视频生成器，不支持 fork 的平台（如 Windows）回退到线程池
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            self.logger.warning("当前平台不支持 fork，回退到线程池处理")
+            return False
+
+        return True
 
     def process_all_pending(self) -> Dict[str, Any]:
         """
@@ -132,29 +281,15 @@ class BatchProcessor:
         self.stats['successful'] = 0
         self.stats['failed'] = 0
 
-        # 使用线程池处理任务
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # 提交所有任务
-            futures = {
-                executor.submit(self.process_single_task, task): task
-                for task in pending_tasks
-            }
-
-            # 使用进度条
-            with ProgressTracker(len(futures), "处理视频任务") as progress:
-                for future in concurrent.futures.as_completed(futures):
-                    task = futures[future]
-
-                    try:
-                        result = future.result()
-                        self.stats['total_processed'] += 1
-                    except Exception as e:
-                        self.logger.error(f"任务执行异常: {task.task_id}")
-                        self.logger.error(traceback.format_exc())
-                        self.stats['failed'] += 1
-                        self.stats['total_processed'] += 1
-
-                    progress.update(1)
+        self._buffering_updates = True
+        try:
+            if self._use_process_pool():
+                self._process_with_processes(pending_tasks)
+            else:
+                self._process_with_threads(pending_tasks)
+        finally:
+            self._buffering_updates = False
+            self._flush_status_updates()
 
         self.stats['end_time'] = datetime.now()
 
@@ -170,6 +305,88 @@ class BatchProcessor:
 
         return self.stats
 
+    def _process_with_threads(self, pending_tasks: List[VideoTask]) -> None:
+        """
+        使用线程池处理任务
+
+        Args:
+            pending_tasks: 待处理任务列表
+        """
+        # 使用线程池处理任务
+        # 任务数少于工作线程数时不创建空闲线程
+        max_workers = min(self.max_workers, len(pending_tasks))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # 提交所有任务，任务对象直接挂在 future 上
+            futures = []
+            for task in pending_tasks:
+                future = executor.submit(self.process_single_task, task)
+                future.task = task
+                futures.append(future)
+
+            # 使用进度条
+            with ProgressTracker(len(futures), "处理视频任务") as progress:
+                for future in concurrent.futures.as_completed(futures):
+                    task = future.task
+
+                    try:
+                        future.result()
+                    except Exception as e:
+                        # 只记录异常摘要，完整堆栈在保存错误日志时才格式化
+                        self.logger.error(f"任务执行异常: {task.task_id} ({e!r})")
+                        self._finish_task(task, False, error_msg=str(e), error=e)
+
+                    self.stats['total_processed'] += 1
+
+                    progress.update(1)
+
+    def _process_with_processes(self, pending_tasks: List[VideoTask]) -> None:
+        """
+        使用进程池处理任务
+
+        视频生成器通过 fork 继承给工作进程，任务状态和统计信息在父进程中更新。
+
+        Args:
+            pending_tasks: 待处理任务列表
+        """
+        global _worker_video_generator
+        _worker_video_generator = self.video_generator
+
+        max_retries = self.retry_times if self.retry_on_error else 1
+        mp_context = multiprocessing.get_context('fork')
+
+        for task in pending_tasks:
+            self.logger.info("开始处理任务: %s", task.task_id)
+            self._update_status(task.task_id, TaskStatus.PROCESSING)
+        self._flush_status_updates()
+
+        # 任务数少于工作进程数时不创建空闲进程
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=min(self.max_workers, len(pending_tasks)),
+            mp_context=mp_context
+        ) as executor:
+            # 提交所有任务，任务对象直接挂在 future 上
+            futures = []
+            for task in pending_tasks:
+                future = executor.submit(_generate_in_worker, task, max_retries, self.save_logs)
+                future.task = task
+                futures.append(future)
+
+            # 使用进度条
+            with ProgressTracker(len(futures), "处理视频任务") as progress:
+                for future in concurrent.futures.as_completed(futures):
+                    task = future.task
+
+                    try:
+                        success, result, error_msg, stack_trace = future.result()
+                    except Exception as e:
+                        # 工作进程异常退出或结果无法序列化
+                        self.logger.error(f"任务执行异常: {task.task_id} ({e!r})")
+                        self._finish_task(task, False, error_msg=str(e), error=e)
+                    else:
+                        self._finish_task(task, success, result, error_msg, stack_trace=stack_trace)
+                    self.stats['total_processed'] += 1
+                    progress.update(1)
+
     def process_tasks_sequentially(self) -> Dict[str, Any]:
         """
         顺序处理任务（不使用并行）
@@ -190,11 +407,16 @@ class BatchProcessor:
         self.stats['successful'] = 0
         self.stats['failed'] = 0
 
-        with ProgressTracker(len(pending_tasks), "处理视频任务") as progress:
-            for task in pending_tasks:
-                self.process_single_task(task)
-                self.stats['total_processed'] += 1
-                progress.update(1)
+        self._buffering_updates = True
+        try:
+            with ProgressTracker(len(pending_tasks), "处理视频任务") as progress:
+                for task in pending_tasks:
+                    self.process_single_task(task)
+                    self.stats['total_processed'] += 1
+                    progress.update(1)
+        finally:
+            self._buffering_updates = False
+            self._flush_status_updates()
 
         self.stats['end_time'] = datetime.now()
         duration = (self.stats['end_time'] - self.stats['start_time']).total_seconds()
@@ -208,14 +430,25 @@ class BatchProcessor:
 
         return self.stats
 
-    def _save_error_log(self, task: VideoTask, error_msg: str) -> None:
+    def _save_error_log(
+        self,
+        task: VideoTask,
+        error_msg: str,
+        error: Optional[BaseException] = None,
+        stack_trace: Optional[str] = None
+    ) -> None:
         """
         保存错误日志
 
         Args:
             task: 任务对象
             error_msg: 错误信息
+            error: 异常对象，用于格式化堆栈跟踪
+            stack_trace: 已格式化的堆栈跟踪（优先使用）
         """
+        if stack_trace is None:
+            stack_trace = _format_exception(error) if error is not None else "无"
+
         log_dir = Path("output/logs")
         log_dir.mkdir(parents=True, exist_ok=True)
 
@@ -228,7 +461,7 @@ class BatchProcessor:
             f.write(f"素材目录: {task.materials_dir}\n")
             f.write(f"输出路径: {task.output_path}\n")
             f.write(f"\n错误信息:\n{error_msg}\n")
-            f.write(f"\n堆栈跟踪:\n{traceback.format_exc()}\n")
+            f.write(f"\n堆栈跟踪:\n{stack_trace}\n")
 
         self.logger.info(f"错误日志已保存: {log_file}")
 
@@ -247,9 +480,10 @@ class BatchProcessor:
 
         self.logger.info(f"重试 {len(failed_tasks)} 个失败任务")
 
-        # 将失败任务状态改回待处理
-        for task in failed_tasks:
-            self.task_queue.update_task_status(task.task_id, TaskStatus.PENDING)
+        # 将失败任务状态改回待处理（一次写入）
+        self.task_queue.update_many([
+            (task.task_id, TaskStatus.PENDING, {}) for task in failed_tasks
+        ])
 
         # 处理任务
         return self.process_all_pending()
@@ -3,8 +3,13 @@
 支持智能资源管理和GPU加速的视频批量处理
 """
 
+import collections
 import dataclasses
 import concurrent.futures
+import math
+import multiprocessing
+import queue
+import sys
 import threading
 import psutil
 import time
@@ -15,10 +20,60 @@ import traceback
 import logging
 
 from tasks.task_queue import TaskQueue, VideoTask, TaskStatus
-from utils import setup_logger, ProgressTracker
+from utils import setup_logger, ProgressTracker, FramePool
 
+# 与 VideoTask 一致，3.10+ 上结果对象使用 __slots__
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
 
-@dataclasses.dataclass
+# 进程池工作进程中的视频生成器及其资源。以 fork 启动时 initializer 的参数
+# 不经过序列化，闭包和绑定方法也能直接使用
+_process_generator: Optional[Callable] = None
+_process_context_factory: Optional[Callable[[], Any]] = None
+_process_frame_pool_size = 0
+_process_context: Any = None
+_process_frame_pool: Optional[FramePool] = None
+
+
+def _init_generator_process(
+    generator: Callable,
+    context_factory: Optional[Callable[[], Any]],
+    frame_pool_size: int
+) -> None:
+    """进程池工作进程初始化"""
+    global _process_generator, _process_context_factory, _process_frame_pool_size
+    _process_generator = generator
+    _process_context_factory = context_factory
+    _process_frame_pool_size = frame_pool_size
+
+
+def _run_generator_in_process(task: VideoTask) -> Any:
+    """
+    在工作进程中调用视频生成器
+
+    上下文和帧缓冲池在每个工作进程中只创建一次。
+
+    Args:
+        task: VideoTask对象
+
+    Returns:
+        生成结果
+    """
+    global _process_context, _process_frame_pool
+
+    kwargs = {}
+    if _process_context_factory is not None:
+        if _process_context is None:
+            _process_context = _process_context_factory()
+        kwargs['ctx'] = _process_context
+    if _process_frame_pool_size > 0:
+        if _process_frame_pool is None:
+            _process_frame_pool = FramePool(_process_frame_pool_size)
+        kwargs['frame_pool'] = _process_frame_pool
+
+    return _process_generator(task, **kwargs)
+
+
+@dataclasses.dataclass(**_SLOTS)
 class TaskResult:
     """任务执行结果"""
     task_id: str
@@ -28,7 +83,7 @@ class TaskResult:
     result_data: Optional[Dict[str, Any]] = None
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(**_SLOTS)
 class BatchResult:
     """批处理结果"""
     total_tasks: int
@@ -47,8 +102,24 @@ class ResourceManager:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self._lock = threading.Lock()
+        # 任务完成时通知等待启动的提交线程
+        self._slot_released = threading.Condition(self._lock)
         self._active_tasks = 0
         self._memory_usage = 0
+        self._peak_memory_usage = 0
+        # 各控制器设置的动态并发上限，实际生效取最小值；
+        # 生效值单独保存，读取时不需要加锁
+        self._worker_limits: Dict[str, int] = {}
+        self._worker_limit: Optional[int] = None
+
+        # 内存信息缓存：virtual_memory() 每次都要读取 /proc/meminfo
+        threading_config = config.get('performance', {}).get('threading', {})
+        self._memory_cache_ttl = threading_config.get('resource_sample_interval', 0.5)
+        self._memory_cache = None
+        self._memory_cache_time = 0.0
+
+        # 非阻塞 cpu_percent 返回距上次调用的平均值，首次调用只建立基准
+        psutil.cpu_percent(interval=None)
 
     def calculate_optimal_workers(self) -> int:
         """计算最优工作线程数"""
@@ -58,6 +129,10 @@ class ResourceManager:
         # 基础线程数：CPU核心数的2/3
         base_workers = max(1, int(cpu_count * 0.67))
 
+        # 自适应模式下线程池只是上限，实际并发数由运行时的阻塞系数决定
+        if self.config.get('performance', {}).get('threading', {}).get('adaptive_workers', False):
+            base_workers = cpu_count * 4
+
         # 内存限制：假设每个线程需要2GB内存
         memory_workers = max(1, int(memory_gb / 2))
 
@@ -72,38 +147,339 @@ class ResourceManager:
 
     def can_start_task(self, estimated_memory_mb: int = 512) -> bool:
         """检查是否可以启动新任务"""
+        self._virtual_memory()
         with self._lock:
-            max_concurrent = self.config.get('performance', {}).get('threading', {}).get('max_concurrent_tasks', 4)
+            return self._try_reserve(estimated_memory_mb)
 
-            if self._active_tasks >= max_concurrent:
-                return False
+    def wait_for_slot(self, estimated_memory_mb: int = 512, timeout: Optional[float] = None) -> bool:
+        """
+        等待直到可以启动新任务（由任务完成事件唤醒，不轮询）
+
+        Args:
+            estimated_memory_mb: 预估内存占用
+            timeout: 最长等待时间（秒），None 表示一直等待
 
-            # 检查内存使用
-            current_memory = psutil.virtual_memory()
+        Returns:
+            是否已占用任务槽位
+        """
+        # 在锁外刷新内存信息，持锁期间的判断通常直接命中缓存
+        self._virtual_memory()
+        with self._slot_released:
+            return self._slot_released.wait_for(
+                lambda: self._try_reserve(estimated_memory_mb),
+                timeout
+            )
+
+    def _try_reserve(self, estimated_memory_mb: int) -> bool:
+        """尝试占用任务槽位（调用方需持有锁）"""
+        max_concurrent = self.config.get('performance', {}).get('threading', {}).get('max_concurrent_tasks', 4)
+        if self._worker_limit is not None:
+            max_concurrent = min(max_concurrent, self._worker_limit)
+
+        if self._active_tasks >= max_concurrent:
+            return False
+
+        # 检查内存使用（没有运行中的任务时总是允许启动，避免永远无法开始）
+        if self._active_tasks > 0:
+            current_memory = self._virtual_memory()
             memory_limit = self.config.get('performance', {}).get('threading', {}).get('worker_memory_limit', 2048)
 
             if (current_memory.used / (1024**2) + estimated_memory_mb) > memory_limit:
                 return False
 
-            self._active_tasks += 1
-            self._memory_usage += estimated_memory_mb
-            return True
+        self._active_tasks += 1
+        self._memory_usage += estimated_memory_mb
+        self._peak_memory_usage = max(self._peak_memory_usage, self._memory_usage)
+        return True
 
     def task_completed(self, memory_used_mb: int = 512) -> None:
         """任务完成回调"""
-        with self._lock:
+        with self._slot_released:
             self._active_tasks = max(0, self._active_tasks - 1)
             self._memory_usage = max(0, self._memory_usage - memory_used_mb)
+            self._slot_released.notify()
+
+    def _virtual_memory(self):
+        """获取系统内存信息，在缓存有效期内复用上次结果"""
+        now = time.monotonic()
+        if self._memory_cache is None or now - self._memory_cache_time >= self._memory_cache_ttl:
+            self._memory_cache = psutil.virtual_memory()
+            self._memory_cache_time = now
+        return self._memory_cache
+
+    @property
+    def peak_memory_usage(self) -> int:
+        """自上次重置以来预估内存占用的峰值（MB）"""
+        return self._peak_memory_usage
+
+    def reset_peak_memory_usage(self) -> None:
+        """重置预估内存占用峰值"""
+        with self._lock:
+            self._peak_memory_usage = self._memory_usage
+
+    @property
+    def worker_limit(self) -> Optional[int]:
+        """当前生效的动态并发上限（未设置时为 None）"""
+        return self._worker_limit
+
+    def set_worker_limit(self, limit: int, source: str = 'default') -> None:
+        """
+        设置动态并发上限
+
+        超出上限的线程池线程不会被销毁，只是领不到新任务。
+
+        Args:
+            limit: 并发任务数上限
+            source: 上限来源，多个来源同时设置时取最小值
+        """
+        with self._slot_released:
+            self._worker_limits[source] = max(1, limit)
+            self._worker_limit = min(self._worker_limits.values())
+            # 上限提高时唤醒所有等待中的提交线程
+            self._slot_released.notify_all()
 
     def get_resource_usage(self) -> Dict[str, Any]:
-        """获取资源使用情况"""
-        with self._lock:
-            return {
-                'active_tasks': self._active_tasks,
-                'estimated_memory_usage_mb': self._memory_usage,
-                'cpu_percent': psutil.cpu_percent(interval=0.1),
-                'memory_percent': psutil.virtual_memory().percent
-            }
+        """获取资源使用情况（只读快照，不获取锁）"""
+        return {
+            'active_tasks': self._active_tasks,
+            'worker_limit': self._worker_limit,
+            'estimated_memory_usage_mb': self._memory_usage,
+            'cpu_percent': psutil.cpu_percent(interval=None),
+            'memory_percent': self._virtual_memory().percent
+        }
+
+
+class AdaptiveWorkerController:
+    """
+    根据阻塞系数动态调整并发任务数
+
+    阻塞系数 β = 1 - t_cpu / t_wall：β 越高说明任务越多时间在等待
+    I/O 或子进程（如 ffmpeg），可以用更多线程把 CPU 填满；
+    β 很低时任务主要在执行 Python 代码，增加线程只会争抢 GIL。
+    """
+
+    def __init__(
+        self,
+        resource_manager: ResourceManager,
+        max_workers: int,
+        cpu_count: int,
+        interval: float = 0.5,
+        smoothing: float = 0.2,
+        hysteresis: int = 3,
+        gil_threshold: float = 0.3
+    ):
+        """
+        初始化控制器
+
+        Args:
+            resource_manager: 资源管理器（控制器通过它限制并发）
+            max_workers: 并发数上限（线程池大小）
+            cpu_count: 可用 CPU 数
+            interval: 调整周期（秒）
+            smoothing: β 的指数滑动平均系数
+            hysteresis: 连续多少次同方向判断才调整一次
+            gil_threshold: β 不高于该值时禁止增加并发
+        """
+        self.resource_manager = resource_manager
+        self.max_workers = max(1, max_workers)
+        self.cpu_count = max(1, cpu_count)
+        self.interval = interval
+        self.smoothing = smoothing
+        self.hysteresis = hysteresis
+        self.gil_threshold = gil_threshold
+
+        self.beta: Optional[float] = None
+        self.limit = min(self.max_workers, self.cpu_count)
+        self._samples = collections.deque(maxlen=256)
+        self._vote_direction = 0
+        self._vote_count = 0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.resource_manager.set_worker_limit(self.limit, source='adaptive')
+
+    def record(self, cpu_ns: int, wall_ns: int) -> None:
+        """
+        记录一个任务的 CPU 时间和墙钟时间（纳秒）
+
+        Args:
+            cpu_ns: 任务线程消耗的 CPU 时间
+            wall_ns: 任务墙钟耗时
+        """
+        self._samples.append((cpu_ns, wall_ns))
+
+    def adjust(self) -> int:
+        """
+        根据新采样调整一次并发上限
+
+        Returns:
+            调整后的并发上限
+        """
+        current = self.limit
+
+        samples = []
+        while self._samples:
+            samples.append(self._samples.popleft())
+
+        total_wall = sum(wall for _, wall in samples)
+        if total_wall <= 0:
+            return current
+
+        blocked = sum(max(0, wall - cpu) for cpu, wall in samples)
+        beta_sample = blocked / total_wall
+        if self.beta is None:
+            self.beta = beta_sample
+        else:
+            self.beta = self.smoothing * beta_sample + (1 - self.smoothing) * self.beta
+
+        # 理想线程数 N = CPU 数 / (1 - β)
+        target = self.cpu_count / max(1.0 - self.beta, 1.0 / self.max_workers)
+        target = min(self.max_workers, max(1, math.ceil(target)))
+
+        direction = (target > current) - (target < current)
+        if direction > 0 and self.beta <= self.gil_threshold:
+            # 任务以 CPU 为主时增加线程只会加剧 GIL 竞争
+            direction = 0
+
+        if direction == 0 or direction != self._vote_direction:
+            self._vote_direction = direction
+            self._vote_count = 1 if direction else 0
+        else:
+            self._vote_count += 1
+
+        if direction and self._vote_count >= self.hysteresis:
+            self.limit = current + direction
+            self._vote_count = 0
+            self.resource_manager.set_worker_limit(self.limit, source='adaptive')
+
+        return self.limit
+
+    def start(self) -> None:
+        """启动控制线程"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run,
+            name="AdaptiveWorkerController",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止控制线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        """控制循环"""
+        while not self._stop_event.wait(self.interval):
+            self.adjust()
+
+
+class FriendlyPoolController:
+    """
+    按本进程实际分到的 CPU 份额调整并发任务数
+
+    与 ffmpeg 或其他视频进程共享 CPU 时，本进程的份额下降，
+    并发上限随之降低，避免过度订阅；份额恢复后再放开。
+    线程池线程不会销毁，超出上限的线程只是暂停领取任务。
+    """
+
+    def __init__(
+        self,
+        resource_manager: ResourceManager,
+        max_workers: int,
+        cpu_count: int,
+        overcommit_factor: float = 1.0,
+        interval: float = 0.1
+    ):
+        """
+        初始化控制器
+
+        Args:
+            resource_manager: 资源管理器（控制器通过它限制并发）
+            max_workers: 并发数上限（线程池大小）
+            cpu_count: 可用 CPU 数
+            overcommit_factor: 超额订阅系数 O
+            interval: 采样周期（秒）
+        """
+        self.resource_manager = resource_manager
+        self.max_workers = max(1, max_workers)
+        self.cpu_count = max(1, cpu_count)
+        self.overcommit_factor = overcommit_factor
+        self.interval = interval
+
+        self.limit = self.max_workers
+        self._process = psutil.Process()
+        self._last_times: Optional[Tuple[float, float]] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _read_cpu_times(self) -> Tuple[float, float]:
+        """读取本进程和整个系统累计的 CPU 时间（秒）"""
+        own = self._process.cpu_times()
+        total = psutil.cpu_times()
+        return own.user + own.system, total.user + total.system
+
+    def update(self, own_delta: float, total_delta: float) -> int:
+        """
+        根据一个采样周期内的 CPU 时间增量更新并发上限
+
+        desired = O * (本进程 CPU 时间 / 全系统 CPU 时间) * CPU 数
+
+        Args:
+            own_delta: 本进程 CPU 时间增量
+            total_delta: 全系统 CPU 时间增量
+
+        Returns:
+            更新后的并发上限
+        """
+        if total_delta <= 0:
+            return self.limit
+
+        share = min(1.0, own_delta / total_delta)
+        desired = round(self.overcommit_factor * share * self.cpu_count)
+        desired = min(self.max_workers, max(1, desired))
+
+        if desired != self.limit:
+            self.limit = desired
+            self.resource_manager.set_worker_limit(desired, source='friendly')
+
+        return self.limit
+
+    def sample(self) -> int:
+        """采样一次 CPU 时间并更新并发上限"""
+        current = self._read_cpu_times()
+        previous, self._last_times = self._last_times, current
+        if previous is None:
+            return self.limit
+        return self.update(current[0] - previous[0], current[1] - previous[1])
+
+    def start(self) -> None:
+        """启动控制线程"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run,
+            name="FriendlyPoolController",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止控制线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        """控制循环"""
+        self.sample()
+        while not self._stop_event.wait(self.interval):
+            self.sample()
 
 
 class ParallelBatchProcessor:
@@ -113,7 +489,8 @@ class ParallelBatchProcessor:
         self,
         task_queue: TaskQueue,
         config: Dict[str, Any],
-        video_generator: Optional[Callable] = None
+        video_generator: Optional[Callable] = None,
+        context_factory: Optional[Callable[[], Any]] = None
     ):
         """
         初始化并行批处理器
@@ -121,12 +498,23 @@ class ParallelBatchProcessor:
         Args:
             task_queue: 任务队列
             config: 配置字典
-            video_generator: 视频生成函数
+            video_generator: 视频生成函数，以 video_generator(task) 调用；
+                设置了 context_factory 时额外传入 ctx=ctx，
+                配置了 frame_pool_size 时额外传入 frame_pool=FramePool
+            context_factory: 创建工作线程上下文的函数（如已加载的模型、字体缓存）。
+                每个工作线程只创建一次并在该线程处理的所有任务间复用，
+                关闭处理器时调用上下文的 close() 方法（如果有）
         """
         self.task_queue = task_queue
         self.config = config
         self.video_generator = video_generator
 
+        # 工作线程上下文
+        self.context_factory = context_factory
+        self._worker_local = threading.local()
+        self._worker_contexts: List[Any] = []
+        self._contexts_lock = threading.Lock()
+
         # 资源管理
         self.resource_manager = ResourceManager(config)
         self.max_workers = self.resource_manager.calculate_optimal_workers()
@@ -139,6 +527,63 @@ class ParallelBatchProcessor:
         self.retry_on_error = threading_config.get('retry_on_error', True)
         self.retry_times = threading_config.get('retry_times', 3)
         self.save_logs = threading_config.get('save_logs', True)
+        # 每个工作线程的帧缓冲池大小，0 表示不向生成器提供缓冲池
+        self.frame_pool_size = threading_config.get('frame_pool_size', 0)
+
+        # 日志
+        self.logger = setup_logger("parallel_batch_processor", config.get('log_level', 'INFO'))
+
+        # CPU 密集型生成器交给进程池执行，线程池只负责调度和状态更新。
+        # 进程在这里一次性 fork 完成，此时还没有启动任何工作线程
+        self.cpu_executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._use_cpu_executor = False
+        self._process_probe: Optional[Dict[str, int]] = None
+        use_processes = threading_config.get('use_processes', False)
+        if use_processes and self.video_generator is not None:
+            if 'fork' not in multiprocessing.get_all_start_methods():
+                self.logger.warning("当前平台不支持 fork，视频生成仍在线程中执行")
+            else:
+                self.cpu_executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('fork'),
+                    initializer=_init_generator_process,
+                    initargs=(self.video_generator, self.context_factory, self.frame_pool_size)
+                )
+                self.cpu_executor.submit(int).result()
+
+                if use_processes == 'auto':
+                    # 先在线程中执行，根据前几个任务的 CPU 占用决定是否切换到进程池
+                    self._process_probe = {
+                        'tasks': 0,
+                        'cpu_ns': 0,
+                        'start_ns': 0,
+                        'sample_size': threading_config.get('process_probe_tasks', max(2, self.max_workers))
+                    }
+                else:
+                    self._use_cpu_executor = True
+
+        # 自适应并发：线程池按上限创建，实际并发数由控制器调整
+        self.worker_controller: Optional[AdaptiveWorkerController] = None
+        if threading_config.get('adaptive_workers', False):
+            self.worker_controller = AdaptiveWorkerController(
+                self.resource_manager,
+                self.max_workers,
+                psutil.cpu_count(logical=True),
+                interval=threading_config.get('adaptive_interval', 0.5)
+            )
+            self.worker_controller.start()
+
+        # 与其他进程共享 CPU 时按本进程分到的份额收缩并发
+        self.friendly_controller: Optional[FriendlyPoolController] = None
+        if threading_config.get('friendly_pool', False):
+            self.friendly_controller = FriendlyPoolController(
+                self.resource_manager,
+                self.max_workers,
+                psutil.cpu_count(logical=True),
+                overcommit_factor=threading_config.get('overcommit_factor', 1.0),
+                interval=threading_config.get('friendly_interval', 0.1)
+            )
+            self.friendly_controller.start()
 
         # 线程池
         self.executor = concurrent.futures.ThreadPoolExecutor(
@@ -146,10 +591,28 @@ class ParallelBatchProcessor:
             thread_name_prefix="VideoWorker"
         )
 
-        # 日志和监控
-        self.logger = setup_logger("parallel_batch_processor", config.get('log_level', 'INFO'))
+        # 监控
         self._shutdown_event = threading.Event()
 
+        # 错误日志由单独的后台线程写入，工作线程失败后不等待磁盘 I/O
+        self._log_queue: Optional[queue.Queue] = None
+        self._log_thread: Optional[threading.Thread] = None
+        # 日志目录在写入线程第一次写入时创建
+        self._log_dir = Path("output/logs")
+        self._log_dir_ready = False
+        if self.save_logs:
+            self._log_queue = queue.Queue(maxsize=threading_config.get('error_log_queue_size', 1024))
+            self._log_thread = threading.Thread(
+                target=self._log_writer_loop,
+                name="ErrorLogWriter",
+                daemon=True
+            )
+            self._log_thread.start()
+
+        # 正在执行任务的工作线程数
+        self._active_workers = 0
+        self._active_workers_lock = threading.Lock()
+
         # 统计信息
         self.stats = {
             'total_processed': 0,
@@ -200,38 +663,45 @@ class ParallelBatchProcessor:
             'start_time': datetime.now(),
             'peak_memory_usage': 0
         })
+        self.resource_manager.reset_peak_memory_usage()
 
-        # 提交任务到线程池
-        future_to_task = {}
-        for task in tasks:
+        # 提交任务到线程池，future 上记录任务及其在结果列表中的位置
+        futures = []
+        for index, task in enumerate(tasks):
             if self._shutdown_event.is_set():
                 break
 
-            # 等待资源可用
-            while not self.resource_manager.can_start_task():
-                time.sleep(0.1)
+            # 等待资源可用：任务完成时被唤醒，超时只用于检查关闭信号和内存变化
+            while not self.resource_manager.wait_for_slot(timeout=1.0):
                 if self._shutdown_event.is_set():
                     break
+            if self._shutdown_event.is_set():
+                break
 
             future = self.executor.submit(self._process_single_task, task)
-            future_to_task[future] = task
-
-        # 收集结果
-        results = []
+            # 任务一结束就释放槽位，后续任务无需等到结果收集阶段
+            future.add_done_callback(lambda _: self.resource_manager.task_completed())
+            future.task = task
+            future.index = index
+            futures.append(future)
+
+        # 收集结果：按提交顺序写入预分配的位置
+        results: List[Optional[TaskResult]] = [None] * len(futures)
         completed_count = 0
+        progress_step = max(1, len(tasks) // 10)
 
-        with ProgressTracker(len(future_to_task), "并行处理视频任务") as progress:
-            for future in concurrent.futures.as_completed(future_to_task):
+        with ProgressTracker(len(futures), "并行处理视频任务") as progress:
+            for future in concurrent.futures.as_completed(futures):
                 if self._shutdown_event.is_set():
                     future.cancel()
                     continue
 
-                task = future_to_task[future]
+                task = future.task
                 task_start_time = time.time()
 
                 try:
                     task_result = future.result(timeout=self.task_timeout)
-                    results.append(task_result)
+                    results[future.index] = task_result
 
                     if task_result.success:
                         self.stats['successful'] += 1
@@ -253,13 +723,13 @@ class ParallelBatchProcessor:
                         duration=time.time() - task_start_time,
                         error_message=error_msg
                     )
-                    results.append(task_result)
+                    results[future.index] = task_result
                     self.stats['failed'] += 1
 
                 except Exception as e:
                     error_msg = str(e)
-                    self.logger.error(f"任务执行异常: {task.task_id} - {error_msg}")
-                    self.logger.error(traceback.format_exc())
+                    # 堆栈只在日志实际输出时才格式化
+                    self.logger.error(f"任务执行异常: {task.task_id} - {error_msg}", exc_info=True)
 
                     task_result = TaskResult(
                         task_id=task.task_id,
@@ -267,29 +737,24 @@ class ParallelBatchProcessor:
                         duration=time.time() - task_start_time,
                         error_message=error_msg
                     )
-                    results.append(task_result)
+                    results[future.index] = task_result
                     self.stats['failed'] += 1
 
                 self.stats['total_processed'] += 1
-
-                # 更新资源使用情况
-                resource_usage = self.resource_manager.get_resource_usage()
-                self.stats['peak_memory_usage'] = max(
-                    self.stats['peak_memory_usage'],
-                    resource_usage['estimated_memory_usage_mb']
-                )
-
-                # 释放资源
-                self.resource_manager.task_completed()
-
                 completed_count += 1
                 progress.update(1)
 
                 # 定期记录进度
-                if completed_count % max(1, len(tasks) // 10) == 0:
+                if completed_count % progress_step == 0:
                     self._log_progress(completed_count, len(tasks), time.time() - start_time)
 
+        # 延迟写入模式下，批次结束时把状态变更落盘
+        self.task_queue.flush()
+        if self._log_queue is not None and not self._shutdown_event.is_set():
+            self._log_queue.join()
+
         # 计算最终统计信息
+        self.stats['peak_memory_usage'] = self.resource_manager.peak_memory_usage
         end_time = time.time()
         total_duration = end_time - start_time
 
@@ -301,7 +766,8 @@ class ParallelBatchProcessor:
             average_task_duration=total_duration / len(tasks) if tasks else 0.0,
             throughput=len(tasks) / total_duration if total_duration > 0 else 0.0,
             peak_memory_usage=self.stats['peak_memory_usage'],
-            results=results
+            # 关闭时被取消的任务没有结果
+            results=[result for result in results if result is not None]
         )
 
         self.stats['end_time'] = datetime.now()
@@ -324,6 +790,65 @@ class ParallelBatchProcessor:
         """
         处理单个视频任务
 
+        Args:
+            task: VideoTask对象
+
+        Returns:
+            任务结果
+        """
+        with self._active_workers_lock:
+            self._active_workers += 1
+            if self._process_probe is not None and not self._process_probe['start_ns']:
+                self._process_probe['start_ns'] = time.perf_counter_ns()
+
+        # 记录线程 CPU 时间与墙钟时间，供控制器估算阻塞系数
+        cpu_start = time.thread_time_ns()
+        wall_start = time.perf_counter_ns()
+        in_thread = not self._use_cpu_executor
+        try:
+            return self._execute_task(task)
+        finally:
+            cpu_ns = time.thread_time_ns() - cpu_start
+            if self.worker_controller is not None:
+                self.worker_controller.record(cpu_ns, time.perf_counter_ns() - wall_start)
+            with self._active_workers_lock:
+                self._active_workers -= 1
+                if in_thread and self._process_probe is not None:
+                    self._update_process_probe(cpu_ns)
+
+    def _update_process_probe(self, cpu_ns: int) -> None:
+        """
+        use_processes 为 auto 时，根据线程中执行的任务决定是否切换到进程池（调用方需持有锁）
+
+        工作线程合计占用接近一个 CPU 核心说明生成器被 GIL 限制在单核上，
+        交给进程池才能真正并行；明显低于一个核心说明主要在等待 I/O 或子进程，
+        继续使用线程即可。
+
+        Args:
+            cpu_ns: 刚完成任务的线程 CPU 时间
+        """
+        probe = self._process_probe
+        probe['tasks'] += 1
+        probe['cpu_ns'] += cpu_ns
+        if probe['tasks'] < probe['sample_size']:
+            return
+
+        self._process_probe = None
+        elapsed_ns = max(1, time.perf_counter_ns() - probe['start_ns'])
+        cores_used = probe['cpu_ns'] / elapsed_ns
+
+        if cores_used >= 0.8 and self.max_workers > 1:
+            self._use_cpu_executor = True
+            self.logger.info(f"生成器受 GIL 限制 (线程占用 {cores_used:.2f} 核)，后续任务改用进程池执行")
+        else:
+            self.logger.info(f"生成器以等待为主 (线程占用 {cores_used:.2f} 核)，继续使用线程池")
+            self.cpu_executor.shutdown(wait=False)
+            self.cpu_executor = None
+
+    def _execute_task(self, task: VideoTask) -> TaskResult:
+        """
+        执行单个视频任务（含重试）
+
         Args:
             task: VideoTask对象
 
@@ -333,7 +858,8 @@ class ParallelBatchProcessor:
         task_start_time = time.time()
 
         try:
-            self.logger.debug(f"开始处理任务: {task.task_id}")
+            # 每个任务都会执行的日志使用 %s 参数，级别未启用时不做格式化
+            self.logger.debug("开始处理任务: %s", task.task_id)
 
             # 更新状态为处理中
             self.task_queue.update_task_status(task.task_id, TaskStatus.PROCESSING)
@@ -345,7 +871,10 @@ class ParallelBatchProcessor:
                 try:
                     # 调用视频生成器
                     if self.video_generator:
-                        result = self.video_generator(task)
+                        if self._use_cpu_executor:
+                            result = self.cpu_executor.submit(_run_generator_in_process, task).result()
+                        else:
+                            result = self.video_generator(task, **self._generator_kwargs())
 
                         # 更新任务状态为完成
                         self.task_queue.update_task_status(
@@ -355,7 +884,7 @@ class ParallelBatchProcessor:
                         )
 
                         duration = time.time() - task_start_time
-                        self.logger.debug(f"任务完成: {task.task_id} ({duration:.2f}s)")
+                        self.logger.debug("任务完成: %s (%.2fs)", task.task_id, duration)
 
                         return TaskResult(
                             task_id=task.task_id,
@@ -370,7 +899,9 @@ class ParallelBatchProcessor:
                     retry_count += 1
                     error_msg = str(e)
 
-                    self.logger.warning(f"任务失败 ({retry_count}/{max_retries}): {task.task_id} - {error_msg}")
+                    self.logger.warning(
+                        "任务失败 (%d/%d): %s - %s", retry_count, max_retries, task.task_id, error_msg
+                    )
 
                     if retry_count >= max_retries:
                         # 达到最大重试次数，标记为失败
@@ -382,7 +913,7 @@ class ParallelBatchProcessor:
 
                         # 保存错误日志
                         if self.save_logs:
-                            self._save_error_log(task, error_msg)
+                            self._save_error_log(task, error_msg, e)
 
                         duration = time.time() - task_start_time
                         return TaskResult(
@@ -394,8 +925,7 @@ class ParallelBatchProcessor:
 
         except Exception as e:
             error_msg = f"任务处理异常: {str(e)}"
-            self.logger.error(f"任务异常: {task.task_id} - {error_msg}")
-            self.logger.error(traceback.format_exc())
+            self.logger.error(f"任务异常: {task.task_id} - {error_msg}", exc_info=True)
 
             duration = time.time() - task_start_time
             return TaskResult(
@@ -405,6 +935,42 @@ class ParallelBatchProcessor:
                 error_message=error_msg
             )
 
+    def _generator_kwargs(self) -> Dict[str, Any]:
+        """构造传给视频生成器的当前工作线程资源"""
+        kwargs = {}
+        if self.context_factory is not None:
+            kwargs['ctx'] = self._get_worker_context()
+        if self.frame_pool_size > 0:
+            frame_pool = getattr(self._worker_local, 'frame_pool', None)
+            if frame_pool is None:
+                frame_pool = FramePool(self.frame_pool_size)
+                self._worker_local.frame_pool = frame_pool
+            kwargs['frame_pool'] = frame_pool
+        return kwargs
+
+    def _get_worker_context(self) -> Any:
+        """获取当前工作线程的上下文，首次调用时创建"""
+        context = getattr(self._worker_local, 'context', None)
+        if context is None:
+            context = self.context_factory()
+            self._worker_local.context = context
+            with self._contexts_lock:
+                self._worker_contexts.append(context)
+        return context
+
+    def _close_worker_contexts(self) -> None:
+        """关闭所有工作线程上下文"""
+        with self._contexts_lock:
+            contexts, self._worker_contexts = self._worker_contexts, []
+
+        for context in contexts:
+            close = getattr(context, 'close', None)
+            if callable(close):
+                try:
+                    close()
+                except Exception as e:
+                    self.logger.warning(f"关闭工作线程上下文失败: {e}")
+
     def _log_progress(self, completed: int, total: int, elapsed: float) -> None:
         """记录处理进度"""
         if total == 0:
@@ -420,29 +986,79 @@ class ParallelBatchProcessor:
             f"耗时: {elapsed:.1f}s | 预计剩余: {estimated_remaining:.1f}s"
         )
 
-    def _save_error_log(self, task: VideoTask, error_msg: str) -> None:
+    def _save_error_log(
+        self,
+        task: VideoTask,
+        error_msg: str,
+        error: Optional[BaseException] = None
+    ) -> None:
         """
-        保存错误日志
+        提交错误日志，由后台线程写入文件
+
+        队列已满时丢弃该条日志并记录警告，不阻塞工作线程
 
         Args:
             task: 任务对象
             error_msg: 错误信息
+            error: 异常对象，用于格式化堆栈跟踪
         """
-        log_dir = Path("output/logs")
-        log_dir.mkdir(parents=True, exist_ok=True)
+        if self._log_queue is None:
+            return
 
-        log_file = log_dir / f"error_{task.task_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+        try:
+            self._log_queue.put_nowait((task, error_msg, error, time.time()))
+        except queue.Full:
+            self.logger.warning("错误日志队列已满，丢弃日志: %s - %s", task.task_id, error_msg)
+
+    def _log_writer_loop(self) -> None:
+        """后台写入错误日志，收到 None 时退出"""
+        while True:
+            item = self._log_queue.get()
+            try:
+                if item is None:
+                    return
+                self._write_error_log(*item)
+            finally:
+                self._log_queue.task_done()
+
+    def _write_error_log(
+        self,
+        task: VideoTask,
+        error_msg: str,
+        error: Optional[BaseException],
+        failed_at: float
+    ) -> None:
+        """
+        将一条错误日志写入文件
+
+        Args:
+            task: 任务对象
+            error_msg: 错误信息
+            error: 异常对象，用于格式化堆栈跟踪
+            failed_at: 任务失败的时间戳
+        """
+        if error is not None:
+            stack_trace = ''.join(traceback.format_exception(type(error), error, error.__traceback__))
+        else:
+            stack_trace = "无"
+
+        local_time = time.localtime(failed_at)
+        log_file = self._log_dir / f"error_{task.task_id}_{time.strftime('%Y%m%d_%H%M%S', local_time)}.log"
 
         try:
+            if not self._log_dir_ready:
+                self._log_dir.mkdir(parents=True, exist_ok=True)
+                self._log_dir_ready = True
+
             with open(log_file, 'w', encoding='utf-8') as f:
-                f.write(f"任务ID: {task.task_id}\\n")
-                f.write(f"时间: {datetime.now().isoformat()}\\n")
-                f.write(f"脚本路径: {task.script_path}\\n")
-                f.write(f"素材目录: {task.materials_dir}\\n")
-                f.write(f"输出路径: {task.output_path}\\n")
-                f.write(f"配置覆盖: {task.config_override}\\n")
-                f.write(f"\\n错误信息:\\n{error_msg}\\n")
-                f.write(f"\\n堆栈跟踪:\\n{traceback.format_exc()}\\n")
+                f.write(f"任务ID: {task.task_id}\n")
+                f.write(f"时间: {time.strftime('%Y-%m-%dT%H:%M:%S', local_time)}\n")
+                f.write(f"脚本路径: {task.script_path}\n")
+                f.write(f"素材目录: {task.materials_dir}\n")
+                f.write(f"输出路径: {task.output_path}\n")
+                f.write(f"配置覆盖: {task.config_override}\n")
+                f.write(f"\n错误信息:\n{error_msg}\n")
+                f.write(f"\n堆栈跟踪:\n{stack_trace}\n")
 
             self.logger.info(f"错误日志已保存: {log_file}")
         except Exception as e:
@@ -455,7 +1071,7 @@ class ParallelBatchProcessor:
         return {
             'thread_pool': {
                 'max_workers': self.max_workers,
-                'active_threads': len([t for t in threading.enumerate() if t.name.startswith('VideoWorker')])
+                'active_threads': self._active_workers
             },
             'resource_usage': resource_usage,
             'processing_stats': self.stats.copy(),
@@ -472,8 +1088,26 @@ class ParallelBatchProcessor:
 
         self._shutdown_event.set()
 
+        if self.worker_controller is not None:
+            self.worker_controller.stop()
+        if self.friendly_controller is not None:
+            self.friendly_controller.stop()
+
         # 关闭线程池
         self.executor.shutdown(wait=wait)
+        if self.cpu_executor is not None:
+            self.cpu_executor.shutdown(wait=wait)
+        self.task_queue.flush()
+
+        # 写完已提交的错误日志后再退出写入线程
+        if self._log_thread is not None and self._log_thread.is_alive():
+            self._log_queue.put(None)
+            if wait:
+                self._log_thread.join()
+
+        # 不等待时工作线程可能仍在使用上下文，此时不关闭
+        if wait:
+            self._close_worker_contexts()
 
         self.logger.info("并行批处理器已关闭")
 
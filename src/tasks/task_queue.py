@@ -3,11 +3,24 @@
 """
 
 from dataclasses import dataclass, field
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from enum import Enum
 from datetime import datetime
 from pathlib import Path
+import atexit
 import json
+import os
+import sys
+import threading
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Python 3.10+ 用 __slots__ 存储字段：实例没有 __dict__，更省内存、属性访问更快
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
 
 
 class TaskStatus(Enum):
@@ -19,7 +32,11 @@ class TaskStatus(Enum):
     CANCELLED = "cancelled"
 
 
-@dataclass
+# 结束状态：任务不会再被处理
+_TERMINAL_STATUSES = (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED)
+
+
+@dataclass(**_SLOTS)
 class VideoTask:
     """视频生成任务"""
 
@@ -85,19 +102,49 @@ class VideoTask:
 class TaskQueue:
     """任务队列类"""
 
-    def __init__(self, persistence_file: Optional[str] = None):
+    def __init__(
+        self,
+        persistence_file: Optional[str] = None,
+        flush_interval: Optional[float] = None,
+        persistence_dir: Optional[str] = None,
+        compact_threshold: int = 10000
+    ):
         """
         初始化任务队列
 
         Args:
-            persistence_file: 持久化文件路径
+            persistence_file: 持久化文件路径，每次写入保存全部任务
+            flush_interval: 延迟写入间隔（秒）。设置后状态变更只标记为待写入，
+                由后台线程合并写入，需要落盘时调用 flush()；为 None 时每次变更立即写入
+            persistence_dir: 分片持久化目录，与 persistence_file 二选一。
+                未结束的任务写入 active.json，结束的任务追加到 archive.jsonl，
+                每次写入的数据量只与未结束和刚结束的任务数有关
+            compact_threshold: archive.jsonl 超过该行数时重写归档，去掉重复记录
         """
+        if persistence_file and persistence_dir:
+            raise ValueError("persistence_file 和 persistence_dir 只能设置一个")
+
         self.tasks: Dict[str, VideoTask] = {}
+        # 按状态索引任务ID（dict 作为有序集合，保持添加顺序），查询时无需扫描全部任务
+        self._by_status: Dict[TaskStatus, Dict[str, None]] = {status: {} for status in TaskStatus}
         self.persistence_file = Path(persistence_file) if persistence_file else None
+        self.persistence_dir = Path(persistence_dir) if persistence_dir else None
+        self.flush_interval = flush_interval
+        self.compact_threshold = compact_threshold
+
+        self._dirty = threading.Event()
+        self._closed = threading.Event()
+        self._write_lock = threading.Lock()
+        self._writer_thread: Optional[threading.Thread] = None
+
+        # 分片模式下等待追加到归档的任务，以及归档是否需要重写
+        self._archive_lock = threading.Lock()
+        self._archive_ids: Dict[str, None] = {}
+        self._archive_lines = 0
+        self._compact_archive = False
 
         # 加载已保存的任务
-        if self.persistence_file and self.persistence_file.exists():
-            self.load_tasks()
+        self.load_tasks()
 
     def add_task(self, task: VideoTask) -> None:
         """
@@ -106,7 +153,14 @@ class TaskQueue:
         Args:
             task: VideoTask对象
         """
+        previous = self.tasks.get(task.task_id)
+        if previous is not None:
+            self._by_status[previous.status].pop(task.task_id, None)
+
         self.tasks[task.task_id] = task
+        self._by_status[task.status][task.task_id] = None
+        if task.status in _TERMINAL_STATUSES:
+            self._mark_archived(task.task_id)
         self._save_tasks()
 
     def get_task(self, task_id: str) -> Optional[VideoTask]:
@@ -137,17 +191,57 @@ class TaskQueue:
             error_message: 错误信息
             result: 结果数据
         """
+        if self._apply_status(task_id, status, error_message, result):
+            self._save_tasks()
+
+    def update_many(self, updates: List[Tuple[str, TaskStatus, Dict[str, Any]]]) -> None:
+        """
+        批量更新任务状态，只写入一次持久化文件
+
+        Args:
+            updates: (任务ID, 新状态, 其他参数) 列表，其他参数同 update_task_status
+        """
+        changed = False
+        for task_id, status, kwargs in updates:
+            changed |= self._apply_status(task_id, status, **kwargs)
+
+        if changed:
+            self._save_tasks()
+
+    def _apply_status(
+        self,
+        task_id: str,
+        status: TaskStatus,
+        error_message: Optional[str] = None,
+        result: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        在内存中更新任务状态（不保存）
+
+        Args:
+            task_id: 任务ID
+            status: 新状态
+            error_message: 错误信息
+            result: 结果数据
+
+        Returns:
+            任务是否存在
+        """
         task = self.tasks.get(task_id)
         if not task:
-            return
+            return False
 
+        if task.status != status:
+            self._by_status[task.status].pop(task_id, None)
+            self._by_status[status][task_id] = None
         task.status = status
 
         if status == TaskStatus.PROCESSING and not task.started_at:
             task.started_at = datetime.now()
 
-        if status in [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED]:
+        if status in _TERMINAL_STATUSES:
             task.completed_at = datetime.now()
+            self._mark_archived(task_id)
 
         if error_message:
             task.error_message = error_message
@@ -155,7 +249,7 @@ class TaskQueue:
         if result:
             task.result = result
 
-        self._save_tasks()
+        return True
 
     def get_pending_tasks(self) -> List[VideoTask]:
         """
@@ -164,10 +258,7 @@ class TaskQueue:
         Returns:
             VideoTask列表
         """
-        return [
-            task for task in self.tasks.values()
-            if task.status == TaskStatus.PENDING
-        ]
+        return self.get_tasks_by_status(TaskStatus.PENDING)
 
     def get_tasks_by_status(self, status: TaskStatus) -> List[VideoTask]:
         """
@@ -179,10 +270,9 @@ class TaskQueue:
         Returns:
             VideoTask列表
         """
-        return [
-            task for task in self.tasks.values()
-            if task.status == status
-        ]
+        # 先复制ID列表，其他线程同时更新状态时不影响遍历
+        tasks = (self.tasks.get(task_id) for task_id in list(self._by_status[status]))
+        return [task for task in tasks if task is not None]
 
     def cancel_task(self, task_id: str) -> bool:
         """
@@ -208,14 +298,20 @@ class TaskQueue:
         Returns:
             清除的任务数量
         """
-        completed_ids = [
-            task_id for task_id, task in self.tasks.items()
-            if task.status in [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED]
-        ]
+        completed_ids = []
+        for status in _TERMINAL_STATUSES:
+            completed_ids.extend(self._by_status[status])
+            self._by_status[status] = {}
 
         for task_id in completed_ids:
             del self.tasks[task_id]
 
+        # 被清除的任务也要从归档中删掉
+        if self.persistence_dir:
+            with self._archive_lock:
+                self._archive_ids = {}
+                self._compact_archive = True
+
         self._save_tasks()
 
         return len(completed_ids)
@@ -227,48 +323,230 @@ class TaskQueue:
         Returns:
             统计字典
         """
-        stats = {
-            'total': len(self.tasks),
-            'pending': 0,
-            'processing': 0,
-            'completed': 0,
-            'failed': 0,
-            'cancelled': 0
-        }
-
-        for task in self.tasks.values():
-            stats[task.status.value] += 1
+        stats = {'total': len(self.tasks)}
+        for status, task_ids in self._by_status.items():
+            stats[status.value] = len(task_ids)
 
         return stats
 
+    def flush(self) -> None:
+        """立即写入尚未保存的变更（延迟写入模式下使用）"""
+        if not (self.persistence_file or self.persistence_dir):
+            return
+
+        # 先取写锁：后台线程正在写入时等它完成，再判断是否还有未保存的变更
+        with self._write_lock:
+            if not self._dirty.is_set():
+                return
+            # 先清除标记：快照期间的新变更会重新标记，由下一轮写入
+            self._dirty.clear()
+            self._write_snapshot()
+
+    def close(self) -> None:
+        """
+        停止后台写入线程并写入剩余变更
+
+        延迟写入模式下进程退出时会自动调用，也可以在处理结束后显式调用。
+        """
+        self._closed.set()
+        writer = self._writer_thread
+        if writer is not None:
+            # 唤醒等待中的写入线程让它退出；原本没有待写入的变更时不额外写一次
+            pending = self._dirty.is_set()
+            while writer.is_alive():
+                self._dirty.set()
+                writer.join(0.05)
+            if not pending:
+                self._dirty.clear()
+            atexit.unregister(self.close)
+        self.flush()
+
     def _save_tasks(self) -> None:
         """保存任务到文件"""
-        if not self.persistence_file:
+        if not (self.persistence_file or self.persistence_dir):
+            return
+
+        if self.flush_interval is None or self._closed.is_set():
+            with self._write_lock:
+                self._write_snapshot()
             return
 
-        self.persistence_file.parent.mkdir(parents=True, exist_ok=True)
+        self._dirty.set()
+        if self._writer_thread is None:
+            with self._write_lock:
+                if self._writer_thread is None:
+                    self._writer_thread = threading.Thread(
+                        target=self._writer_loop,
+                        name="TaskQueueWriter",
+                        daemon=True
+                    )
+                    self._writer_thread.start()
+                    # 守护线程在解释器退出时会被直接终止，退出前先停止它并写完剩余变更
+                    atexit.register(self.close)
+
+    def _writer_loop(self) -> None:
+        """后台写入线程：把一个写入间隔内的所有变更合并成一次写入"""
+        while not self._closed.is_set():
+            self._dirty.wait()
+            if self._closed.is_set():
+                return
+            self._closed.wait(self.flush_interval)
+            self.flush()
+
+    def _mark_archived(self, task_id: str) -> None:
+        """分片模式下记录刚进入结束状态、需要追加到归档的任务"""
+        if self.persistence_dir:
+            with self._archive_lock:
+                self._archive_ids[task_id] = None
+
+    def _write_snapshot(self) -> None:
+        """把当前任务快照原子地写入持久化文件（调用方需持有写锁）"""
+        if self.persistence_dir:
+            self._write_shards()
+            return
 
         data = {
             task_id: task.to_dict()
-            for task_id, task in self.tasks.items()
+            for task_id, task in list(self.tasks.items())
         }
+        self._write_json(self.persistence_file, data)
+
+    def _write_shards(self) -> None:
+        """追加新结束的任务到归档，并重写未结束任务文件（调用方需持有写锁）"""
+        self.persistence_dir.mkdir(parents=True, exist_ok=True)
+
+        with self._archive_lock:
+            archive_ids, self._archive_ids = self._archive_ids, {}
+            compact, self._compact_archive = self._compact_archive, False
+
+        # 先写归档再写 active.json：中途中断时任务停留在旧状态，而不会丢失
+        archive_file = self.persistence_dir / 'archive.jsonl'
+        if compact or self._archive_lines + len(archive_ids) > self.compact_threshold:
+            terminal_ids = [
+                task_id
+                for status in _TERMINAL_STATUSES
+                for task_id in list(self._by_status[status])
+            ]
+            lines = self._archive_records(terminal_ids)
+            temp_file = archive_file.with_name(archive_file.name + '.tmp')
+            temp_file.write_bytes(b''.join(lines))
+            os.replace(temp_file, archive_file)
+            self._archive_lines = len(lines)
+        elif archive_ids:
+            lines = self._archive_records(archive_ids)
+            with open(archive_file, 'ab') as f:
+                f.write(b''.join(lines))
+            self._archive_lines += len(lines)
+
+        data = {}
+        for status in TaskStatus:
+            if status in _TERMINAL_STATUSES:
+                continue
+            for task_id in list(self._by_status[status]):
+                task = self.tasks.get(task_id)
+                if task is not None:
+                    data[task_id] = task.to_dict()
+        self._write_json(self.persistence_dir / 'active.json', data)
+
+    def _archive_records(self, task_ids) -> List[bytes]:
+        """
+        把仍处于结束状态的任务序列化为 JSONL 行
+
+        Args:
+            task_ids: 任务ID序列
 
-        with open(self.persistence_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        Returns:
+            每个任务一行的字节串列表
+        """
+        lines = []
+        for task_id in task_ids:
+            task = self.tasks.get(task_id)
+            if task is None or task.status not in _TERMINAL_STATUSES:
+                continue
+            if ORJSON_AVAILABLE:
+                lines.append(orjson.dumps(task.to_dict()) + b'\n')
+            else:
+                lines.append(json.dumps(task.to_dict(), ensure_ascii=False).encode('utf-8') + b'\n')
+        return lines
+
+    def _write_json(self, path: Path, data: Dict[str, Any]) -> None:
+        """
+        原子地写入 JSON 文件
+
+        Args:
+            path: 目标文件路径
+            data: 要写入的数据
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 先写临时文件再替换，写入中断时不会留下半个 JSON
+        temp_file = path.with_name(path.name + '.tmp')
+        if ORJSON_AVAILABLE:
+            temp_file.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        else:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(temp_file, path)
+
+    def _read_json(self, path: Path) -> Dict[str, Any]:
+        """读取 JSON 文件"""
+        if ORJSON_AVAILABLE:
+            return orjson.loads(path.read_bytes())
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _read_shards(self) -> Dict[str, Any]:
+        """
+        读取分片持久化目录
+
+        Returns:
+            任务ID到任务数据的字典，active.json 中的记录覆盖归档中的同一任务
+        """
+        data = {}
+        self._archive_lines = 0
+
+        archive_file = self.persistence_dir / 'archive.jsonl'
+        if archive_file.exists():
+            loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+            with open(archive_file, 'rb') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        task_data = loads(line)
+                    except ValueError:
+                        # 追加时中断留下的不完整行
+                        continue
+                    # 同一任务多次结束时以最后一条为准
+                    data[task_data['task_id']] = task_data
+                    self._archive_lines += 1
+
+        active_file = self.persistence_dir / 'active.json'
+        if active_file.exists():
+            data.update(self._read_json(active_file))
+
+        return data
 
     def load_tasks(self) -> None:
         """从文件加载任务"""
-        if not self.persistence_file or not self.persistence_file.exists():
+        if self.persistence_dir:
+            if not self.persistence_dir.exists():
+                return
+            data = self._read_shards()
+        elif self.persistence_file and self.persistence_file.exists():
+            data = self._read_json(self.persistence_file)
+        else:
             return
 
-        with open(self.persistence_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
         self.tasks = {
             task_id: VideoTask.from_dict(task_data)
             for task_id, task_data in data.items()
         }
 
+        self._by_status = {status: {} for status in TaskStatus}
+        for task_id, task in self.tasks.items():
+            self._by_status[task.status][task_id] = None
+
     def __len__(self) -> int:
         """返回任务总数"""
         return len(self.tasks)
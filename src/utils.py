@@ -6,10 +6,15 @@
 import os
 import re
 import logging
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 import colorlog
+import numpy as np
+
+# 文件名中不允许出现的字符
+_INVALID_FILENAME_CHARS = re.compile(r'[<>:"/\\|?*]')
 
 
 def setup_logger(name: str = "video_factory", level: str = "INFO") -> logging.Logger:
@@ -54,14 +59,8 @@ def sanitize_filename(filename: str) -> str:
     Returns:
         清理后的文件名
     """
-    # 移除非法字符
-    filename = re.sub(r'[<>:"/\\|?*]', '', filename)
-    # 替换空格为下划线
-    filename = filename.replace(' ', '_')
-    # 限制长度
-    if len(filename) > 200:
-        filename = filename[:200]
-    return filename
+    # 移除非法字符，替换空格为下划线，并限制长度
+    return _INVALID_FILENAME_CHARS.sub('', filename).replace(' ', '_')[:200]
 
 
 def generate_filename(title: str, pattern: str = "{title}_{timestamp}", ext: str = "mp4") -> str:
@@ -110,17 +109,21 @@ def get_files_by_extension(directory: Path, extensions: List[str]) -> List[Path]
     Returns:
         文件路径列表
     """
-    directory = Path(directory)
-    files = []
-
-    if not directory.exists():
-        return files
+    suffixes = tuple(ext.lower() for ext in extensions)
 
-    for ext in extensions:
-        files.extend(directory.glob(f"*{ext}"))
-        files.extend(directory.glob(f"*{ext.upper()}"))
+    # 单次遍历目录，扩展名不区分大小写
+    try:
+        with os.scandir(directory) as entries:
+            paths = [
+                entry.path for entry in entries
+                if entry.name.lower().endswith(suffixes) and entry.is_file()
+            ]
+    except (FileNotFoundError, NotADirectoryError):
+        return []
 
-    return sorted(files)
+    # 同一目录下按字符串排序与按 Path 排序结果相同，但快得多
+    paths.sort()
+    return [Path(path) for path in paths]
 
 
 def format_duration(seconds: float) -> str:
@@ -155,19 +158,22 @@ def split_text_by_length(text: str, max_chars: int) -> List[str]:
         分割后的文本列表
     """
     lines = []
-    words = text.split()
-    current_line = ""
-
-    for word in words:
-        if len(current_line) + len(word) + 1 <= max_chars:
-            current_line += word + " "
+    current_words = []
+    # 当前行长度（每个词按带一个空格计算）
+    current_length = 0
+
+    for word in text.split():
+        if current_length + len(word) + 1 <= max_chars:
+            current_words.append(word)
+            current_length += len(word) + 1
         else:
-            if current_line:
-                lines.append(current_line.strip())
-            current_line = word + " "
+            if current_words:
+                lines.append(" ".join(current_words))
+            current_words = [word]
+            current_length = len(word) + 1
 
-    if current_line:
-        lines.append(current_line.strip())
+    if current_words:
+        lines.append(" ".join(current_words))
 
     return lines
 
@@ -240,3 +246,79 @@ class ProgressTracker:
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
+
+
+class FramePool:
+    """
+    帧缓冲池
+
+    复用相同尺寸和格式的帧缓冲区，避免逐帧分配（及清零）几 MB 的数组。
+    取出的缓冲区内容未初始化，使用方需要完整写入。
+    """
+
+    # 像素格式 -> (通道数, 数据类型)，通道数为 None 表示单通道二维数组
+    FORMATS = {
+        'rgb24': (3, np.uint8),
+        'rgba': (4, np.uint8),
+        'gray': (None, np.uint8),
+        'rgb_float': (3, np.float32),
+    }
+
+    def __init__(self, max_buffers: int = 32):
+        """
+        初始化帧缓冲池
+
+        Args:
+            max_buffers: 池中最多保留的空闲缓冲区数量
+        """
+        self.max_buffers = max_buffers
+        self._free: Dict[Tuple[tuple, str], List[np.ndarray]] = {}
+        self._free_count = 0
+        self._lock = threading.Lock()
+
+    def get(self, width: int, height: int, fmt: str = 'rgb24') -> np.ndarray:
+        """
+        取出一个帧缓冲区
+
+        Args:
+            width: 宽度
+            height: 高度
+            fmt: 像素格式，见 FORMATS
+
+        Returns:
+            形状为 (height, width[, channels]) 的数组
+        """
+        channels, dtype = self.FORMATS[fmt]
+        shape = (height, width) if channels is None else (height, width, channels)
+        key = (shape, np.dtype(dtype).str)
+
+        with self._lock:
+            buffers = self._free.get(key)
+            if buffers:
+                self._free_count -= 1
+                return buffers.pop()
+
+        return np.empty(shape, dtype=dtype)
+
+    def put(self, buffer: np.ndarray) -> None:
+        """
+        归还帧缓冲区
+
+        Args:
+            buffer: 之前通过 get() 取出的数组（视图和非连续数组会被忽略）
+        """
+        if buffer.base is not None or not buffer.flags.c_contiguous:
+            return
+
+        key = (buffer.shape, buffer.dtype.str)
+        with self._lock:
+            if self._free_count >= self.max_buffers:
+                return
+            self._free.setdefault(key, []).append(buffer)
+            self._free_count += 1
+
+    def clear(self) -> None:
+        """释放所有空闲缓冲区"""
+        with self._lock:
+            self._free.clear()
+            self._free_count = 0
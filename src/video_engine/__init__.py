@@ -4,6 +4,6 @@
 """
 
 from .compositor import VideoCompositor
-from .effects import VideoEffects
+from .effects import VideoEffects, EffectPipeline
 
-__all__ = ['VideoCompositor', 'VideoEffects']
+__all__ = ['VideoCompositor', 'VideoEffects', 'EffectPipeline']
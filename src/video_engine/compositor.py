@@ -3,16 +3,309 @@
 整合所有元素生成最终视频
 """
 
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple, Union
+from functools import lru_cache
 from moviepy.editor import (
     VideoClip, ImageClip, AudioFileClip, CompositeVideoClip,
     concatenate_videoclips, ColorClip
 )
 import numpy as np
+from PIL import Image
+import concurrent.futures
+import io
+import json
+import os
 import platform
 import subprocess
 import re
+import threading
+
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+# PyAV 可选，用于不经过临时文件直接在内存中编码
+try:
+    import av
+    AV_AVAILABLE = True
+except ImportError:
+    AV_AVAILABLE = False
+
+# 没有 OpenCV 时用 Numba 编译的可分离 Lanczos 内核缩放
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# 预处理图片缓存的像素总字节数上限（约 40 张 1080p RGB 图片）
+IMAGE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# (路径, 修改时间, 文件大小, 分辨率) -> 只读像素数组，按最近使用排序
+_image_cache: 'OrderedDict[Tuple[str, int, int, Tuple[int, int]], np.ndarray]' = OrderedDict()
+_image_cache_bytes = 0
+_image_cache_lock = threading.Lock()
+
+# Lanczos 窗口半径，与 Pillow 的 LANCZOS 滤波器相同
+LANCZOS_SUPPORT = 3.0
+
+# NVIDIA NVENC 硬件编码器
+NVENC_CODECS = ('h264_nvenc', 'hevc_nvenc')
+
+# libx264 预设 -> NVENC 预设（p1 最快，p7 质量最好）
+NVENC_PRESETS = {
+    'ultrafast': 'p1',
+    'superfast': 'p1',
+    'veryfast': 'p2',
+    'faster': 'p3',
+    'fast': 'p3',
+    'medium': 'p4',
+    'slow': 'p5',
+    'slower': 'p6',
+    'veryslow': 'p7',
+}
+
+
+@lru_cache(maxsize=512)
+def _lanczos_taps(src_size: int, dst_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    计算一维 Lanczos 缩放的采样位置和权重
+
+    采样点与 Pillow 一致：输出像素 i 的中心映射到 (i + 0.5) * scale，
+    缩小时按比例放宽窗口，超出边界的采样点被丢弃后重新归一化。
+
+    Args:
+        src_size: 源长度
+        dst_size: 目标长度
+
+    Returns:
+        (起始下标 (dst_size,) int32, 权重 (dst_size, 采样数) float32)
+    """
+    scale = src_size / dst_size
+    filter_scale = max(scale, 1.0)
+    support = LANCZOS_SUPPORT * filter_scale
+    # 源长度小于窗口时只需覆盖全部源像素，保证采样下标不越界
+    taps = min(int(np.ceil(support)) * 2 + 1, src_size)
+
+    centers = (np.arange(dst_size) + 0.5) * scale
+    starts = np.clip(np.floor(centers - support + 0.5).astype(np.int32), 0, src_size - taps)
+    positions = starts[:, None] + np.arange(taps)
+    x = (positions + 0.5 - centers[:, None]) / filter_scale
+
+    weights = np.sinc(x) * np.sinc(x / LANCZOS_SUPPORT)
+    weights[np.abs(x) >= LANCZOS_SUPPORT] = 0.0
+    weights /= weights.sum(axis=1, keepdims=True)
+
+    return starts, np.ascontiguousarray(weights, dtype=np.float32)
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _resize_separable(
+        src: np.ndarray,
+        x_starts: np.ndarray,
+        x_weights: np.ndarray,
+        y_starts: np.ndarray,
+        y_weights: np.ndarray
+    ) -> np.ndarray:
+        """
+        先水平后垂直两次一维卷积完成缩放
+
+        Args:
+            src: 源图像 (H, W, C) uint8，需为连续内存
+            x_starts, x_weights: 水平方向的采样起点和权重
+            y_starts, y_weights: 垂直方向的采样起点和权重
+
+        Returns:
+            缩放后的图像 (dst_h, dst_w, C) uint8
+        """
+        src_h, src_w, channels = src.shape
+        dst_w, x_taps = x_weights.shape
+        dst_h, y_taps = y_weights.shape
+        row_size = dst_w * channels
+
+        lines = src.reshape((src_h, src_w * channels))
+
+        # 水平方向：每个源行独立计算
+        horizontal = np.empty((src_h, row_size), dtype=np.float32)
+        for row in prange(src_h):
+            line = lines[row]
+            for i in range(dst_w):
+                base = x_starts[i] * channels
+                for c in range(channels):
+                    acc = np.float32(0.0)
+                    for k in range(x_taps):
+                        acc += x_weights[i, k] * line[base + k * channels + c]
+                    # 与 Pillow 相同，中间结果按 8 位取整截断
+                    horizontal[row, i * channels + c] = np.floor(min(max(acc + 0.5, 0.0), 255.0))
+
+        # 垂直方向：按整行累加，内层循环是连续内存
+        out = np.empty((dst_h, row_size), dtype=np.uint8)
+        for j in prange(dst_h):
+            acc = np.zeros(row_size, dtype=np.float32)
+            start = y_starts[j]
+            for k in range(y_taps):
+                weight = y_weights[j, k]
+                for idx in range(row_size):
+                    acc[idx] += weight * horizontal[start + k, idx]
+            for idx in range(row_size):
+                out[j, idx] = np.uint8(min(max(acc[idx] + 0.5, 0.0), 255.0))
+        return out.reshape((dst_h, dst_w, channels))
+
+
+def _prepare_image(path: str, resolution: Tuple[int, int]) -> np.ndarray:
+    """
+    获取缩放到目标分辨率的图片，同一文件和分辨率的结果在进程内复用
+
+    文件修改时间和大小参与缓存键，文件被替换后会重新解码。
+    缓存按像素数据总字节数限制（IMAGE_CACHE_MAX_BYTES），超出时淘汰最久未用的图片。
+    返回的数组为只读，多个片段共享同一份像素。
+
+    Args:
+        path: 图片路径
+        resolution: 目标分辨率 (宽, 高)
+
+    Returns:
+        (高, 宽, 3) 或 (高, 宽, 4) 的只读 uint8 数组
+    """
+    global _image_cache_bytes
+
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size, tuple(resolution))
+    with _image_cache_lock:
+        image = _image_cache.get(key)
+        if image is not None:
+            _image_cache.move_to_end(key)
+            return image
+
+    image = _load_image(path, key[3])
+    image.flags.writeable = False
+
+    with _image_cache_lock:
+        if key not in _image_cache and image.nbytes <= IMAGE_CACHE_MAX_BYTES:
+            _image_cache[key] = image
+            _image_cache_bytes += image.nbytes
+            while _image_cache_bytes > IMAGE_CACHE_MAX_BYTES:
+                _, evicted = _image_cache.popitem(last=False)
+                _image_cache_bytes -= evicted.nbytes
+    return image
+
+
+def _load_image(path: str, resolution: Tuple[int, int]) -> np.ndarray:
+    """
+    解码图片并缩放到目标分辨率
+
+    JPEG 在解码阶段按 1/2、1/4、1/8 直接缩小（不小于目标尺寸），
+    大尺寸照片只需解码和缩放少得多的像素。
+
+    Args:
+        path: 图片路径
+        resolution: 目标分辨率 (宽, 高)，与 ImageClip.resize 一样不保持宽高比
+
+    Returns:
+        (高, 宽, 3) 或带透明通道的 (高, 宽, 4) uint8 数组
+    """
+    with Image.open(path) as img:
+        has_alpha = img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info)
+        mode = 'RGBA' if has_alpha else 'RGB'
+        img.draft(mode, resolution)
+        img = img.convert(mode)
+
+        if img.size == resolution:
+            return np.asarray(img)
+
+        if CV2_AVAILABLE:
+            # 缩小用区域插值，放大用 Lanczos
+            shrinking = img.width >= resolution[0] and img.height >= resolution[1]
+            interpolation = cv2.INTER_AREA if shrinking else cv2.INTER_LANCZOS4
+            return cv2.resize(np.asarray(img), resolution, interpolation=interpolation)
+
+        return np.asarray(img.resize(resolution, Image.Resampling.LANCZOS))
+
+
+def _zoom_crop_rects(
+    size: Tuple[int, int],
+    duration: float,
+    fps: float,
+    zoom_factor: float,
+    center: Tuple[float, float]
+) -> np.ndarray:
+    """
+    计算缩放效果每一帧的裁剪区域
+
+    缩放倍数随时间线性变化，裁剪框的截断和边界约束一次性向量化完成。
+
+    Args:
+        size: 帧尺寸 (宽, 高)
+        duration: 片段时长
+        fps: 帧率
+        zoom_factor: 结束时的缩放倍数
+        center: 缩放中心点（归一化坐标）
+
+    Returns:
+        (帧数, 4) int32 数组，每行为 x1, y1, x2, y2
+    """
+    w, h = size
+    times = np.arange(int(np.ceil(duration * fps)) + 1) / fps
+    current_zoom = 1 + (zoom_factor - 1) * (times / duration)
+
+    # 缩放中心
+    cx = int(w * center[0])
+    cy = int(h * center[1])
+
+    # 裁剪区域
+    new_w = (w / current_zoom).astype(np.int32)
+    new_h = (h / current_zoom).astype(np.int32)
+
+    x1 = np.maximum(0, cx - new_w // 2)
+    y1 = np.maximum(0, cy - new_h // 2)
+    x2 = np.minimum(w, x1 + new_w)
+    y2 = np.minimum(h, y1 + new_h)
+
+    return np.stack([x1, y1, x2, y2], axis=1).astype(np.int32)
+
+
+def _to_av_frame(frame: np.ndarray) -> 'av.VideoFrame':
+    """
+    把 MoviePy 输出的帧包装为 PyAV 视频帧
+
+    连续的 RGB uint8 帧直接借用 numpy 缓冲区（from_numpy_buffer 不拷贝），
+    后续 rgb24 -> yuv420p 转换从这块内存读取；带透明通道或非连续的帧
+    先整理为连续数组，只拷贝一次。
+
+    Args:
+        frame: (高, 宽, 3) 或 (高, 宽, 4) 的帧
+
+    Returns:
+        rgb24 格式的 av.VideoFrame
+    """
+    if frame.ndim == 3 and frame.shape[2] == 4:
+        frame = frame[:, :, :3]
+    frame = np.ascontiguousarray(frame, dtype=np.uint8)
+    return av.VideoFrame.from_numpy_buffer(frame, format='rgb24')
+
+
+def _parse_bitrate(bitrate: Union[str, int]) -> int:
+    """
+    把 FFmpeg 风格的码率（如 5000k、8M）转换为比特每秒
+
+    Args:
+        bitrate: 码率字符串或整数
+
+    Returns:
+        比特每秒
+    """
+    if isinstance(bitrate, int):
+        return bitrate
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([kKmM]?)\s*', bitrate)
+    if match is None:
+        raise ValueError(f"无法解析码率: {bitrate}")
+    value, unit = match.groups()
+    return int(float(value) * {'': 1, 'k': 1000, 'm': 1000000}[unit.lower()])
 
 
 class VideoCompositor:
@@ -31,6 +324,12 @@ class VideoCompositor:
         self.codec = config.get('codec', 'libx264')
         self.bitrate = config.get('bitrate', '5000k')
         self.background_color = config.get('background_color', [0, 0, 0])
+        # libx264 调优参数，如 stillimage（以静态画面为主的幻灯片）、film、animation
+        self.tune = config.get('tune')
+        # 附加的 libx264 参数，如幻灯片可用 "rc-lookahead=10:scenecut=0:keyint=250"
+        self.x264_params = config.get('x264_params')
+        # libx264 编码线程数，未配置时按 CPU 核数取 4-16
+        self.threads = config.get('threads') or max(4, min(os.cpu_count() or 4, 16))
 
         # Check hardware codec availability
         self._videotoolbox_available = self._check_videotoolbox_support()
@@ -93,12 +392,19 @@ class VideoCompositor:
         else:
             adjusted_image_duration = image_duration
 
-        for img_path in images:
-            # 加载图片
-            clip = ImageClip(str(img_path))
+        # 加载图片并一次性缩放到输出分辨率；解码和缩放都会释放 GIL，多张图片用线程并行
+        def prepare(img_path):
+            return _prepare_image(str(img_path), self.resolution)
+
+        max_workers = min(len(images), os.cpu_count() or 1)
+        if max_workers <= 1:
+            prepared = [prepare(img_path) for img_path in images]
+        else:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                prepared = list(executor.map(prepare, images))
 
-            # 调整大小
-            clip = clip.resize(self.resolution)
+        for image in prepared:
+            clip = ImageClip(image)
 
             # 设置持续时间
             clip = clip.set_duration(adjusted_image_duration)
@@ -161,21 +467,121 @@ class VideoCompositor:
         if not video_clips:
             raise ValueError("视频片段列表不能为空")
 
-        # 调整所有片段的分辨率
+        # 调整所有片段的分辨率，尺寸已经一致的片段不再逐帧缩放
         clips = []
         for clip in video_clips:
-            resized_clip = clip.resize(self.resolution)
-            clips.append(resized_clip)
+            if tuple(clip.size) != self.resolution:
+                clip = clip.resize(self.resolution)
+            clips.append(clip)
 
-        # 拼接视频
-        if transition == "cut":
-            final_video = concatenate_videoclips(clips)
+        # 拼接视频：片段已统一分辨率，只有淡入淡出（片段带透明蒙版）需要逐帧合成，
+        # 其余情况直接按时间取对应片段的帧
+        if transition == "fade":
+            final_video = concatenate_videoclips(clips, method="compose")
         else:
             # 其他转场效果可以在这里添加
-            final_video = concatenate_videoclips(clips, method="compose")
+            final_video = concatenate_videoclips(clips)
 
         return final_video.set_fps(self.fps)
 
+    def concat_video_files(
+        self,
+        video_paths: List[str],
+        output_path: str
+    ) -> Path:
+        """
+        按顺序直接拼接多个视频文件（无转场）
+
+        所有文件的流参数一致时用 FFmpeg concat 分离器复制码流，不解码也不重新编码；
+        否则回退到 MoviePy 解码拼接后重新编码。
+
+        Args:
+            video_paths: 视频文件路径列表
+            output_path: 输出文件路径
+
+        Returns:
+            输出文件路径
+        """
+        if not video_paths:
+            raise ValueError("视频文件列表不能为空")
+
+        import logging
+        logger = logging.getLogger(__name__)
+
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+
+        params = [self._probe_stream_params(str(path)) for path in video_paths]
+        if params[0] is not None and all(p == params[0] for p in params):
+            if self._concat_stream_copy(video_paths, output_path):
+                return output_path
+            logger.warning("码流复制拼接失败，改为重新编码")
+        else:
+            logger.info("视频流参数不一致，改为重新编码拼接")
+
+        from moviepy.editor import VideoFileClip
+
+        clips = [VideoFileClip(str(path)) for path in video_paths]
+        try:
+            return self.render_video(self.create_video_from_clips(clips), str(output_path))
+        finally:
+            for clip in clips:
+                clip.close()
+
+    def _probe_stream_params(self, video_path: str) -> Optional[tuple]:
+        """
+        用 ffprobe 读取决定能否直接复制码流拼接的流参数
+
+        Args:
+            video_path: 视频文件路径
+
+        Returns:
+            各流 (类型, 编码, 宽, 高, 像素格式, 帧率, 采样率, 声道数) 组成的元组，读取失败返回 None
+        """
+        try:
+            result = subprocess.run(
+                ['ffprobe', '-v', 'error', '-show_entries',
+                 'stream=codec_type,codec_name,width,height,pix_fmt,r_frame_rate,sample_rate,channels',
+                 '-of', 'json', video_path],
+                capture_output=True, text=True, timeout=30
+            )
+            if result.returncode != 0:
+                return None
+            streams = json.loads(result.stdout).get('streams', [])
+        except (subprocess.TimeoutExpired, subprocess.SubprocessError, FileNotFoundError, ValueError):
+            return None
+
+        keys = ('codec_type', 'codec_name', 'width', 'height', 'pix_fmt', 'r_frame_rate', 'sample_rate', 'channels')
+        return tuple(tuple(stream.get(key) for key in keys) for stream in streams) or None
+
+    def _concat_stream_copy(self, video_paths: List[str], output_path: Path) -> bool:
+        """
+        用 FFmpeg concat 分离器复制码流拼接
+
+        Args:
+            video_paths: 视频文件路径列表
+            output_path: 输出文件路径
+
+        Returns:
+            是否成功
+        """
+        list_path = output_path.with_name(output_path.name + '.concat.txt')
+        # concat 列表中单引号需要转义为 '\''
+        lines = ["file '{}'".format(str(Path(path).resolve()).replace("'", "'\\''")) for path in video_paths]
+        list_path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+        try:
+            result = subprocess.run(
+                ['ffmpeg', '-y', '-v', 'error', '-f', 'concat', '-safe', '0',
+                 '-i', str(list_path), '-c', 'copy', str(output_path)],
+                capture_output=True, text=True
+            )
+            return result.returncode == 0
+        except (subprocess.SubprocessError, FileNotFoundError):
+            return False
+        finally:
+            list_path.unlink(missing_ok=True)
+
     def create_background_video(
         self,
         duration: float,
@@ -255,64 +661,251 @@ class VideoCompositor:
         if center is None:
             center = (0.5, 0.5)
 
+        # 裁剪区域只取决于帧尺寸和时间，按帧尺寸一次算出整段的轨迹，
+        # 渲染时按合成器帧率取最近一帧的裁剪区域
+        crop_tables = {}
+
         def zoom(get_frame, t):
             frame = get_frame(t)
             h, w = frame.shape[:2]
 
-            # 计算缩放
-            progress = t / clip.duration
-            current_zoom = 1 + (zoom_factor - 1) * progress
-
-            # 缩放中心
-            cx = int(w * center[0])
-            cy = int(h * center[1])
-
-            # 裁剪区域
-            new_w = int(w / current_zoom)
-            new_h = int(h / current_zoom)
-
-            x1 = max(0, cx - new_w // 2)
-            y1 = max(0, cy - new_h // 2)
-            x2 = min(w, x1 + new_w)
-            y2 = min(h, y1 + new_h)
+            crop_rects = crop_tables.get((h, w))
+            if crop_rects is None:
+                crop_rects = crop_tables[(h, w)] = _zoom_crop_rects(
+                    (w, h), clip.duration, self.fps, zoom_factor, center
+                )
+            x1, y1, x2, y2 = crop_rects[min(int(round(t * self.fps)), len(crop_rects) - 1)]
 
             # 裁剪并缩放
             cropped = frame[y1:y2, x1:x2]
 
+            if CV2_AVAILABLE:
+                # 直接在 ndarray 上缩放，不经过 PIL 对象转换
+                return cv2.resize(np.ascontiguousarray(cropped), (w, h), interpolation=cv2.INTER_LANCZOS4)
+
+            if NUMBA_AVAILABLE and cropped.ndim == 3:
+                # 同一尺寸对的采样权重只计算一次，跨帧、跨片段复用
+                x_starts, x_weights = _lanczos_taps(cropped.shape[1], w)
+                y_starts, y_weights = _lanczos_taps(cropped.shape[0], h)
+                return _resize_separable(np.ascontiguousarray(cropped), x_starts, x_weights, y_starts, y_weights)
+
             from PIL import Image
             img = Image.fromarray(cropped)
             img = img.resize((w, h), Image.Resampling.LANCZOS)
 
-            return np.array(img)
+            return np.asarray(img)
 
         return clip.fl(zoom)
 
-    def render_video(
+    def _encode_with_av(
+        self,
+        video_clip: VideoClip,
+        target: Union[str, io.BytesIO],
+        preset: str,
+        crf: int,
+        audio_fps: int,
+        codec: str = 'libx264',
+        bitrate: Optional[str] = None,
+        tune: Optional[str] = None,
+        x264_params: Optional[str] = None,
+        threads: Optional[int] = None
+    ) -> None:
+        """
+        用 PyAV 把片段编码为 MP4（视频 + AAC）
+
+        Args:
+            video_clip: 视频片段
+            target: 输出文件路径或可写的文件对象
+            preset: libx264/libx265 编码预设
+            crf: libx264/libx265 质量参数，越小质量越高；指定 bitrate 时不使用
+            audio_fps: 音频采样率
+            codec: 视频编码器
+            bitrate: 视频码率，如 5000k
+            tune: libx264/libx265 调优参数
+            x264_params: libx264 附加参数
+            threads: 编码线程数，为 None 时由编码器决定
+        """
+        if not AV_AVAILABLE:
+            raise RuntimeError("PyAV 渲染需要安装 PyAV: pip install av")
+
+        with av.open(target, mode='w', format='mp4') as container:
+            # 所有流都要在写入第一个数据包前创建
+            video_stream = container.add_stream(codec, rate=self.fps)
+            video_stream.width, video_stream.height = video_clip.size
+            video_stream.pix_fmt = 'yuv420p'
+            if threads:
+                video_stream.codec_context.thread_count = threads
+            if bitrate:
+                video_stream.bit_rate = _parse_bitrate(bitrate)
+
+            options = {}
+            if codec in ('libx264', 'libx265'):
+                options['preset'] = preset
+                if not bitrate:
+                    options['crf'] = str(crf)
+                if tune:
+                    options['tune'] = tune
+            if codec == 'libx264' and x264_params:
+                options['x264-params'] = x264_params
+            video_stream.options = options
+
+            audio_stream = None
+            if video_clip.audio is not None:
+                channels = video_clip.audio.nchannels
+                audio_stream = container.add_stream('aac', rate=audio_fps)
+                audio_stream.layout = 'stereo' if channels == 2 else 'mono'
+
+            for frame in video_clip.iter_frames(fps=self.fps, dtype='uint8'):
+                container.mux(video_stream.encode(_to_av_frame(frame)))
+            container.mux(video_stream.encode(None))
+
+            if audio_stream is not None:
+                samples_written = 0
+                for chunk in video_clip.audio.iter_chunks(fps=audio_fps, chunksize=audio_fps, quantize=False):
+                    # (采样数, 声道数) -> 平面格式 (声道数, 采样数)
+                    planar = np.ascontiguousarray(np.asarray(chunk, dtype=np.float32).reshape(-1, channels).T)
+                    audio_frame = av.AudioFrame.from_ndarray(planar, format='fltp', layout=audio_stream.layout.name)
+                    audio_frame.sample_rate = audio_fps
+                    audio_frame.pts = samples_written
+                    samples_written += planar.shape[1]
+                    container.mux(audio_stream.encode(audio_frame))
+                container.mux(audio_stream.encode(None))
+
+    def _av_encoder_kwargs(
+        self,
+        tune: Optional[str] = None,
+        x264_params: Optional[str] = None,
+        threads: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        PyAV 编码使用的编码器参数（取自配置，参数优先）
+
+        PyAV 中没有的编码器（如硬件编码器）回退到 libx264，
+        与 render_video 写文件时的软件编码回退一致。
+
+        Args:
+            tune: 调优参数，为 None 时使用配置中的 tune
+            x264_params: libx264 附加参数，为 None 时使用配置中的 x264_params
+            threads: 编码线程数，为 None 时使用配置中的线程数
+
+        Returns:
+            传给 _encode_with_av 的关键字参数
+        """
+        import logging
+
+        codec = self.codec
+        if AV_AVAILABLE and codec not in av.codecs_available:
+            logging.getLogger(__name__).warning("PyAV 不支持编码器 %s，改用 libx264", codec)
+            codec = 'libx264'
+        return {
+            'codec': codec,
+            'bitrate': self.bitrate,
+            'tune': tune or self.tune,
+            'x264_params': x264_params or self.x264_params,
+            'threads': threads or self.threads,
+        }
+
+    def render_to_bytes(self, video_clip: VideoClip, preset: str = "ultrafast") -> bytes:
+        """
+        在内存中编码 MP4，不写临时文件
+
+        等同于 render_video 输出到 BytesIO，编码配置和行为与之相同（编码后关闭片段）。
+
+        Args:
+            video_clip: 视频片段
+            preset: 编码预设
+
+        Returns:
+            MP4 文件内容
+        """
+        buffer = io.BytesIO()
+        self.render_video(video_clip, buffer, preset=preset)
+        return buffer.getvalue()
+
+    def render_stream(
         self,
         video_clip: VideoClip,
         output_path: str,
-        preset: str = "medium"
+        preset: str = "medium",
+        crf: int = 23,
+        audio_fps: int = 44100
     ) -> Path:
         """
-        渲染并导出视频，支持硬件编码失败时的软件编码回退
+        用 PyAV 在进程内直接编码到文件
+
+        帧不经过 FFmpeg 子进程的 stdin 管道，省去每帧的 tobytes 拷贝和管道传输。
+
+        编码器、码率、tune、x264_params 和线程数与 render_video 一样取自配置。
 
         Args:
             video_clip: 视频片段
-            output_path: 输出路径
-            preset: 编码预设 (ultrafast, fast, medium, slow, veryslow)
+            output_path: 输出文件路径
+            preset: libx264/libx265 编码预设
+            crf: libx264/libx265 质量参数，只在未配置码率时使用
+            audio_fps: 音频采样率
 
         Returns:
             输出文件路径
         """
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        self._encode_with_av(video_clip, str(output_path), preset, crf, audio_fps, **self._av_encoder_kwargs())
+        return output_path
+
+    def render_video(
+        self,
+        video_clip: VideoClip,
+        output_path: Union[str, io.BytesIO],
+        preset: str = "medium",
+        tune: Optional[str] = None,
+        x264_params: Optional[str] = None,
+        threads: Optional[int] = None
+    ) -> Union[Path, io.BytesIO]:
+        """
+        渲染并导出视频，支持硬件编码失败时的软件编码回退
+
+        Args:
+            video_clip: 视频片段
+            output_path: 输出路径；传入 BytesIO 时用 PyAV 在内存中编码并写入其中
+            preset: 编码预设 (ultrafast, fast, medium, slow, veryslow)，
+                NVENC 编码时映射为对应的 p1-p7 预设
+            tune: libx264 调优参数，为 None 时使用配置中的 tune
+            x264_params: 传给 -x264-params 的参数，为 None 时使用配置中的 x264_params
+            threads: libx264 编码线程数，为 None 时使用配置或按 CPU 核数自动决定
+
+        Returns:
+            输出文件路径（输出到 BytesIO 时返回该对象）
+        """
         import logging
         logger = logging.getLogger(__name__)
 
+        if isinstance(output_path, io.BytesIO):
+            # 直接编码进调用方的缓冲区
+            self._encode_with_av(
+                video_clip, output_path, preset, 23, 44100,
+                **self._av_encoder_kwargs(tune, x264_params, threads)
+            )
+            try:
+                video_clip.close()
+            except (OSError, AttributeError) as e:
+                logger.warning("关闭视频片段失败: %s", e)
+            return output_path
+
         output_path = Path(output_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
 
         # 检测是否使用硬件编码器
         is_hardware_codec = self._is_hardware_codec_available(self.codec)
 
+        software_params = ['-preset', preset]
+        tune = tune or self.tune
+        if tune:
+            software_params += ['-tune', tune]
+        # -x264-params 只有 libx264 认识，其他软件编码器不传
+        x264_params = x264_params or self.x264_params
+        x264_software_params = software_params + (['-x264-params', x264_params] if x264_params else [])
+        threads = threads or self.threads
+
         # 尝试硬件编码，如果失败则回退到软件编码
         encoding_attempts = []
 
@@ -321,20 +914,20 @@ class VideoCompositor:
             encoding_attempts.append({
                 'codec': self.codec,
                 'description': f'hardware encoding ({self.codec})',
-                'ffmpeg_params': self._get_hardware_encoding_params(self.codec)
+                'ffmpeg_params': self._get_hardware_encoding_params(self.codec, preset)
             })
             # 软件编码回退
             encoding_attempts.append({
                 'codec': 'libx264',
                 'description': 'software encoding (libx264)',
-                'ffmpeg_params': ['-preset', preset]
+                'ffmpeg_params': x264_software_params
             })
         else:
             # 软件编码
             encoding_attempts.append({
                 'codec': self.codec,
                 'description': f'software encoding ({self.codec})',
-                'ffmpeg_params': ['-preset', preset]
+                'ffmpeg_params': x264_software_params if self.codec == 'libx264' else software_params
             })
 
         last_error = None
@@ -356,7 +949,7 @@ class VideoCompositor:
                     bitrate=self.bitrate,
                     ffmpeg_params=ffmpeg_params,
                     logger=None,
-                    threads=4 if attempt['codec'] == 'libx264' else 1,  # Limit threads for hardware codecs
+                    threads=threads if attempt['codec'] == 'libx264' else 1,  # Limit threads for hardware codecs
                     write_logfile=False,  # Disable FFmpeg log file to prevent pipe issues
                     verbose=False
                 )
@@ -409,17 +1002,17 @@ class VideoCompositor:
         """Check if hardware codec is available"""
         if codec == 'h264_videotoolbox':
             return self._videotoolbox_available
-        elif codec == 'h264_nvenc':
-            return self._check_nvenc_support()
+        elif codec in NVENC_CODECS:
+            return self._check_nvenc_support(codec)
         elif codec == 'h264_qsv':
             return self._check_qsv_support()
         return False
 
-    def _check_nvenc_support(self) -> bool:
+    def _check_nvenc_support(self, codec: str = 'h264_nvenc') -> bool:
         """Check NVIDIA NVENC availability"""
         try:
             result = subprocess.run(['ffmpeg', '-encoders'], capture_output=True, text=True, timeout=10)
-            return 'h264_nvenc' in result.stdout
+            return codec in result.stdout
         except:
             return False
 
@@ -431,12 +1024,13 @@ class VideoCompositor:
         except:
             return False
 
-    def _get_hardware_encoding_params(self, codec: str) -> list:
+    def _get_hardware_encoding_params(self, codec: str, preset: str = "medium") -> list:
         """
         获取硬件编码器的FFmpeg参数
 
         Args:
             codec: 编码器名称
+            preset: libx264 风格的编码预设，NVENC 编码时换算为 p1-p7
 
         Returns:
             FFmpeg参数列表
@@ -449,10 +1043,14 @@ class VideoCompositor:
                 '-movflags', '+faststart',  # 优化progressive下载
                 '-max_muxing_queue_size', '1024'  # 增加mux队列避免管道问题
             ]
-        elif codec == 'h264_nvenc':
+        elif codec in NVENC_CODECS:
             # NVIDIA NVENC 硬件编码器参数
+            nvenc_preset = NVENC_PRESETS.get(preset, 'p4')  # NVENC preset (p1-p7)
+            if codec == 'hevc_nvenc':
+                # HEVC 使用编码器默认的 main profile
+                return ['-preset', nvenc_preset, '-pix_fmt', 'yuv420p']
             return [
-                '-preset', 'p4',  # NVENC preset (p1-p7)
+                '-preset', nvenc_preset,
                 '-profile:v', 'high',
                 '-level', '4.0',
                 '-pix_fmt', 'yuv420p'
@@ -7,6 +7,264 @@ from typing import Callable, Tuple
 from moviepy.editor import VideoClip
 import numpy as np
 
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+# Numba 可选，用于把逐像素特效编译为单次遍历的并行内核
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# 灰度权重 (0.299, 0.587, 0.114) 的 8 位定点近似，三者之和为 256
+GRAY_WEIGHTS = (77, 150, 29)
+
+# EffectPipeline 融合内核中的逐像素操作编码
+_OP_LUT = 0
+_OP_GRAY = 1
+_OP_SEPIA = 2
+_OP_MASK = 3
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _gray_frame(frame: np.ndarray) -> np.ndarray:
+        """
+        一次遍历把 RGB(A) 帧转换为三通道灰度帧
+
+        Args:
+            frame: 输入帧 (H, W, C) uint8，C >= 3
+
+        Returns:
+            灰度帧 (H, W, 3) uint8
+        """
+        height, width = frame.shape[0], frame.shape[1]
+        out = np.empty((height, width, 3), dtype=np.uint8)
+        for i in prange(height):
+            for j in range(width):
+                gray = np.uint8((
+                    GRAY_WEIGHTS[0] * np.int32(frame[i, j, 0])
+                    + GRAY_WEIGHTS[1] * np.int32(frame[i, j, 1])
+                    + GRAY_WEIGHTS[2] * np.int32(frame[i, j, 2])
+                ) >> 8)
+                out[i, j, 0] = gray
+                out[i, j, 1] = gray
+                out[i, j, 2] = gray
+        return out
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _apply_mask(frame: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        """
+        按 8 位定点蒙版逐像素缩放帧: out = frame * mask >> 8
+
+        Args:
+            frame: 输入帧 (H, W, C) uint8
+            mask: 蒙版 (H, W) uint16，256 表示保持原值
+
+        Returns:
+            结果帧 (H, W, C) uint8
+        """
+        height, width, channels = frame.shape
+        out = np.empty((height, width, channels), dtype=np.uint8)
+        for i in prange(height):
+            for j in range(width):
+                m = np.uint32(mask[i, j])
+                for c in range(channels):
+                    out[i, j, c] = np.uint8((np.uint32(frame[i, j, c]) * m) >> 8)
+        return out
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _fused_pixel_ops(
+        frame: np.ndarray,
+        ops: np.ndarray,
+        params: np.ndarray,
+        luts: np.ndarray,
+        masks: np.ndarray,
+        sepia: np.ndarray
+    ) -> np.ndarray:
+        """
+        每个像素只读写一次，依次在寄存器中完成全部逐像素操作
+
+        每步结果都按 8 位截断，与逐个应用效果的结果一致。
+
+        Args:
+            frame: 输入帧 (H, W, 3) uint8
+            ops: 操作编码 (N,) int32，取值见 _OP_*
+            params: 每个操作对应的查找表或蒙版下标 (N,) int32
+            luts: 查找表 (L, 256) uint8
+            masks: 8 位定点蒙版 (M, H, W) uint16
+            sepia: 怀旧色调矩阵 (3, 3) float32
+
+        Returns:
+            结果帧 (H, W, 3) uint8
+        """
+        height, width = frame.shape[0], frame.shape[1]
+        out = np.empty((height, width, 3), dtype=np.uint8)
+        for i in prange(height):
+            for j in range(width):
+                r = np.int32(frame[i, j, 0])
+                g = np.int32(frame[i, j, 1])
+                b = np.int32(frame[i, j, 2])
+                for k in range(ops.shape[0]):
+                    op = ops[k]
+                    if op == _OP_LUT:
+                        lut = luts[params[k]]
+                        r = np.int32(lut[r])
+                        g = np.int32(lut[g])
+                        b = np.int32(lut[b])
+                    elif op == _OP_GRAY:
+                        r = (GRAY_WEIGHTS[0] * r + GRAY_WEIGHTS[1] * g + GRAY_WEIGHTS[2] * b) >> 8
+                        g = r
+                        b = r
+                    elif op == _OP_SEPIA:
+                        nr = sepia[0, 0] * r + sepia[0, 1] * g + sepia[0, 2] * b
+                        ng = sepia[1, 0] * r + sepia[1, 1] * g + sepia[1, 2] * b
+                        nb = sepia[2, 0] * r + sepia[2, 1] * g + sepia[2, 2] * b
+                        r = np.int32(min(nr + 0.5, 255.0))
+                        g = np.int32(min(ng + 0.5, 255.0))
+                        b = np.int32(min(nb + 0.5, 255.0))
+                    else:
+                        m = np.int32(masks[params[k], i, j])
+                        r = (r * m) >> 8
+                        g = (g * m) >> 8
+                        b = (b * m) >> 8
+                out[i, j, 0] = np.uint8(r)
+                out[i, j, 1] = np.uint8(g)
+                out[i, j, 2] = np.uint8(b)
+        return out
+
+
+# 对比度调整估计帧均值时采样的像素数
+CONTRAST_MEAN_SAMPLES = 16384
+
+# 怀旧色调矩阵（每行对应一个输出通道）
+SEPIA_MATRIX = np.array([
+    [0.393, 0.769, 0.189],
+    [0.349, 0.686, 0.168],
+    [0.272, 0.534, 0.131]
+], dtype=np.float32)
+
+
+def _apply_lut(frame: np.ndarray, lut: np.ndarray) -> np.ndarray:
+    """
+    用 256 项查找表逐像素映射帧
+
+    Args:
+        frame: 输入帧，像素值为 0-255 的整数
+        lut: 查找表 (256,) uint8
+
+    Returns:
+        映射后的 uint8 帧
+    """
+    if frame.dtype != np.uint8:
+        frame = frame.astype(np.uint8)
+    if CV2_AVAILABLE:
+        return cv2.LUT(frame, lut)
+    return lut[frame]
+
+
+def _flip(frame: np.ndarray, flip_code: int) -> np.ndarray:
+    """
+    翻转帧并返回 C 连续的新数组
+
+    np.fliplr 只返回负步长视图，后续 cv2 效果或编码器写入时
+    还要再做一次逐元素的跨步拷贝；cv2.flip 一次写出连续结果。
+
+    Args:
+        frame: 输入帧
+        flip_code: 1 为水平翻转，0 为垂直翻转
+
+    Returns:
+        翻转后的帧
+    """
+    if CV2_AVAILABLE and frame.dtype == np.uint8:
+        return cv2.flip(frame, flip_code)
+    if flip_code == 1:
+        return np.ascontiguousarray(frame[:, ::-1])
+    return np.ascontiguousarray(frame[::-1])
+
+
+def _memoize_static_frames(effect: Callable[[np.ndarray], np.ndarray]) -> Callable:
+    """
+    把与时间无关的逐帧效果包装为 clip.fl 函数，源帧不变时复用上一次的结果
+
+    幻灯片等静态画面每帧返回同一个只读数组，这时整个效果计算可以跳过。
+    只读数组不会被原地修改，按对象身份判断即可；缓存的结果同样设为只读，
+    串联的下一个效果也能命中缓存。可写的源帧每次都重新计算，只保留一帧结果。
+
+    Args:
+        effect: 帧 -> 帧 的效果函数
+
+    Returns:
+        供 clip.fl 使用的 (get_frame, t) -> 帧 函数
+    """
+    # (源帧, 结果)，整体替换，读取时不会拿到不配对的两项
+    cache = (None, None)
+
+    def memoized(get_frame, t):
+        nonlocal cache
+        frame = get_frame(t)
+        cached_frame, cached_result = cache
+        if frame is cached_frame:
+            return cached_result
+
+        result = effect(frame)
+        if isinstance(frame, np.ndarray) and not frame.flags.writeable:
+            result.flags.writeable = False
+            cache = (frame, result)
+        else:
+            cache = (None, None)
+        return result
+
+    return memoized
+
+
+def _vignette_mask(h: int, w: int, strength: float) -> np.ndarray:
+    """
+    生成径向渐变的暗角蒙版
+
+    Args:
+        h: 帧高度
+        w: 帧宽度
+        strength: 强度 (0-1)
+
+    Returns:
+        (h, w) uint16 蒙版，256 表示保持原值
+    """
+    Y, X = np.ogrid[:h, :w]
+    center_y, center_x = h / 2, w / 2
+
+    # 计算距离
+    dist = np.sqrt((X - center_x)**2 + (Y - center_y)**2)
+    max_dist = np.sqrt(center_x**2 + center_y**2)
+
+    # 转为 8 位定点：256 表示保持原值
+    mask = np.clip(1 - (dist / max_dist * strength), 0, 1)
+    return np.rint(mask * 256).astype(np.uint16)
+
+
+def _contrast_lut(mean: float, factor: float) -> np.ndarray:
+    """
+    按帧均值生成对比度查找表
+
+    Args:
+        mean: 帧均值
+        factor: 对比度倍数
+
+    Returns:
+        (256,) uint8 查找表
+    """
+    return np.clip((np.arange(256) - mean) * factor + mean, 0, 255).astype(np.uint8)
+
+
+def _mean_sample_step(h: int, w: int) -> int:
+    """等间隔采样约 CONTRAST_MEAN_SAMPLES 个像素时的步长，小帧读取全部像素"""
+    return max(1, int((h * w / CONTRAST_MEAN_SAMPLES) ** 0.5))
+
 
 class VideoEffects:
     """视频效果类"""
@@ -106,14 +364,21 @@ class VideoEffects:
         Returns:
             VideoClip对象
         """
-        def bw_effect(get_frame, t):
-            frame = get_frame(t)
-            # 转换为灰度
-            gray = np.dot(frame[...,:3], [0.299, 0.587, 0.114])
+        def bw_effect(frame):
+            if NUMBA_AVAILABLE:
+                return _gray_frame(frame)
+
+            # 转换为灰度（定点整数运算，不产生 float64 中间数组）
+            rgb = frame[..., :3].astype(np.uint16)
+            gray = (
+                rgb[..., 0] * GRAY_WEIGHTS[0]
+                + rgb[..., 1] * GRAY_WEIGHTS[1]
+                + rgb[..., 2] * GRAY_WEIGHTS[2]
+            ) >> 8
             # 扩展到3通道
-            return np.stack([gray, gray, gray], axis=-1).astype('uint8')
+            return np.repeat(gray.astype(np.uint8)[..., np.newaxis], 3, axis=-1)
 
-        return clip.fl(bw_effect)
+        return clip.fl(_memoize_static_frames(bw_effect))
 
     @staticmethod
     def adjust_brightness(clip: VideoClip, factor: float = 1.2) -> VideoClip:
@@ -127,12 +392,13 @@ class VideoEffects:
         Returns:
             VideoClip对象
         """
-        def brightness_effect(get_frame, t):
-            frame = get_frame(t)
-            adjusted = np.clip(frame * factor, 0, 255).astype('uint8')
-            return adjusted
+        # 每个像素值的映射结果与帧无关，只计算一次
+        lut = np.clip(np.arange(256) * factor, 0, 255).astype(np.uint8)
 
-        return clip.fl(brightness_effect)
+        def brightness_effect(frame):
+            return _apply_lut(frame, lut)
+
+        return clip.fl(_memoize_static_frames(brightness_effect))
 
     @staticmethod
     def adjust_contrast(clip: VideoClip, factor: float = 1.5) -> VideoClip:
@@ -146,15 +412,14 @@ class VideoEffects:
         Returns:
             VideoClip对象
         """
-        def contrast_effect(get_frame, t):
-            frame = get_frame(t)
-            # 计算均值
-            mean = np.mean(frame)
-            # 调整对比度
-            adjusted = np.clip((frame - mean) * factor + mean, 0, 255).astype('uint8')
-            return adjusted
+        def contrast_effect(frame):
+            # 等间隔采样约 CONTRAST_MEAN_SAMPLES 个像素估计均值
+            step = _mean_sample_step(*frame.shape[:2])
+            mean = frame[::step, ::step].mean()
+            # 调整对比度：按均值生成查找表后一次映射
+            return _apply_lut(frame, _contrast_lut(mean, factor))
 
-        return clip.fl(contrast_effect)
+        return clip.fl(_memoize_static_frames(contrast_effect))
 
     @staticmethod
     def vignette(clip: VideoClip, strength: float = 0.5) -> VideoClip:
@@ -168,30 +433,27 @@ class VideoEffects:
         Returns:
             VideoClip对象
         """
-        def vignette_effect(get_frame, t):
-            frame = get_frame(t)
-            h, w = frame.shape[:2]
+        # 蒙版只取决于分辨率和强度，按帧尺寸缓存
+        masks = {}
 
-            # 创建径向渐变蒙版
-            Y, X = np.ogrid[:h, :w]
-            center_y, center_x = h / 2, w / 2
+        def get_mask(h: int, w: int) -> np.ndarray:
+            mask = masks.get((h, w))
+            if mask is None:
+                mask = masks[(h, w)] = _vignette_mask(h, w, strength)
+            return mask
 
-            # 计算距离
-            dist = np.sqrt((X - center_x)**2 + (Y - center_y)**2)
-            max_dist = np.sqrt(center_x**2 + center_y**2)
+        def vignette_effect(frame):
+            mask = get_mask(*frame.shape[:2])
 
-            # 创建蒙版
-            mask = 1 - (dist / max_dist * strength)
-            mask = np.clip(mask, 0, 1)
+            if NUMBA_AVAILABLE and frame.ndim == 3:
+                return _apply_mask(frame, mask)
 
             # 应用蒙版
-            if len(frame.shape) == 3:
+            if frame.ndim == 3:
                 mask = mask[:, :, np.newaxis]
+            return ((frame * mask) >> 8).astype(np.uint8)
 
-            vignetted = (frame * mask).astype('uint8')
-            return vignetted
-
-        return clip.fl(vignette_effect)
+        return clip.fl(_memoize_static_frames(vignette_effect))
 
     @staticmethod
     def blur(clip: VideoClip, blur_radius: int = 5) -> VideoClip:
@@ -205,15 +467,28 @@ class VideoEffects:
         Returns:
             VideoClip对象
         """
+        if CV2_AVAILABLE:
+            # Pillow 的 GaussianBlur 半径即标准差；核大小覆盖 ±3σ，只计算一次
+            kernel_size = 2 * int(np.ceil(3 * blur_radius)) + 1
+
+            def cv2_blur_effect(frame):
+                return cv2.GaussianBlur(
+                    frame,
+                    (kernel_size, kernel_size),
+                    sigmaX=blur_radius,
+                    borderType=cv2.BORDER_REPLICATE
+                )
+
+            return clip.fl(_memoize_static_frames(cv2_blur_effect))
+
         from PIL import Image, ImageFilter
 
-        def blur_effect(get_frame, t):
-            frame = get_frame(t)
+        def blur_effect(frame):
             img = Image.fromarray(frame)
             blurred = img.filter(ImageFilter.GaussianBlur(blur_radius))
             return np.array(blurred)
 
-        return clip.fl(blur_effect)
+        return clip.fl(_memoize_static_frames(blur_effect))
 
     @staticmethod
     def slide_in(
@@ -311,7 +586,7 @@ class VideoEffects:
         Returns:
             VideoClip对象
         """
-        return clip.fx(lambda c: c.fl_image(lambda img: np.fliplr(img)))
+        return clip.fl(_memoize_static_frames(lambda img: _flip(img, 1)))
 
     @staticmethod
     def mirror_vertical(clip: VideoClip) -> VideoClip:
@@ -324,7 +599,7 @@ class VideoEffects:
         Returns:
             VideoClip对象
         """
-        return clip.fx(lambda c: c.fl_image(lambda img: np.flipud(img)))
+        return clip.fl(_memoize_static_frames(lambda img: _flip(img, 0)))
 
     @staticmethod
     def sepia(clip: VideoClip) -> VideoClip:
@@ -337,23 +612,19 @@ class VideoEffects:
         Returns:
             VideoClip对象
         """
-        def sepia_effect(get_frame, t):
-            frame = get_frame(t)
+        def sepia_effect(frame):
 
-            # Sepia矩阵
-            sepia_matrix = np.array([
-                [0.393, 0.769, 0.189],
-                [0.349, 0.686, 0.168],
-                [0.272, 0.534, 0.131]
-            ])
+            if CV2_AVAILABLE and frame.dtype == np.uint8:
+                # 逐像素 3x3 矩阵变换，结果直接饱和截断为 uint8
+                return cv2.transform(frame, SEPIA_MATRIX)
 
             # 应用矩阵变换
-            sepia_frame = frame.dot(sepia_matrix.T)
+            sepia_frame = frame.dot(SEPIA_MATRIX.T)
             sepia_frame = np.clip(sepia_frame, 0, 255).astype('uint8')
 
             return sepia_frame
 
-        return clip.fl(sepia_effect)
+        return clip.fl(_memoize_static_frames(sepia_effect))
 
     @staticmethod
     def apply_multiple_effects(
@@ -365,7 +636,8 @@ class VideoEffects:
 
         Args:
             clip: 视频片段
-            effects: 效果函数列表
+            effects: 效果函数列表，可以包含 EffectPipeline
+                （连续的逐像素效果放进同一个 EffectPipeline 可合并为一次遍历）
 
         Returns:
             VideoClip对象
@@ -412,3 +684,190 @@ class VideoEffects:
         final = CompositeVideoClip([clip1, clip2])
 
         return final
+
+
+class EffectPipeline:
+    """
+    逐像素效果流水线
+
+    相邻的亮度、对比度、怀旧色调、黑白和暗角效果融合为一个 Numba 内核，
+    每帧只读写一次，而不是每个效果各遍历一次整帧。blur、rotate 等不可融合的
+    效果通过 then() 加入，作为融合边界。实例本身是效果函数，可直接传给
+    VideoEffects.apply_multiple_effects。
+
+    用法:
+        pipeline = EffectPipeline().adjust_brightness(1.2).sepia().vignette(0.4)
+        clip = pipeline(clip)
+    """
+
+    def __init__(self):
+        # 每个阶段是逐像素操作列表 [(名称, 参数), ...] 或不可融合的效果函数
+        self._stages = []
+
+    def _add_op(self, name: str, param: float = 0.0) -> 'EffectPipeline':
+        if not self._stages or not isinstance(self._stages[-1], list):
+            self._stages.append([])
+        self._stages[-1].append((name, param))
+        return self
+
+    def adjust_brightness(self, factor: float = 1.2) -> 'EffectPipeline':
+        """添加亮度调整，参数同 VideoEffects.adjust_brightness"""
+        return self._add_op('brightness', factor)
+
+    def adjust_contrast(self, factor: float = 1.5) -> 'EffectPipeline':
+        """添加对比度调整，参数同 VideoEffects.adjust_contrast"""
+        return self._add_op('contrast', factor)
+
+    def sepia(self) -> 'EffectPipeline':
+        """添加怀旧色调"""
+        return self._add_op('sepia')
+
+    def black_and_white(self) -> 'EffectPipeline':
+        """添加黑白效果"""
+        return self._add_op('black_and_white')
+
+    def vignette(self, strength: float = 0.5) -> 'EffectPipeline':
+        """添加暗角，参数同 VideoEffects.vignette"""
+        return self._add_op('vignette', strength)
+
+    def then(self, effect_func: Callable[[VideoClip], VideoClip]) -> 'EffectPipeline':
+        """
+        添加不可融合的效果
+
+        Args:
+            effect_func: 接收并返回 VideoClip 的效果函数
+
+        Returns:
+            流水线自身，便于链式调用
+        """
+        self._stages.append(effect_func)
+        return self
+
+    def __call__(self, clip: VideoClip) -> VideoClip:
+        """
+        把流水线应用到视频片段
+
+        Args:
+            clip: 视频片段
+
+        Returns:
+            VideoClip对象
+        """
+        for stage in self._stages:
+            if not isinstance(stage, list):
+                clip = stage(clip)
+            elif NUMBA_AVAILABLE:
+                clip = clip.fl(_memoize_static_frames(self._fused_effect(stage)))
+            else:
+                clip = self._apply_sequential(clip, stage)
+        return clip
+
+    @staticmethod
+    def _apply_sequential(clip: VideoClip, ops: list) -> VideoClip:
+        """没有 Numba 时逐个应用 VideoEffects 中的对应效果"""
+        for name, param in ops:
+            if name == 'brightness':
+                clip = VideoEffects.adjust_brightness(clip, param)
+            elif name == 'contrast':
+                clip = VideoEffects.adjust_contrast(clip, param)
+            elif name == 'sepia':
+                clip = VideoEffects.sepia(clip)
+            elif name == 'black_and_white':
+                clip = VideoEffects.black_and_white(clip)
+            else:
+                clip = VideoEffects.vignette(clip, param)
+        return clip
+
+    @staticmethod
+    def _fused_effect(ops: list) -> Callable:
+        """
+        生成一段可融合操作对应的帧处理函数
+
+        相邻的查找表操作（亮度、对比度）每帧先复合成一张表，再交给融合内核。
+
+        Args:
+            ops: [(名称, 参数), ...]
+
+        Returns:
+            帧 -> 帧 的处理函数
+        """
+        codes = np.array([
+            _OP_LUT if name in ('brightness', 'contrast') else
+            _OP_GRAY if name == 'black_and_white' else
+            _OP_SEPIA if name == 'sepia' else
+            _OP_MASK
+            for name, _ in ops
+        ], dtype=np.int32)
+
+        # 查找表和蒙版各自按出现顺序编号
+        params = np.zeros(len(ops), dtype=np.int32)
+        lut_count = mask_count = 0
+        for k, code in enumerate(codes):
+            if code == _OP_LUT:
+                params[k], lut_count = lut_count, lut_count + 1
+            elif code == _OP_MASK:
+                params[k], mask_count = mask_count, mask_count + 1
+
+        luts = np.zeros((max(lut_count, 1), 256), dtype=np.uint8)
+        for k, (name, factor) in enumerate(ops):
+            if name == 'brightness':
+                luts[params[k]] = np.clip(np.arange(256) * factor, 0, 255).astype(np.uint8)
+
+        # 相邻的查找表操作合并为一组，内核中每组只查一次表
+        lut_groups = []
+        kernel_ops = []
+        for k, code in enumerate(codes):
+            if code == _OP_LUT:
+                if k > 0 and codes[k - 1] == _OP_LUT:
+                    lut_groups[-1].append(params[k])
+                    continue
+                lut_groups.append([params[k]])
+                kernel_ops.append((_OP_LUT, len(lut_groups) - 1))
+            else:
+                kernel_ops.append((int(code), int(params[k])))
+        kernel_codes = np.array([code for code, _ in kernel_ops], dtype=np.int32)
+        kernel_params = np.array([param for _, param in kernel_ops], dtype=np.int32)
+
+        contrast_steps = [k for k, (name, _) in enumerate(ops) if name == 'contrast']
+        # 暗角蒙版只取决于分辨率，按帧尺寸缓存
+        mask_cache = {}
+
+        def get_masks(h: int, w: int) -> np.ndarray:
+            masks = mask_cache.get((h, w))
+            if masks is None:
+                masks = np.full((max(mask_count, 1), h, w), 256, dtype=np.uint16)
+                for k, (name, strength) in enumerate(ops):
+                    if name == 'vignette':
+                        masks[params[k]] = _vignette_mask(h, w, strength)
+                mask_cache[(h, w)] = masks
+            return masks
+
+        def fused_effect(frame):
+            if frame.ndim != 3 or frame.shape[2] != 3 or frame.dtype != np.uint8:
+                frame = frame[..., :3].astype(np.uint8)
+            frame = np.ascontiguousarray(frame)
+            masks = get_masks(*frame.shape[:2])
+
+            frame_luts = luts
+            if contrast_steps:
+                frame_luts = luts.copy()
+                # 对比度依赖前面各步处理后的帧均值：只在采样像素上执行前缀操作
+                step = _mean_sample_step(*frame.shape[:2])
+                sample = np.ascontiguousarray(frame[::step, ::step])
+                sample_masks = np.ascontiguousarray(masks[:, ::step, ::step])
+                for k in contrast_steps:
+                    prefix = _fused_pixel_ops(
+                        sample, codes[:k], params[:k], frame_luts, sample_masks, SEPIA_MATRIX
+                    )
+                    frame_luts[params[k]] = _contrast_lut(prefix.mean(), ops[k][1])
+
+            group_luts = np.empty((max(len(lut_groups), 1), 256), dtype=np.uint8)
+            for g, group in enumerate(lut_groups):
+                combined = frame_luts[group[0]]
+                for index in group[1:]:
+                    combined = frame_luts[index][combined]
+                group_luts[g] = combined
+
+            return _fused_pixel_ops(frame, kernel_codes, kernel_params, group_luts, masks, SEPIA_MATRIX)
+
+        return fused_effect
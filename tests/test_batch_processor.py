@@ -0,0 +1,145 @@
+"""
+测试批处理器
+"""
+
+import logging
+
+import pytest
+import tasks.batch_processor as batch_processor_module
+from tasks.batch_processor import BatchProcessor
+from tasks.task_queue import TaskQueue, VideoTask, TaskStatus
+
+
+def generate_ok(task):
+    """总是成功的视频生成器"""
+    return {'success': True, 'output_path': f"{task.task_id}.mp4"}
+
+
+def generate_fail(task):
+    """总是失败的视频生成器"""
+    raise RuntimeError(f"生成失败: {task.task_id}")
+
+
+def create_queue(count: int) -> TaskQueue:
+    """创建包含若干待处理任务的队列"""
+    queue = TaskQueue()
+    for i in range(count):
+        queue.add_task(VideoTask(task_id=f"task_{i}", script_text=f"脚本{i}"))
+    return queue
+
+
+class TestBatchProcessor:
+    """测试批处理器"""
+
+    @pytest.mark.parametrize("use_processes", [False, True])
+    def test_process_all_pending_success(self, use_processes):
+        """测试进程池和线程池都能完成任务并更新队列"""
+        queue = create_queue(3)
+        processor = BatchProcessor(
+            queue,
+            {'max_workers': 2, 'use_processes': use_processes, 'save_logs': False},
+            video_generator=generate_ok
+        )
+
+        stats = processor.process_all_pending()
+
+        assert stats['total_processed'] == 3
+        assert stats['successful'] == 3
+        assert stats['failed'] == 0
+        for i in range(3):
+            task = queue.get_task(f"task_{i}")
+            assert task.status == TaskStatus.COMPLETED
+            assert task.result['output_path'] == f"task_{i}.mp4"
+
+    @pytest.mark.parametrize("use_processes", [False, True])
+    def test_process_all_pending_failure(self, use_processes):
+        """测试任务重试后仍失败时标记为失败"""
+        queue = create_queue(2)
+        processor = BatchProcessor(
+            queue,
+            {'max_workers': 2, 'use_processes': use_processes, 'retry_times': 2, 'save_logs': False},
+            video_generator=generate_fail
+        )
+
+        stats = processor.process_all_pending()
+
+        assert stats['total_processed'] == 2
+        assert stats['failed'] == 2
+        task = queue.get_task("task_0")
+        assert task.status == TaskStatus.FAILED
+        assert task.error_message == "生成失败: task_0"
+
+    @pytest.mark.parametrize("use_processes", [False, True])
+    def test_error_log_contains_traceback(self, use_processes, tmp_path, monkeypatch):
+        """测试错误日志包含生成器抛出异常的堆栈"""
+        monkeypatch.chdir(tmp_path)
+        queue = create_queue(1)
+        processor = BatchProcessor(
+            queue,
+            {'max_workers': 1, 'use_processes': use_processes, 'retry_times': 1},
+            video_generator=generate_fail
+        )
+
+        processor.process_all_pending()
+
+        log_files = list((tmp_path / "output" / "logs").glob("error_task_0_*.log"))
+        assert len(log_files) == 1
+        content = log_files[0].read_text(encoding='utf-8')
+        assert "in generate_fail" in content
+        assert "RuntimeError: 生成失败: task_0" in content
+
+    @pytest.mark.parametrize("use_processes", [False, True])
+    def test_status_updates_batched(self, use_processes, tmp_path, monkeypatch):
+        """测试批处理期间状态更新合并写入持久化文件"""
+        queue = TaskQueue(str(tmp_path / "tasks.json"))
+        for i in range(20):
+            queue.add_task(VideoTask(task_id=f"task_{i}", script_text=f"脚本{i}"))
+
+        saves = []
+        monkeypatch.setattr(queue, '_save_tasks', lambda: saves.append(1))
+        processor = BatchProcessor(
+            queue,
+            {'max_workers': 2, 'use_processes': use_processes, 'save_logs': False},
+            video_generator=generate_ok
+        )
+
+        processor.process_all_pending()
+
+        # 40 次状态更新（处理中 + 完成）按每 16 条写入一次
+        assert len(saves) <= 4
+        assert queue.get_statistics()['completed'] == 20
+
+    @pytest.mark.parametrize("max_workers", [None, 'auto'])
+    def test_default_max_workers(self, max_workers):
+        """测试未配置线程数时按可用 CPU 数决定"""
+        processor = BatchProcessor(TaskQueue(), {'max_workers': max_workers})
+
+        assert processor.max_workers >= 1
+        assert isinstance(processor.max_workers, int)
+
+    def test_worker_keeps_configured_log_level(self, monkeypatch):
+        """测试工作进程中的任务沿用父进程配置的日志级别"""
+        BatchProcessor(TaskQueue(), {'log_level': 'WARNING'})
+        monkeypatch.setattr(batch_processor_module, '_worker_video_generator', generate_fail)
+
+        success, _, error, _ = batch_processor_module._generate_in_worker(
+            VideoTask(task_id="task_0", script_text="脚本"), 1, False
+        )
+
+        assert not success
+        assert error == "生成失败: task_0"
+        assert logging.getLogger("batch_processor").level == logging.WARNING
+
+    def test_process_pool_shares_closure_generator(self):
+        """测试不可序列化的生成器也能在进程池中使用"""
+        prefix = "closure"
+        queue = create_queue(2)
+        processor = BatchProcessor(
+            queue,
+            {'max_workers': 2, 'use_processes': True, 'save_logs': False},
+            video_generator=lambda task: {'output_path': f"{prefix}_{task.task_id}"}
+        )
+
+        processor.process_all_pending()
+
+        assert queue.get_task("task_1").result['output_path'] == "closure_task_1"
@@ -2,10 +2,17 @@
 测试并行批处理器
 """
 
+import os
 import pytest
+import threading
 import time
 from unittest.mock import Mock, patch
-from tasks.parallel_batch_processor import ParallelBatchProcessor, ResourceManager
+from tasks.parallel_batch_processor import (
+    AdaptiveWorkerController,
+    FriendlyPoolController,
+    ParallelBatchProcessor,
+    ResourceManager,
+)
 from tasks.task_queue import TaskQueue, VideoTask
 
 
@@ -70,6 +77,108 @@ class TestResourceManager:
         manager.task_completed(512)
         assert manager.can_start_task(512)
 
+    @patch('tasks.parallel_batch_processor.psutil')
+    def test_resource_usage_does_not_block(self, mock_psutil):
+        """测试资源统计使用非阻塞 CPU 采样并缓存内存信息"""
+        mock_psutil.virtual_memory.return_value.percent = 50.0
+        mock_psutil.cpu_percent.return_value = 12.5
+        manager = ResourceManager({})
+
+        for _ in range(3):
+            usage = manager.get_resource_usage()
+
+        assert usage['cpu_percent'] == 12.5
+        assert usage['memory_percent'] == 50.0
+        mock_psutil.cpu_percent.assert_called_with(interval=None)
+        assert mock_psutil.virtual_memory.call_count == 1
+
+    def test_resource_usage_without_lock(self):
+        """测试读取资源统计和并发上限不需要获取锁"""
+        manager = ResourceManager({})
+        manager.set_worker_limit(3, source='adaptive')
+        manager.set_worker_limit(2, source='friendly')
+        assert manager.can_start_task(256)
+
+        with manager._lock:
+            usage = manager.get_resource_usage()
+            limit = manager.worker_limit
+
+        assert usage['active_tasks'] == 1
+        assert usage['estimated_memory_usage_mb'] == 256
+        assert usage['worker_limit'] == 2
+        assert limit == 2
+
+
+class TestAdaptiveWorkerController:
+    """测试自适应并发控制器"""
+
+    def create_controller(self):
+        """创建单 CPU、上限 4 的控制器"""
+        config = {'performance': {'threading': {'max_concurrent_tasks': 8}}}
+        manager = ResourceManager(config)
+        return manager, AdaptiveWorkerController(manager, max_workers=4, cpu_count=1)
+
+    def test_io_bound_tasks_grow_limit(self):
+        """测试阻塞型任务经过滞后确认后逐步增加并发"""
+        manager, controller = self.create_controller()
+        assert manager.worker_limit == 1
+
+        limits = []
+        for _ in range(6):
+            controller.record(cpu_ns=10, wall_ns=100)
+            limits.append(controller.adjust())
+
+        # 每连续 3 次确认才 +1
+        assert limits == [1, 1, 2, 2, 2, 3]
+        assert controller.beta == pytest.approx(0.9)
+
+    def test_cpu_bound_tasks_veto_growth(self):
+        """测试 CPU 密集型任务不会增加并发"""
+        manager, controller = self.create_controller()
+
+        for _ in range(10):
+            controller.record(cpu_ns=90, wall_ns=100)
+            controller.adjust()
+
+        assert manager.worker_limit == 1
+
+    def test_limit_blocks_admission(self):
+        """测试动态上限限制可启动的任务数"""
+        manager, _ = self.create_controller()
+
+        assert manager.can_start_task(0)
+        assert not manager.can_start_task(0)
+
+        manager.set_worker_limit(2, source='adaptive')
+        assert manager.can_start_task(0)
+
+
+class TestFriendlyPoolController:
+    """测试按 CPU 份额调整并发的控制器"""
+
+    def test_share_scales_limit(self):
+        """测试并发上限随本进程 CPU 份额变化"""
+        config = {'performance': {'threading': {'max_concurrent_tasks': 8}}}
+        manager = ResourceManager(config)
+        controller = FriendlyPoolController(manager, max_workers=8, cpu_count=4)
+
+        # 独占 CPU 时不限制
+        assert controller.update(own_delta=1.0, total_delta=1.0) == 4
+        # 其他进程占用 3/4 的 CPU 时间
+        assert controller.update(own_delta=1.0, total_delta=4.0) == 1
+        assert manager.worker_limit == 1
+        # 系统空闲时保持不变
+        assert controller.update(own_delta=0.0, total_delta=0.0) == 1
+
+    def test_overcommit_factor(self):
+        """测试超额订阅系数"""
+        manager = ResourceManager({})
+        controller = FriendlyPoolController(
+            manager, max_workers=8, cpu_count=4, overcommit_factor=1.5
+        )
+
+        assert controller.update(own_delta=1.0, total_delta=2.0) == 3
+
 
 class TestParallelBatchProcessor:
     """测试并行批处理器"""
@@ -159,6 +268,276 @@ class TestParallelBatchProcessor:
 
         processor.shutdown()
 
+    def test_process_batch_more_tasks_than_slots(self):
+        """测试任务数超过并发上限时任务完成后即可继续提交"""
+        config = {
+            'performance': {
+                'threading': {
+                    'max_workers': 2,
+                    'max_concurrent_tasks': 2,
+                    'task_timeout': 10
+                }
+            },
+            'log_level': 'WARNING'
+        }
+
+        tasks = [
+            VideoTask(task_id=f"task_{i}", script_text=f"Test script {i}")
+            for i in range(6)
+        ]
+
+        task_queue = Mock(spec=TaskQueue)
+        processor = ParallelBatchProcessor(
+            task_queue, config, lambda task: {"output_path": f"{task.task_id}.mp4"}
+        )
+        result = processor.process_batch(tasks)
+
+        assert result.successful_tasks == 6
+        assert processor.resource_manager.get_resource_usage()['active_tasks'] == 0
+
+        processor.shutdown()
+
+    def test_results_keep_submission_order(self):
+        """测试结果按提交顺序返回，与完成顺序无关"""
+        def reversed_generator(task):
+            time.sleep(0.02 * (3 - int(task.task_id.split('_')[1])))
+            return {"output_path": f"{task.task_id}.mp4"}
+
+        config = {
+            'performance': {
+                'threading': {
+                    'max_workers': 4,
+                    'max_concurrent_tasks': 4
+                }
+            },
+            'log_level': 'WARNING'
+        }
+
+        tasks = [
+            VideoTask(task_id=f"task_{i}", script_text=f"Test script {i}")
+            for i in range(4)
+        ]
+
+        processor = ParallelBatchProcessor(Mock(spec=TaskQueue), config, reversed_generator)
+        result = processor.process_batch(tasks)
+
+        assert [r.task_id for r in result.results] == [t.task_id for t in tasks]
+        assert result.peak_memory_usage > 0
+
+        processor.shutdown()
+
+    def test_worker_context_reused(self):
+        """测试每个工作线程只创建一次上下文并在关闭时释放"""
+        class Context:
+            def __init__(self):
+                self.calls = 0
+                self.closed = False
+
+            def close(self):
+                self.closed = True
+
+        contexts = []
+
+        def context_factory():
+            contexts.append(Context())
+            return contexts[-1]
+
+        def generator(task, ctx):
+            ctx.calls += 1
+            return {"output_path": f"{task.task_id}.mp4"}
+
+        config = {
+            'performance': {
+                'threading': {
+                    'max_workers': 1
+                }
+            },
+            'log_level': 'WARNING'
+        }
+
+        tasks = [
+            VideoTask(task_id=f"task_{i}", script_text=f"Test script {i}")
+            for i in range(5)
+        ]
+
+        processor = ParallelBatchProcessor(
+            Mock(spec=TaskQueue), config, generator, context_factory=context_factory
+        )
+        result = processor.process_batch(tasks)
+        processor.shutdown()
+
+        assert result.successful_tasks == 5
+        assert len(contexts) == 1
+        assert contexts[0].calls == 5
+        assert contexts[0].closed
+
+    def test_frame_pool_passed_per_worker(self):
+        """测试配置帧缓冲池后生成器收到当前工作线程的缓冲池"""
+        pools = []
+
+        def generator(task, frame_pool):
+            frame = frame_pool.get(16, 16)
+            frame_pool.put(frame)
+            pools.append(frame_pool)
+            return {"output_path": f"{task.task_id}.mp4"}
+
+        config = {
+            'performance': {
+                'threading': {
+                    'max_workers': 1,
+                    'frame_pool_size': 4
+                }
+            },
+            'log_level': 'WARNING'
+        }
+
+        tasks = [
+            VideoTask(task_id=f"task_{i}", script_text=f"Test script {i}")
+            for i in range(3)
+        ]
+
+        processor = ParallelBatchProcessor(Mock(spec=TaskQueue), config, generator)
+        result = processor.process_batch(tasks)
+        processor.shutdown()
+
+        assert result.successful_tasks == 3
+        assert len(set(map(id, pools))) == 1
+
+    def test_error_log_contains_traceback(self, tmp_path, monkeypatch):
+        """测试错误日志包含生成器抛出异常的堆栈"""
+        def failing_generator(task):
+            raise RuntimeError(f"生成失败: {task.task_id}")
+
+        monkeypatch.chdir(tmp_path)
+        config = {
+            'performance': {
+                'threading': {
+                    'max_workers': 1,
+                    'retry_times': 1
+                }
+            },
+            'log_level': 'CRITICAL'
+        }
+
+        processor = ParallelBatchProcessor(Mock(spec=TaskQueue), config, failing_generator)
+        result = processor.process_batch([VideoTask(task_id="task_0", script_text="Test")])
+        processor.shutdown()
+
+        assert result.failed_tasks == 1
+        log_files = list((tmp_path / "output" / "logs").glob("error_task_0_*.log"))
+        assert len(log_files) == 1
+        lines = log_files[0].read_text(encoding='utf-8').splitlines()
+        assert lines[0] == "任务ID: task_0"
+        assert any("in failing_generator" in line for line in lines)
+        assert "RuntimeError: 生成失败: task_0" in lines
+
+    def test_error_log_dropped_when_queue_full(self, tmp_path, monkeypatch):
+        """测试错误日志队列已满时丢弃日志而不阻塞工作线程"""
+        monkeypatch.chdir(tmp_path)
+        config = {
+            'performance': {
+                'threading': {
+                    'max_workers': 1,
+                    'error_log_queue_size': 1
+                }
+            },
+            'log_level': 'CRITICAL'
+        }
+
+        processor = ParallelBatchProcessor(Mock(spec=TaskQueue), config)
+        writing = threading.Event()
+        release = threading.Event()
+        write = processor._write_error_log
+
+        def slow_write(*args):
+            writing.set()
+            release.wait(5)
+            write(*args)
+
+        monkeypatch.setattr(processor, '_write_error_log', slow_write)
+
+        processor._save_error_log(VideoTask(task_id="task_0"), "错误0")
+        assert writing.wait(5)
+        processor._save_error_log(VideoTask(task_id="task_1"), "错误1")
+        processor._save_error_log(VideoTask(task_id="task_2"), "错误2")
+
+        release.set()
+        processor.shutdown()
+
+        log_dir = tmp_path / "output" / "logs"
+        assert len(list(log_dir.glob("error_task_0_*.log"))) == 1
+        assert len(list(log_dir.glob("error_task_1_*.log"))) == 1
+        assert list(log_dir.glob("error_task_2_*.log")) == []
+
+    def test_generator_runs_in_process_pool(self):
+        """测试 use_processes 开启后闭包生成器在子进程中执行"""
+        prefix = "closure"
+
+        def generator(task):
+            return {"output_path": f"{prefix}_{task.task_id}", "pid": os.getpid()}
+
+        config = {
+            'performance': {
+                'threading': {
+                    'max_workers': 2,
+                    'use_processes': True
+                }
+            },
+            'log_level': 'WARNING'
+        }
+
+        tasks = [
+            VideoTask(task_id=f"task_{i}", script_text=f"Test script {i}")
+            for i in range(3)
+        ]
+
+        processor = ParallelBatchProcessor(Mock(spec=TaskQueue), config, generator)
+        result = processor.process_batch(tasks)
+        processor.shutdown()
+
+        assert result.successful_tasks == 3
+        assert result.results[0].result_data['output_path'] == "closure_task_0"
+        assert all(r.result_data['pid'] != os.getpid() for r in result.results)
+
+    @pytest.mark.parametrize("busy, expect_processes", [(True, True), (False, False)])
+    def test_auto_process_pool_selection(self, busy, expect_processes, monkeypatch):
+        """测试 auto 模式按线程 CPU 占用决定是否切换到进程池"""
+        # 单核或小内存机器上 max_workers 会被压到 1，此时不会切换到进程池
+        monkeypatch.setattr(ResourceManager, 'calculate_optimal_workers', lambda self: 2)
+
+        def generator(task):
+            end = time.perf_counter() + 0.1
+            if busy:
+                while time.perf_counter() < end:
+                    pass
+            else:
+                time.sleep(0.1)
+            return {"pid": os.getpid()}
+
+        config = {
+            'performance': {
+                'threading': {
+                    'max_workers': 2,
+                    'max_concurrent_tasks': 2,
+                    'use_processes': 'auto',
+                    'process_probe_tasks': 2
+                }
+            },
+            'log_level': 'WARNING'
+        }
+
+        tasks = [
+            VideoTask(task_id=f"task_{i}", script_text=f"Test script {i}")
+            for i in range(6)
+        ]
+
+        processor = ParallelBatchProcessor(Mock(spec=TaskQueue), config, generator)
+        result = processor.process_batch(tasks)
+        processor.shutdown()
+
+        assert result.successful_tasks == 6
+        assert (result.results[-1].result_data['pid'] != os.getpid()) == expect_processes
+
     def test_performance_stats(self):
         """测试性能统计"""
         config = {
@@ -179,6 +558,7 @@ class TestParallelBatchProcessor:
         assert 'resource_usage' in stats
         assert 'processing_stats' in stats
         assert 'config' in stats
+        assert stats['thread_pool']['active_threads'] == 0
 
         processor.shutdown()
 
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+测试字幕生成器
+"""
+
+import pytest
+from src.subtitle.subtitle_gen import SubtitleGenerator, SubtitleSegment
+
+
+class TestSplitIntoSentences:
+    """测试分句逻辑"""
+
+    def test_short_sentences_kept(self):
+        """测试短句不被分割"""
+        generator = SubtitleGenerator({'max_chars_per_line': 25})
+        result = generator._split_into_sentences("今天天气很好。我们去公园吧！")
+
+        assert result == ["今天天气很好", "我们去公园吧"]
+
+    def test_semicolon_split_first(self):
+        """测试过长句子优先按分号分割"""
+        generator = SubtitleGenerator({'max_chars_per_line': 10})
+        result = generator._split_into_sentences("春天来了，花开了；夏天来了，雨多了。")
+
+        assert result == ["春天来了，花开了", "夏天来了，雨多了"]
+
+    def test_comma_split_when_still_too_long(self):
+        """测试分号分割后仍过长时按逗号分割"""
+        generator = SubtitleGenerator({'max_chars_per_line': 6})
+        result = generator._split_into_sentences("春天来了，花开了、草绿了；夏天")
+
+        assert result == ["春天来了", "花开了", "草绿了", "夏天"]
+
+    def test_colon_split_last(self):
+        """测试最后按冒号分割"""
+        generator = SubtitleGenerator({'max_chars_per_line': 5})
+        result = generator._split_into_sentences("注意事项：请保持安静")
+
+        assert result == ["注意事项", "请保持安静"]
+
+
+class TestSplitTextIntoLines:
+    """测试文本分行"""
+
+    def test_short_text_single_line(self):
+        """测试短文本不分行"""
+        generator = SubtitleGenerator({'max_chars_per_line': 20})
+        assert generator._split_text_into_lines("hello world") == ["hello world"]
+
+    def test_wrap_on_word_boundary(self):
+        """测试按单词边界分行"""
+        generator = SubtitleGenerator({'max_chars_per_line': 12})
+        lines = generator._split_text_into_lines("the quick brown fox jumps over")
+
+        assert lines == ["the quick", "brown fox", "jumps over"]
+
+    def test_result_is_independent_copy(self):
+        """测试缓存结果不会被调用方修改"""
+        generator = SubtitleGenerator({'max_chars_per_line': 12})
+        lines = generator._split_text_into_lines("the quick brown fox")
+        lines.append("extra")
+
+        assert generator._split_text_into_lines("the quick brown fox") == ["the quick", "brown fox"]
+
+
+class TestMergeSegments:
+    """测试字幕片段合并"""
+
+    def test_merge_within_max_duration(self):
+        """测试在最大时长内合并"""
+        generator = SubtitleGenerator({})
+        segments = [
+            SubtitleSegment("第一句", 0.0, 1.0, 1),
+            SubtitleSegment("第二句", 1.0, 2.0, 2),
+            SubtitleSegment("第三句", 2.0, 6.0, 3),
+        ]
+
+        merged = generator.merge_segments(segments, max_duration=5.0)
+
+        assert len(merged) == 2
+        assert merged[0].text == "第一句 第二句"
+        assert merged[0].start_time == 0.0
+        assert merged[0].end_time == 2.0
+        assert merged[1].text == "第三句"
+        assert merged[1].index == 2
+
+    def test_merge_empty(self):
+        """测试空列表"""
+        generator = SubtitleGenerator({})
+        assert generator.merge_segments([]) == []
+
+
+class TestLoadFromSrt:
+    """测试SRT加载"""
+
+    def test_load_multiline_crlf_with_bom(self, tmp_path):
+        """测试带BOM、CRLF换行和多行文本的SRT"""
+        srt_file = tmp_path / "test.srt"
+        srt_file.write_bytes(
+            "\ufeff1\r\n00:00:01,500 --> 00:00:03,000\r\n你好\r\n世界\r\n\r\n"
+            "2\r\n01:00:00,000 --> 01:00:02,050\r\nbye\r\n".encode('utf-8')
+        )
+
+        segments = SubtitleGenerator({}).load_from_srt(str(srt_file))
+
+        assert len(segments) == 2
+        assert segments[0].index == 1
+        assert segments[0].start_time == pytest.approx(1.5)
+        assert segments[0].end_time == pytest.approx(3.0)
+        assert segments[0].text == "你好\n世界"
+        assert segments[1].start_time == pytest.approx(3600.0)
+        assert segments[1].end_time == pytest.approx(3602.05)
+        assert segments[1].text == "bye"
+
+    def test_load_empty_file(self, tmp_path):
+        """测试空文件"""
+        srt_file = tmp_path / "empty.srt"
+        srt_file.write_bytes(b"")
+
+        assert SubtitleGenerator({}).load_from_srt(str(srt_file)) == []
+
+    def test_empty_cue_does_not_swallow_next(self, tmp_path):
+        """测试文本为空的字幕不会吞掉下一条，结果与 pysrt 一致"""
+        import pysrt
+
+        srt_file = tmp_path / "empty_cue.srt"
+        srt_file.write_text(
+            "1\n00:00:01,000 --> 00:00:02,000\n\n"
+            "2\n00:00:03,000 --> 00:00:04,000\nhello\n\n"
+            "3\n00:00:05,000 --> 00:00:06,000\nworld\n",
+            encoding='utf-8'
+        )
+
+        segments = SubtitleGenerator({}).load_from_srt(str(srt_file))
+
+        assert [(s.index, s.text) for s in segments] == [(1, ""), (2, "hello"), (3, "world")]
+        assert [s.text for s in segments] == [item.text for item in pysrt.open(str(srt_file))]
+
+    def test_malformed_cue_skipped_with_warning(self, tmp_path, caplog):
+        """测试格式错误的字幕块被跳过并记录警告，不影响其余字幕"""
+        srt_file = tmp_path / "malformed.srt"
+        srt_file.write_text(
+            "1\n00:00:01,000 --> 00:00:02,000\nfirst\n\n"
+            "oops\nno timing here\n\n\n"
+            "3\n00:00:05,000 --> 00:00:06,000\nlast\n",
+            encoding='utf-8'
+        )
+
+        with caplog.at_level("WARNING"):
+            segments = SubtitleGenerator({}).load_from_srt(str(srt_file))
+
+        assert [(s.index, s.text) for s in segments] == [(1, "first"), (3, "last")]
+        assert "oops" in caplog.text
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
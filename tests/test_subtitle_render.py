@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+测试字幕渲染器
+"""
+
+import copy
+import json
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from src.subtitle import subtitle_render
+from src.subtitle.font_manager import FontManager
+from src.subtitle.subtitle_render import SubtitleRenderer
+from src.subtitle.subtitle_gen import SubtitleSegment
+
+
+VIDEO_SIZE = (640, 360)
+FONT_PATH = Path(__file__).parent.parent / "assets" / "fonts" / "NotoSansCJKsc-Regular.otf"
+
+
+class FakeVideo:
+    """只提供尺寸和时长的视频片段替身"""
+
+    size = VIDEO_SIZE
+    duration = 8.0
+
+
+RENDERER_CONFIG = {
+    'enabled': True,
+    'font_path': str(FONT_PATH),
+    'font_size': 36,
+    'stroke_width': 2,
+    'position': 'bottom',
+    'margin_bottom': 40,
+    'video_width': VIDEO_SIZE[0],
+    'video_height': VIDEO_SIZE[1]
+}
+
+
+@pytest.fixture(autouse=True)
+def font_choice_cache(tmp_path, monkeypatch):
+    """字体选择缓存写入临时目录"""
+    cache_file = tmp_path / "font_choice.json"
+    monkeypatch.setattr(subtitle_render, 'FONT_CHOICE_CACHE_FILE', cache_file)
+    return cache_file
+
+
+@pytest.fixture
+def renderer():
+    """创建测试用字幕渲染器"""
+    return SubtitleRenderer(dict(RENDERER_CONFIG))
+
+
+@pytest.fixture
+def background():
+    """随机背景帧"""
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, (VIDEO_SIZE[1], VIDEO_SIZE[0], 3), dtype=np.uint8)
+
+
+class TestSubtitleOverlay:
+    """测试逐帧字幕叠加"""
+
+    def test_overlay_matches_full_frame_composite(self, renderer, background):
+        """测试叠加结果与整帧 alpha 合成一致"""
+        segments = [
+            SubtitleSegment("你好世界", 1.0, 2.0, 1),
+            SubtitleSegment("第二句 hello", 2.5, 4.0, 2),
+        ]
+        overlay = renderer._build_subtitle_overlay(segments, FakeVideo())
+
+        for t, text in [(1.5, "你好世界"), (3.0, "第二句 hello")]:
+            frame = np.asarray(overlay(lambda _: background.copy(), t))
+
+            expected = Image.fromarray(background).convert('RGBA')
+            expected.alpha_composite(renderer.create_subtitle_image(text, VIDEO_SIZE))
+            expected = np.asarray(expected.convert('RGB'))
+
+            assert np.abs(frame.astype(int) - expected.astype(int)).max() <= 1
+
+    def test_frames_without_subtitle_unchanged(self, renderer, background):
+        """测试无字幕时间点的帧保持不变"""
+        segments = [SubtitleSegment("你好世界", 1.0, 2.0, 1)]
+        overlay = renderer._build_subtitle_overlay(segments, FakeVideo())
+
+        for t in (0.0, 0.99, 2.0, 7.5):
+            assert np.array_equal(overlay(lambda _: background, t), background)
+
+    def test_overlapping_segments_all_drawn(self, renderer, background):
+        """测试时间重叠的字幕都会被绘制，包括先开始后结束的长字幕"""
+        segments = [
+            SubtitleSegment("长字幕", 0.0, 5.0, 1),
+            SubtitleSegment("短", 1.0, 2.0, 2),
+        ]
+        overlay = renderer._build_subtitle_overlay(segments, FakeVideo())
+
+        expected = Image.fromarray(background).convert('RGBA')
+        expected.alpha_composite(renderer.create_subtitle_image("长字幕", VIDEO_SIZE))
+        expected.alpha_composite(renderer.create_subtitle_image("短", VIDEO_SIZE))
+        expected = np.asarray(expected.convert('RGB'))
+        frame = np.asarray(overlay(lambda _: background.copy(), 1.5))
+        assert np.abs(frame.astype(int) - expected.astype(int)).max() <= 1
+
+        # 短字幕结束后，长字幕仍然显示
+        frame = overlay(lambda _: background, 3.0)
+        assert not np.array_equal(frame, background)
+
+    @pytest.mark.parametrize("align", ["left", "right", "center"])
+    def test_sprite_follows_align(self, align):
+        """测试字幕按对齐方式定位，与 _calculate_position 一致"""
+        renderer = SubtitleRenderer(dict(RENDERER_CONFIG, align=align))
+        segments = [SubtitleSegment("你好世界", 1.0, 2.0, 1)]
+
+        sprite, (x, y) = renderer._render_subtitle_sprite("你好世界", VIDEO_SIZE)
+        expected_x, expected_y = renderer._calculate_position(sprite.size, VIDEO_SIZE)
+        if expected_x == 'center':
+            expected_x = (VIDEO_SIZE[0] - sprite.width) // 2
+        assert (x, y) == (round(expected_x), expected_y)
+
+        # 叠加后字幕像素落在对齐位置的包围盒内
+        background = np.zeros((VIDEO_SIZE[1], VIDEO_SIZE[0], 3), dtype=np.uint8)
+        frame = renderer._build_subtitle_overlay(segments, FakeVideo())(lambda _: background, 1.5)
+        columns = np.flatnonzero(frame.any(axis=(0, 2)))
+        assert x <= columns[0] and columns[-1] < x + sprite.width
+        if align == 'left':
+            assert columns[0] < VIDEO_SIZE[0] // 4
+        elif align == 'right':
+            assert columns[-1] > VIDEO_SIZE[0] * 3 // 4
+
+    def test_no_valid_segments(self, renderer):
+        """测试没有可用字幕时返回 None"""
+        segments = [SubtitleSegment("   ", 0.0, 1.0, 1), SubtitleSegment("空", 2.0, 2.0, 2)]
+        assert renderer._build_subtitle_overlay(segments, FakeVideo()) is None
+
+
+class TestPrepareSegments:
+    """测试字幕片段预处理"""
+
+    def test_filters_and_sorts(self, renderer):
+        """测试丢弃空文本和零时长片段，并按开始时间排序"""
+        segments = [
+            SubtitleSegment("第二句", 3.0, 4.0, 2),
+            SubtitleSegment("  ", 1.0, 2.0, 3),
+            SubtitleSegment("零时长", 5.0, 5.0, 4),
+            SubtitleSegment("第一句\n换行", 0.5, 1.0, 1),
+        ]
+
+        prepared = renderer._prepare_segments(segments)
+
+        assert [text for _, text in prepared] == ["第一句 换行", "第二句"]
+        assert [segment.index for segment, _ in prepared] == [1, 2]
+
+    def test_drops_segments_after_video_end(self, renderer):
+        """测试丢弃在视频结束后才开始的片段"""
+        segments = [
+            SubtitleSegment("视频内", 7.0, 9.0, 1),
+            SubtitleSegment("视频外", 8.0, 9.0, 2),
+        ]
+
+        prepared = renderer._prepare_segments(segments, video_duration=8.0)
+
+        assert [text for _, text in prepared] == ["视频内"]
+
+
+class TestWrapText:
+    """测试按像素宽度折行"""
+
+    def test_ascii_wraps_on_spaces(self, renderer):
+        """测试英文只在空格处换行"""
+        font = renderer._pil_font
+        max_px = int(font.getlength("quick brown"))
+        wrapped = renderer._wrap_text("the quick brown fox jumps", font, max_px)
+
+        for line in wrapped.split("\n"):
+            assert font.getlength(line) <= max_px
+        assert wrapped.replace("\n", " ") == "the quick brown fox jumps"
+
+    def test_cjk_wraps_on_any_char(self, renderer):
+        """测试中文可在任意字符处换行"""
+        font = renderer._pil_font
+        text = "这是一段很长很长的字幕文本需要折行显示"
+        max_px = int(font.getlength("这是一段很"))
+        wrapped = renderer._wrap_text(text, font, max_px)
+
+        assert wrapped.replace("\n", "") == text
+        assert all(font.getlength(line) <= max_px for line in wrapped.split("\n"))
+
+    def test_long_word_split_by_char(self, renderer):
+        """测试超长单词按字符拆分"""
+        font = renderer._pil_font
+        word = "supercalifragilisticexpialidocious"
+        max_px = int(font.getlength("supercali"))
+        wrapped = renderer._wrap_text(word, font, max_px)
+
+        assert wrapped.replace("\n", "") == word
+        assert all(font.getlength(line) <= max_px for line in wrapped.split("\n"))
+
+
+class TestCleanSubtitleText:
+    """测试字幕文本清理"""
+
+    def test_removes_unprintable_chars(self, renderer):
+        """测试移除不可见字符并合并空白"""
+        assert renderer._clean_subtitle_text("你好​世界\x07\n\tHello  ") == "你好世界 Hello"
+
+    def test_printable_text_unchanged(self, renderer):
+        """测试可打印文本保持不变"""
+        assert renderer._clean_subtitle_text("今天天气很好，Hello！") == "今天天气很好，Hello！"
+
+
+class TestGlyphCache:
+    """测试字形缓存拼合"""
+
+    @pytest.mark.parametrize("text", ["今天天气很好我们去公园吧", "AVA WAW To.", "gjpqy Hello，世界！"])
+    def test_matches_direct_draw(self, renderer, monkeypatch, text):
+        """测试字形拼合结果与整串绘制一致"""
+        sprite, offset = renderer._render_subtitle_sprite(text, VIDEO_SIZE)
+
+        monkeypatch.setattr(SubtitleRenderer, '_can_use_glyph_cache', staticmethod(lambda font: False))
+        expected, expected_offset = renderer._render_subtitle_sprite(text, VIDEO_SIZE)
+
+        assert sprite.size == expected.size
+        assert offset == expected_offset
+        diff = np.abs(np.asarray(sprite).astype(int) - np.asarray(expected).astype(int))
+        # 描边边缘的抗锯齿允许个别像素有细微差异
+        assert (diff.max(axis=2) > 16).mean() < 0.001
+
+    @pytest.mark.parametrize("stroke_color, font_color, stroke_width", [
+        ('black', 'white', 2),
+        ('#1e3cc8', '#fac80a', 3),
+        ('red', '#00ff0080', 2),
+        ('black', 'yellow', 0),
+    ])
+    def test_colorize_matches_paste(self, renderer, stroke_color, font_color, stroke_width):
+        """测试遮罩着色与依次两次 Image.paste 逐像素一致"""
+        renderer.stroke_color = stroke_color
+        renderer.font_color = font_color
+        renderer.stroke_width = stroke_width
+        stroke_mask, fill_mask = renderer._compose_glyph_masks("描边 Stroke", renderer._pil_font)
+
+        expected = Image.new('RGBA', (fill_mask.shape[1], fill_mask.shape[0]), (0, 0, 0, 0))
+        if stroke_width:
+            expected.paste(stroke_color, (0, 0), Image.fromarray(stroke_mask))
+        expected.paste(font_color, (0, 0), Image.fromarray(fill_mask))
+
+        sprite = renderer._colorize_masks(stroke_mask, fill_mask)
+        assert np.array_equal(np.asarray(sprite), np.asarray(expected))
+
+    def test_glyphs_rendered_once(self, renderer):
+        """测试重复字符只渲染一次"""
+        renderer._render_subtitle_sprite("你好你好", VIDEO_SIZE)
+        renderer._render_subtitle_sprite("好你", VIDEO_SIZE)
+
+        assert len(renderer._glyph_cache) == 2
+
+    def test_multiline_text_keeps_line_breaks(self, renderer):
+        """测试多行文本逐行绘制，换行符不作为字形拼合"""
+        single, _ = renderer._render_subtitle_sprite("第一行", VIDEO_SIZE)
+        multiline, _ = renderer._render_subtitle_sprite("第一行\n第二行", VIDEO_SIZE)
+
+        expected = Image.new('RGBA', VIDEO_SIZE, (0, 0, 0, 0))
+        ImageDraw.Draw(expected).multiline_text(
+            (0, 0), "第一行\n第二行", font=renderer._pil_font,
+            stroke_width=renderer.stroke_width, fill='white', stroke_fill='black'
+        )
+        expected_bbox = expected.getchannel('A').getbbox()
+
+        assert multiline.height > single.height * 1.8
+        ink_bbox = multiline.getchannel('A').getbbox()
+        assert (ink_bbox[2] - ink_bbox[0], ink_bbox[3] - ink_bbox[1]) == (
+            expected_bbox[2] - expected_bbox[0], expected_bbox[3] - expected_bbox[1]
+        )
+        assert "\n" not in [key[-1] for key in renderer._glyph_cache._data]
+
+    def test_glyph_cache_bounded(self, renderer):
+        """测试字形缓存超出容量时淘汰最久未用的字形"""
+        renderer._glyph_cache.maxsize = 3
+        renderer._render_subtitle_sprite("一二三", VIDEO_SIZE)
+        renderer._render_subtitle_sprite("一四", VIDEO_SIZE)
+
+        assert [key[-1] for key in renderer._glyph_cache._data] == ["三", "一", "四"]
+
+
+class TestAnimationTable:
+    """测试动画查找表"""
+
+    def test_matches_curve_at_frame_times(self):
+        """测试查找表在帧时间点的取值与原公式一致"""
+        fps = 24
+        table = SubtitleRenderer._build_animation_table(lambda p: 0.5 + 0.5 * p, 0.3, fps)
+
+        for frame in range(30):
+            t = frame / fps
+            value = table[min(int(t * fps + 0.5), len(table) - 1)]
+            assert value == pytest.approx(0.5 + 0.5 * min(t / 0.3, 1.0))
+
+        assert table[-1] == pytest.approx(1.0)
+
+
+class TestFontChoiceCache:
+    """测试字体选择缓存"""
+
+    def test_second_init_skips_font_probe(self, font_choice_cache, monkeypatch):
+        """测试相同配置再次初始化时不再逐个验证候选字体"""
+        first = SubtitleRenderer(dict(RENDERER_CONFIG))
+        assert font_choice_cache.exists()
+
+        def fail(*args, **kwargs):
+            raise AssertionError("不应再次验证候选字体")
+
+        monkeypatch.setattr(FontManager, 'get_best_font', fail)
+        second = SubtitleRenderer(dict(RENDERER_CONFIG))
+
+        assert second.font == first.font
+
+    def test_missing_cached_font_probes_again(self, font_choice_cache):
+        """测试缓存的字体文件不存在时重新选择"""
+        first = SubtitleRenderer(dict(RENDERER_CONFIG))
+        cache = {key: "/nonexistent/font.ttf" for key in json.loads(font_choice_cache.read_text())}
+        font_choice_cache.write_text(json.dumps(cache))
+
+        second = SubtitleRenderer(dict(RENDERER_CONFIG))
+
+        assert second.font == first.font
+
+
+class TestAssExport:
+    """测试 ASS 字幕导出"""
+
+    def test_write_ass_file(self, renderer, tmp_path):
+        """测试导出的事件按时间排序，并过滤空字幕和覆盖标记"""
+        segments = [
+            SubtitleSegment("第二句 {\\b1}", 2.5, 4.0, 2),
+            SubtitleSegment("你好世界", 1.0, 2.0, 1),
+            SubtitleSegment("   ", 4.0, 5.0, 3),
+        ]
+        ass_path = tmp_path / "subs.ass"
+
+        count = renderer._write_ass_file(segments, ass_path, VIDEO_SIZE)
+
+        content = ass_path.read_text(encoding='utf-8')
+        dialogues = [line for line in content.splitlines() if line.startswith("Dialogue:")]
+        assert count == 2
+        assert dialogues[0] == "Dialogue: 0,0:00:01.00,0:00:02.00,Default,,0,0,0,,你好世界"
+        assert dialogues[1].endswith(",,第二句 ｛＼b1｝")
+        assert f"PlayResX: {VIDEO_SIZE[0]}" in content
+        # 白字黑边，底部居中
+        assert ",&H00FFFFFF,&H00FFFFFF,&H00000000," in content
+        assert ",1,2,0,2,32,32,40,1" in content
+
+    def test_format_ass_time(self):
+        """测试 ASS 时间戳格式"""
+        assert SubtitleRenderer._format_ass_time(3723.456) == "1:02:03.46"
+        assert SubtitleRenderer._format_ass_time(0.0) == "0:00:00.00"
+
+    def test_escape_filter_value(self):
+        """测试滤镜参数两级转义"""
+        assert SubtitleRenderer._escape_filter_value("C:\\subs\\a,b.ass") == "C\\\\\\:/subs/a\\,b.ass"
+
+
+
+class TestFfmpegBurn:
+    """测试 FFmpeg 烧录字幕"""
+
+    def create_file_clip(self, tmp_path):
+        """构造未经处理的 VideoFileClip"""
+        source = tmp_path / "source.mp4"
+        source.write_bytes(b"")
+        reader = Mock(size=VIDEO_SIZE, duration=8.0)
+        reader.get_frame.return_value = np.zeros((VIDEO_SIZE[1], VIDEO_SIZE[0], 3), dtype=np.uint8)
+        # 跳过构造函数，只设置烧录判断用到的属性
+        clip = subtitle_render.VideoFileClip.__new__(subtitle_render.VideoFileClip)
+        vars(clip).update(filename=str(source), reader=reader, size=VIDEO_SIZE, duration=8.0, audio=None)
+
+        def make_frame(t):
+            return clip.reader.get_frame(t)
+
+        # 与 VideoFileClip 构造函数中定义的取帧函数同属一个模块
+        make_frame.__module__ = subtitle_render.VideoFileClip.__module__
+        clip.make_frame = make_frame
+        return clip
+
+    def test_only_untouched_file_clip_burned(self, tmp_path):
+        """测试经过逐帧处理的派生片段不走 FFmpeg 烧录"""
+        renderer = SubtitleRenderer(dict(RENDERER_CONFIG, ffmpeg_burn=True))
+        clip = self.create_file_clip(tmp_path)
+        derived = copy.copy(clip)
+        derived.make_frame = lambda t: 255 - clip.make_frame(t)
+
+        with patch.object(subtitle_render.shutil, 'which', return_value='/usr/bin/ffmpeg'):
+            assert renderer._can_burn_with_ffmpeg(clip)
+            assert not renderer._can_burn_with_ffmpeg(derived)
+            assert not renderer._can_burn_with_ffmpeg(FakeVideo())
+
+    def test_temp_output_removed_on_close(self, tmp_path):
+        """测试烧录输出的临时文件在片段关闭时删除"""
+        renderer = SubtitleRenderer(dict(RENDERER_CONFIG))
+        clip = self.create_file_clip(tmp_path)
+
+        with patch.object(renderer, 'render_via_ffmpeg', return_value=True) as render, \
+                patch.object(subtitle_render, 'VideoFileClip') as video_file_clip:
+            original_close = video_file_clip.return_value.close
+            burned = renderer._burn_clip_with_ffmpeg(clip, [])
+
+        output_path = render.call_args.args[2]
+        assert Path(output_path).exists()
+
+        burned.close()
+
+        original_close.assert_called_once()
+        assert not Path(output_path).exists()
+
+    @pytest.mark.parametrize("config, expected", [
+        ({}, ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '18']),
+        ({'ffmpeg_codec': 'libx265', 'ffmpeg_preset': 'slow', 'ffmpeg_crf': 23},
+         ['-c:v', 'libx265', '-preset', 'slow', '-crf', '23']),
+        ({'ffmpeg_codec': 'h264_nvenc', 'ffmpeg_bitrate': '5000k'}, ['-c:v', 'h264_nvenc', '-b:v', '5000k']),
+    ])
+    def test_encoder_args_follow_config(self, config, expected):
+        """测试烧录时的编码器和质量参数来自配置"""
+        renderer = SubtitleRenderer(dict(RENDERER_CONFIG, **config))
+
+        assert renderer._ffmpeg_encoder_args() == expected
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
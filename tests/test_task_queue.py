@@ -0,0 +1,216 @@
+"""
+测试任务队列
+"""
+
+import json
+import threading
+import tasks.task_queue as task_queue_module
+from tasks.task_queue import TaskQueue, VideoTask, TaskStatus
+
+
+class TestTaskQueuePersistence:
+    """测试任务队列持久化"""
+
+    def test_immediate_save_roundtrip(self, tmp_path):
+        """测试默认模式下每次变更立即写入并可重新加载"""
+        path = tmp_path / "tasks.json"
+        queue = TaskQueue(str(path))
+        queue.add_task(VideoTask(task_id="task_0", script_text="脚本"))
+        queue.update_task_status("task_0", TaskStatus.COMPLETED, result={'output_path': 'a.mp4'})
+
+        loaded = TaskQueue(str(path))
+
+        assert loaded.get_task("task_0").status == TaskStatus.COMPLETED
+        assert loaded.get_task("task_0").result == {'output_path': 'a.mp4'}
+        assert not (tmp_path / "tasks.json.tmp").exists()
+
+    def test_deferred_writes_coalesce(self, tmp_path, monkeypatch):
+        """测试延迟写入模式下多次变更合并为一次写入"""
+        path = tmp_path / "tasks.json"
+        queue = TaskQueue(str(path), flush_interval=60)
+
+        writes = []
+        original = queue._write_snapshot
+        monkeypatch.setattr(queue, '_write_snapshot', lambda: (writes.append(1), original()))
+
+        for i in range(10):
+            queue.add_task(VideoTask(task_id=f"task_{i}", script_text=f"脚本{i}"))
+            queue.update_task_status(f"task_{i}", TaskStatus.PROCESSING)
+
+        assert writes == []
+        assert not path.exists()
+
+        queue.flush()
+        queue.flush()
+
+        assert len(writes) == 1
+        data = json.loads(path.read_text(encoding='utf-8'))
+        assert len(data) == 10
+        assert data["task_9"]["status"] == "processing"
+
+    def test_json_fallback_reads_orjson_file(self, tmp_path, monkeypatch):
+        """测试 orjson 写入的文件可以用标准库 json 读取"""
+        path = tmp_path / "tasks.json"
+        queue = TaskQueue(str(path))
+        queue.add_task(VideoTask(task_id="task_0", script_text="中文脚本"))
+
+        monkeypatch.setattr(task_queue_module, 'ORJSON_AVAILABLE', False)
+        loaded = TaskQueue(str(path))
+
+        assert loaded.get_task("task_0").script_text == "中文脚本"
+
+
+    def test_flush_waits_for_write_in_progress(self, tmp_path, monkeypatch):
+        """测试后台线程正在写入时 flush 等待写入完成后才返回"""
+        path = tmp_path / "tasks.json"
+        queue = TaskQueue(str(path), flush_interval=0)
+        writing = threading.Event()
+        release = threading.Event()
+        original = queue._write_snapshot
+
+        def slow_write():
+            writing.set()
+            release.wait(5)
+            original()
+
+        monkeypatch.setattr(queue, '_write_snapshot', slow_write)
+        queue.add_task(VideoTask(task_id="task_0"))
+        assert writing.wait(5)
+
+        flushed = threading.Event()
+        flusher = threading.Thread(target=lambda: (queue.flush(), flushed.set()))
+        flusher.start()
+        assert not flushed.wait(0.2)
+
+        release.set()
+        flusher.join(5)
+        assert flushed.is_set()
+        assert "task_0" in json.loads(path.read_text(encoding='utf-8'))
+        queue.close()
+
+    def test_close_writes_pending_and_stops_writer(self, tmp_path):
+        """测试 close 写入剩余变更并停止后台写入线程"""
+        path = tmp_path / "tasks.json"
+        queue = TaskQueue(str(path), flush_interval=60)
+        queue.add_task(VideoTask(task_id="task_0"))
+
+        queue.close()
+
+        assert not queue._writer_thread.is_alive()
+        assert "task_0" in json.loads(path.read_text(encoding='utf-8'))
+
+        # 关闭后的变更立即写入
+        queue.update_task_status("task_0", TaskStatus.COMPLETED)
+        assert json.loads(path.read_text(encoding='utf-8'))["task_0"]["status"] == "completed"
+
+class TestTaskQueueStatusIndex:
+    """测试按状态查询任务"""
+
+    def test_index_follows_status_changes(self):
+        """测试状态变更后查询结果和统计保持一致"""
+        queue = TaskQueue()
+        for i in range(4):
+            queue.add_task(VideoTask(task_id=f"task_{i}"))
+
+        queue.update_task_status("task_1", TaskStatus.PROCESSING)
+        queue.update_task_status("task_2", TaskStatus.FAILED, error_message="失败")
+        queue.cancel_task("task_3")
+
+        assert [t.task_id for t in queue.get_pending_tasks()] == ["task_0"]
+        assert [t.task_id for t in queue.get_tasks_by_status(TaskStatus.FAILED)] == ["task_2"]
+        assert queue.get_statistics() == {
+            'total': 4, 'pending': 1, 'processing': 1,
+            'completed': 0, 'failed': 1, 'cancelled': 1
+        }
+
+        assert queue.clear_completed_tasks() == 2
+        assert queue.get_statistics()['total'] == 2
+        assert queue.get_tasks_by_status(TaskStatus.CANCELLED) == []
+
+    def test_index_rebuilt_on_load(self, tmp_path):
+        """测试从文件加载后重建状态索引"""
+        path = tmp_path / "tasks.json"
+        queue = TaskQueue(str(path))
+        queue.add_task(VideoTask(task_id="task_0"))
+        queue.add_task(VideoTask(task_id="task_1"))
+        queue.update_task_status("task_0", TaskStatus.COMPLETED)
+
+        loaded = TaskQueue(str(path))
+
+        assert [t.task_id for t in loaded.get_pending_tasks()] == ["task_1"]
+        assert loaded.get_statistics()['completed'] == 1
+
+    def test_re_adding_task_replaces_index_entry(self):
+        """测试重复添加同一任务ID时不会残留旧状态"""
+        queue = TaskQueue()
+        queue.add_task(VideoTask(task_id="task_0"))
+        queue.update_task_status("task_0", TaskStatus.FAILED)
+        queue.add_task(VideoTask(task_id="task_0"))
+
+        assert queue.get_statistics()['failed'] == 0
+        assert len(queue.get_pending_tasks()) == 1
+
+
+class TestTaskQueueShardedPersistence:
+    """测试分片持久化"""
+
+    def test_terminal_tasks_appended_to_archive(self, tmp_path):
+        """测试结束的任务只追加到归档，active.json 只保存未结束的任务"""
+        queue = TaskQueue(persistence_dir=str(tmp_path))
+        for i in range(3):
+            queue.add_task(VideoTask(task_id=f"task_{i}"))
+        queue.update_task_status("task_0", TaskStatus.COMPLETED, result={'output_path': 'a.mp4'})
+        queue.update_task_status("task_1", TaskStatus.PROCESSING)
+
+        active = json.loads((tmp_path / "active.json").read_text(encoding='utf-8'))
+        archive = (tmp_path / "archive.jsonl").read_text(encoding='utf-8').splitlines()
+
+        assert sorted(active) == ["task_1", "task_2"]
+        assert [json.loads(line)["task_id"] for line in archive] == ["task_0"]
+
+        loaded = TaskQueue(persistence_dir=str(tmp_path))
+        assert loaded.get_task("task_0").result == {'output_path': 'a.mp4'}
+        assert loaded.get_statistics() == {
+            'total': 3, 'pending': 1, 'processing': 1,
+            'completed': 1, 'failed': 0, 'cancelled': 0
+        }
+
+    def test_active_record_overrides_archive(self, tmp_path):
+        """测试失败后重新添加的任务以 active.json 中的状态为准"""
+        queue = TaskQueue(persistence_dir=str(tmp_path))
+        queue.add_task(VideoTask(task_id="task_0"))
+        queue.update_task_status("task_0", TaskStatus.FAILED, error_message="失败")
+        queue.add_task(VideoTask(task_id="task_0"))
+
+        loaded = TaskQueue(persistence_dir=str(tmp_path))
+
+        assert loaded.get_task("task_0").status == TaskStatus.PENDING
+        assert loaded.get_statistics()['failed'] == 0
+
+    def test_archive_compaction(self, tmp_path):
+        """测试归档超过阈值或清除任务时重写归档"""
+        queue = TaskQueue(persistence_dir=str(tmp_path), compact_threshold=4)
+        queue.add_task(VideoTask(task_id="task_0"))
+        for _ in range(5):
+            queue.update_task_status("task_0", TaskStatus.FAILED)
+
+        archive_file = tmp_path / "archive.jsonl"
+        assert len(archive_file.read_text(encoding='utf-8').splitlines()) <= 4
+
+        queue.clear_completed_tasks()
+
+        assert archive_file.read_text(encoding='utf-8') == ""
+        assert len(TaskQueue(persistence_dir=str(tmp_path))) == 0
+
+    def test_truncated_archive_line_ignored(self, tmp_path):
+        """测试追加中断留下的不完整行在加载时被跳过"""
+        queue = TaskQueue(persistence_dir=str(tmp_path))
+        queue.add_task(VideoTask(task_id="task_0"))
+        queue.update_task_status("task_0", TaskStatus.COMPLETED)
+        with open(tmp_path / "archive.jsonl", 'a', encoding='utf-8') as f:
+            f.write('{"task_id": "task_1", "sta')
+
+        loaded = TaskQueue(persistence_dir=str(tmp_path))
+
+        assert loaded.get_task("task_0").status == TaskStatus.COMPLETED
+        assert loaded.get_task("task_1") is None
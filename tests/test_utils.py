@@ -0,0 +1,75 @@
+"""
+测试工具函数
+"""
+
+import numpy as np
+from utils import FramePool, get_files_by_extension, sanitize_filename, split_text_by_length
+
+
+class TestFramePool:
+    """测试帧缓冲池"""
+
+    def test_reuses_returned_buffer(self):
+        """测试归还的缓冲区被同尺寸同格式的请求复用"""
+        pool = FramePool()
+        frame = pool.get(64, 32)
+        assert frame.shape == (32, 64, 3)
+        assert frame.dtype == np.uint8
+
+        pool.put(frame)
+
+        assert pool.get(64, 32) is frame
+        assert pool.get(64, 32) is not frame
+
+    def test_formats_do_not_mix(self):
+        """测试不同格式的缓冲区互不复用"""
+        pool = FramePool()
+        rgba = pool.get(8, 8, 'rgba')
+        pool.put(rgba)
+
+        gray = pool.get(8, 8, 'gray')
+        assert gray.shape == (8, 8)
+        assert pool.get(8, 8, 'rgba') is rgba
+
+    def test_limits_and_views(self):
+        """测试池容量上限，且不保留视图"""
+        pool = FramePool(max_buffers=1)
+        first, second = pool.get(4, 4), pool.get(4, 4)
+        pool.put(first[:2])
+        pool.put(first)
+        pool.put(second)
+
+        assert pool.get(4, 4) is first
+        assert pool.get(4, 4) is not second
+
+
+class TestTextUtils:
+    """测试文本工具函数"""
+
+    def test_sanitize_filename(self):
+        """测试移除非法字符、替换空格并限制长度"""
+        assert sanitize_filename('第1集: 标题/副标题 <终版>?') == '第1集_标题副标题_终版'
+        assert len(sanitize_filename('a' * 300)) == 200
+
+    def test_split_text_by_length(self):
+        """测试按最大字符数换行，超长单词单独成行"""
+        text = "the quick brown fox jumps over the lazy dog"
+
+        assert split_text_by_length(text, 10) == ["the quick", "brown fox", "jumps", "over the", "lazy dog"]
+        assert split_text_by_length("a verylongword b", 5) == ["a", "verylongword", "b"]
+        assert split_text_by_length("", 10) == []
+
+
+class TestFileUtils:
+    """测试文件工具函数"""
+
+    def test_get_files_by_extension(self, tmp_path):
+        """测试按扩展名筛选文件，不区分大小写且忽略目录"""
+        for name in ["b.mp4", "a.MP4", "c.Jpg", "d.txt"]:
+            (tmp_path / name).write_bytes(b"")
+        (tmp_path / "clips.mp4").mkdir()
+
+        files = get_files_by_extension(tmp_path, ['.mp4', '.jpg'])
+
+        assert [f.name for f in files] == ["a.MP4", "b.mp4", "c.Jpg"]
+        assert get_files_by_extension(tmp_path / "missing", ['.mp4']) == []
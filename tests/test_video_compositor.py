@@ -0,0 +1,442 @@
+"""
+测试视频合成器
+"""
+
+import io
+import json
+import os
+import numpy as np
+import pytest
+from unittest.mock import Mock, patch
+from PIL import Image
+
+pytest.importorskip("moviepy.editor")
+import video_engine.compositor as compositor_module
+
+
+class TestLanczosResize:
+    """测试缩放效果使用的 Lanczos 内核"""
+
+    @pytest.mark.skipif(not compositor_module.NUMBA_AVAILABLE, reason="需要 numba")
+    @pytest.mark.parametrize("src_size, dst_size", [((106, 60), (128, 72)), ((128, 72), (96, 54)), ((5, 3), (8, 6))])
+    def test_matches_pillow(self, src_size, dst_size):
+        """测试结果与 Pillow LANCZOS 最多相差 1"""
+        rng = np.random.default_rng(0)
+        image = rng.integers(0, 256, (src_size[1], src_size[0], 3), dtype=np.uint8)
+
+        x_starts, x_weights = compositor_module._lanczos_taps(src_size[0], dst_size[0])
+        y_starts, y_weights = compositor_module._lanczos_taps(src_size[1], dst_size[1])
+        resized = compositor_module._resize_separable(image, x_starts, x_weights, y_starts, y_weights)
+
+        expected = np.array(Image.fromarray(image).resize(dst_size, Image.Resampling.LANCZOS))
+        assert resized.shape == expected.shape
+        assert np.abs(resized.astype(int) - expected).max() <= 1
+
+    def test_zoom_cv2_matches_fallback(self, monkeypatch):
+        """测试缩放效果走 cv2.resize 时与 Numba/Pillow Lanczos 结果接近"""
+        if not compositor_module.CV2_AVAILABLE:
+            pytest.skip("需要 OpenCV")
+        from moviepy.editor import VideoClip
+
+        y, x = np.mgrid[:72, :128]
+        frame = np.stack([x * 2, y * 3, (x + y) % 256], axis=-1).astype(np.uint8)
+        clip = VideoClip(lambda t: frame, duration=2.0)
+        with patch.object(compositor_module.VideoCompositor, '_check_videotoolbox_support', return_value=False):
+            compositor = compositor_module.VideoCompositor({'fps': 10, 'resolution': [128, 72]})
+
+        results = {}
+        for use_cv2 in (True, False):
+            monkeypatch.setattr(compositor_module, 'CV2_AVAILABLE', use_cv2)
+            results[use_cv2] = compositor.add_zoom_effect(clip, 1.5, (0.3, 0.6)).get_frame(1.0)
+
+        assert results[True].shape == results[False].shape == frame.shape
+        diff = np.abs(results[True].astype(int) - results[False])
+        assert diff.mean() < 0.5
+        assert diff.max() <= 2
+
+    def test_taps_cached(self):
+        """测试同一尺寸对的权重只计算一次"""
+        compositor_module._lanczos_taps.cache_clear()
+        first = compositor_module._lanczos_taps(1066, 1280)
+        second = compositor_module._lanczos_taps(1066, 1280)
+
+        assert first is second
+        assert np.allclose(first[1].sum(axis=1), 1.0)
+
+
+class TestPrepareImage:
+    """测试幻灯片图片的预处理"""
+
+    @pytest.mark.parametrize("mode, channels", [("RGB", 3), ("RGBA", 4), ("L", 3)])
+    def test_resized_to_resolution(self, tmp_path, mode, channels):
+        """测试各种颜色模式的图片都缩放到目标分辨率，透明通道被保留"""
+        path = tmp_path / "image.png"
+        Image.new(mode, (80, 60)).save(path)
+
+        prepared = compositor_module._prepare_image(str(path), (64, 36))
+
+        assert prepared.shape == (36, 64, channels)
+        assert prepared.dtype == np.uint8
+
+    def test_large_jpeg_matches_full_decode(self, tmp_path):
+        """测试 JPEG 缩小解码后的结果与完整解码再缩放接近"""
+        y, x = np.mgrid[:1200, :1600]
+        pixels = np.stack([x * 255 // 1599, y * 255 // 1199, (x + y) % 256], axis=-1).astype(np.uint8)
+        path = tmp_path / "photo.jpg"
+        Image.fromarray(pixels).save(path, quality=95)
+
+        prepared = compositor_module._prepare_image(str(path), (320, 180))
+
+        expected = np.asarray(Image.open(path).resize((320, 180), Image.Resampling.LANCZOS))
+        assert prepared.shape == expected.shape
+        assert np.abs(prepared.astype(int) - expected).mean() < 3
+
+    def test_cached_until_file_changes(self, tmp_path):
+        """测试同一图片只解码一次，文件被替换后重新解码"""
+        path = tmp_path / "image.png"
+        Image.new("RGB", (80, 60), (255, 0, 0)).save(path)
+
+        first = compositor_module._prepare_image(str(path), (64, 36))
+        second = compositor_module._prepare_image(str(path), [64, 36])
+
+        assert first is second
+        assert not first.flags.writeable
+
+        Image.new("RGB", (80, 60), (0, 0, 255)).save(path)
+        os.utime(path, ns=(0, 12345))
+        third = compositor_module._prepare_image(str(path), (64, 36))
+
+        assert third is not first
+        assert tuple(third[0, 0]) == (0, 0, 255)
+
+    def test_cache_bounded_by_bytes(self, tmp_path, monkeypatch):
+        """测试缓存按像素字节数淘汰最久未用的图片"""
+        image_bytes = 36 * 64 * 3
+        monkeypatch.setattr(compositor_module, 'IMAGE_CACHE_MAX_BYTES', image_bytes * 2)
+        monkeypatch.setattr(compositor_module, '_image_cache', compositor_module.OrderedDict())
+        monkeypatch.setattr(compositor_module, '_image_cache_bytes', 0)
+        paths = []
+        for i in range(3):
+            paths.append(str(tmp_path / f"image{i}.png"))
+            Image.new("RGB", (80, 60), (i, 0, 0)).save(paths[-1])
+
+        first = compositor_module._prepare_image(paths[0], (64, 36))
+        compositor_module._prepare_image(paths[1], (64, 36))
+        assert compositor_module._prepare_image(paths[0], (64, 36)) is first
+        compositor_module._prepare_image(paths[2], (64, 36))
+
+        cached_paths = [key[0] for key in compositor_module._image_cache]
+        assert cached_paths == [paths[0], paths[2]]
+        assert compositor_module._image_cache_bytes == image_bytes * 2
+
+
+    @pytest.mark.parametrize("cpu_count", [1, 4])
+    def test_slideshow_keeps_image_order(self, tmp_path, cpu_count):
+        """测试并行加载图片时幻灯片片段仍按原顺序排列"""
+        colors = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0), (0, 255, 255)]
+        images = []
+        for i, color in enumerate(colors):
+            path = tmp_path / f"slide_{i}.png"
+            Image.new("RGB", (40, 30), color).save(path)
+            images.append(path)
+
+        with patch.object(compositor_module.VideoCompositor, '_check_videotoolbox_support', return_value=False):
+            compositor = compositor_module.VideoCompositor({'resolution': [32, 24]})
+        with patch.object(compositor_module.os, 'cpu_count', return_value=cpu_count), \
+                patch.object(compositor_module, 'concatenate_videoclips') as concatenate:
+            compositor.create_slideshow(images, transition="none")
+
+        clips = concatenate.call_args.args[0]
+        assert [tuple(clip.get_frame(0)[0, 0]) for clip in clips] == colors
+
+class TestEncodingParams:
+    """测试编码参数"""
+
+    def create_compositor(self, **config):
+        """创建不检测硬件编码器的合成器"""
+        with patch.object(compositor_module.VideoCompositor, '_check_videotoolbox_support', return_value=False):
+            return compositor_module.VideoCompositor(config)
+
+    @pytest.mark.parametrize("preset, expected", [("ultrafast", "p1"), ("medium", "p4"), ("veryslow", "p7"), ("unknown", "p4")])
+    def test_nvenc_preset_mapping(self, preset, expected):
+        """测试 libx264 预设换算为 NVENC 预设"""
+        compositor = self.create_compositor()
+
+        for codec in ('h264_nvenc', 'hevc_nvenc'):
+            params = compositor._get_hardware_encoding_params(codec, preset)
+            assert params[params.index('-preset') + 1] == expected
+
+    def test_tune_passed_to_software_encoder(self, tmp_path):
+        """测试配置的 tune 传给 libx264，调用时传入的 tune 优先"""
+        compositor = self.create_compositor(codec='libx264', tune='stillimage')
+        clip = Mock()
+
+        compositor.render_video(clip, str(tmp_path / "a.mp4"), preset="fast")
+        compositor.render_video(clip, str(tmp_path / "b.mp4"), preset="fast", tune="film")
+
+        first, second = [call.kwargs['ffmpeg_params'] for call in clip.write_videofile.call_args_list]
+        assert first == ['-preset', 'fast', '-tune', 'stillimage']
+        assert second == ['-preset', 'fast', '-tune', 'film']
+
+
+    def test_x264_params_and_threads(self, tmp_path):
+        """测试 x264 参数和线程数只传给 libx264"""
+        compositor = self.create_compositor(codec='libx264', x264_params='scenecut=0', threads=6)
+        clip = Mock()
+
+        compositor.render_video(clip, str(tmp_path / "a.mp4"), preset="fast")
+        compositor.render_video(clip, str(tmp_path / "b.mp4"), x264_params='keyint=250', threads=2)
+
+        first, second = clip.write_videofile.call_args_list
+        assert first.kwargs['ffmpeg_params'] == ['-preset', 'fast', '-x264-params', 'scenecut=0']
+        assert first.kwargs['threads'] == 6
+        assert second.kwargs['ffmpeg_params'][-2:] == ['-x264-params', 'keyint=250']
+        assert second.kwargs['threads'] == 2
+
+        compositor = self.create_compositor(codec='libx265', x264_params='scenecut=0')
+        compositor.render_video(clip, str(tmp_path / "c.mp4"))
+        assert '-x264-params' not in clip.write_videofile.call_args.kwargs['ffmpeg_params']
+
+    def test_default_threads_follow_cpu_count(self):
+        """测试未配置线程数时按 CPU 核数取 4-16"""
+        for cpu_count, expected in [(None, 4), (2, 4), (8, 8), (64, 16)]:
+            with patch.object(compositor_module.os, 'cpu_count', return_value=cpu_count):
+                assert self.create_compositor().threads == expected
+
+class TestRenderToBytes:
+    """测试内存渲染"""
+
+    def test_bytes_io_output(self):
+        """测试输出到 BytesIO 时生成可解码的 MP4"""
+        av = pytest.importorskip("av")
+        from moviepy.editor import ColorClip
+
+        with patch.object(compositor_module.VideoCompositor, '_check_videotoolbox_support', return_value=False):
+            compositor = compositor_module.VideoCompositor({'fps': 10, 'resolution': [64, 48]})
+        clip = ColorClip(size=(64, 48), color=(255, 0, 0), duration=1.0)
+
+        buffer = io.BytesIO()
+        result = compositor.render_video(clip, buffer)
+
+        assert result is buffer
+        with av.open(io.BytesIO(buffer.getvalue())) as container:
+            frames = list(container.decode(video=0))
+        assert len(frames) == 10
+        assert (frames[0].width, frames[0].height) == (64, 48)
+
+    def test_bytes_io_encodes_into_buffer_with_config(self):
+        """测试输出到 BytesIO 时直接编码进调用方缓冲区，并沿用编码配置"""
+        with patch.object(compositor_module.VideoCompositor, '_check_videotoolbox_support', return_value=False):
+            compositor = compositor_module.VideoCompositor({
+                'codec': 'libx264', 'bitrate': '3000k', 'tune': 'stillimage', 'threads': 2
+            })
+        clip = Mock()
+        buffer = io.BytesIO()
+
+        with patch.object(compositor, '_encode_with_av') as encode, \
+                patch.object(compositor, 'render_to_bytes') as render_to_bytes:
+            compositor.render_video(clip, buffer, preset="fast", x264_params="keyint=250")
+
+        render_to_bytes.assert_not_called()
+        assert encode.call_args.args[:3] == (clip, buffer, "fast")
+        assert encode.call_args.kwargs == {
+            'codec': 'libx264', 'bitrate': '3000k', 'tune': 'stillimage',
+            'x264_params': 'keyint=250', 'threads': 2
+        }
+        clip.close.assert_called_once()
+
+    def test_render_to_bytes_goes_through_render_video(self):
+        """测试 render_to_bytes 与 render_video 输出到 BytesIO 走同一条编码路径"""
+        with patch.object(compositor_module.VideoCompositor, '_check_videotoolbox_support', return_value=False):
+            compositor = compositor_module.VideoCompositor({'bitrate': '3000k'})
+        clip = Mock()
+
+        def encode(video_clip, target, *args, **kwargs):
+            target.write(b"mp4")
+
+        with patch.object(compositor, '_encode_with_av', side_effect=encode) as encode_with_av:
+            data = compositor.render_to_bytes(clip, preset="fast")
+
+        assert data == b"mp4"
+        assert encode_with_av.call_args.args[2] == "fast"
+        assert encode_with_av.call_args.kwargs['bitrate'] == '3000k'
+
+    def test_bytes_io_falls_back_for_unavailable_codec(self):
+        """测试 PyAV 不支持配置的编码器时内存编码改用 libx264"""
+        pytest.importorskip("av")
+        with patch.object(compositor_module.VideoCompositor, '_check_videotoolbox_support', return_value=False):
+            compositor = compositor_module.VideoCompositor({'codec': 'no_such_encoder'})
+
+        with patch.object(compositor, '_encode_with_av') as encode:
+            compositor.render_video(Mock(), io.BytesIO())
+
+        assert encode.call_args.kwargs['codec'] == 'libx264'
+
+    def test_render_stream_uses_encoder_config(self, tmp_path):
+        """测试直接编码到文件时与内存编码使用同样的编码配置"""
+        with patch.object(compositor_module.VideoCompositor, '_check_videotoolbox_support', return_value=False):
+            compositor = compositor_module.VideoCompositor({
+                'codec': 'libx264', 'bitrate': '3000k', 'tune': 'film', 'x264_params': 'keyint=60', 'threads': 3
+            })
+        output = str(tmp_path / "video.mp4")
+
+        with patch.object(compositor, '_encode_with_av') as encode:
+            compositor.render_stream(Mock(), output, preset="fast")
+
+        assert encode.call_args.args[1:3] == (output, "fast")
+        assert encode.call_args.kwargs == {
+            'codec': 'libx264', 'bitrate': '3000k', 'tune': 'film', 'x264_params': 'keyint=60', 'threads': 3
+        }
+
+    def test_render_stream_bitrate_reaches_stream(self, tmp_path):
+        """测试配置的码率写入 PyAV 视频流"""
+        av = pytest.importorskip("av")
+        from moviepy.editor import ColorClip
+
+        with patch.object(compositor_module.VideoCompositor, '_check_videotoolbox_support', return_value=False):
+            compositor = compositor_module.VideoCompositor({'fps': 10, 'resolution': [64, 48], 'bitrate': '300k'})
+        clip = ColorClip(size=(64, 48), color=(255, 0, 0), duration=1.0)
+
+        added_streams = []
+        add_stream = av.container.OutputContainer.add_stream
+
+        def record_add_stream(container, *args, **kwargs):
+            stream = add_stream(container, *args, **kwargs)
+            added_streams.append(stream)
+            return stream
+
+        with patch.object(av.container.OutputContainer, 'add_stream', record_add_stream):
+            compositor.render_stream(clip, str(tmp_path / "video.mp4"), preset="ultrafast")
+
+        assert added_streams[0].codec_context.name == 'libx264'
+        assert added_streams[0].bit_rate == 300000
+        assert 'crf' not in added_streams[0].options
+
+    @pytest.mark.parametrize("bitrate, expected", [("5000k", 5000000), ("8M", 8000000), ("1.5m", 1500000), (64000, 64000)])
+    def test_parse_bitrate(self, bitrate, expected):
+        """测试 FFmpeg 风格码率的解析"""
+        assert compositor_module._parse_bitrate(bitrate) == expected
+
+    def test_render_stream_to_file(self, tmp_path):
+        """测试直接编码到文件时帧内容和帧数正确"""
+        av = pytest.importorskip("av")
+        from moviepy.editor import ColorClip
+
+        with patch.object(compositor_module.VideoCompositor, '_check_videotoolbox_support', return_value=False):
+            compositor = compositor_module.VideoCompositor({'fps': 10, 'resolution': [64, 48]})
+        clip = ColorClip(size=(64, 48), color=(255, 0, 0), duration=1.0)
+
+        output = compositor.render_stream(clip, str(tmp_path / "out" / "video.mp4"), preset="ultrafast")
+
+        with av.open(str(output)) as container:
+            frames = list(container.decode(video=0))
+        assert len(frames) == 10
+        pixel = frames[0].to_ndarray(format='rgb24')[24, 32].astype(int)
+        assert np.abs(pixel - [255, 0, 0]).max() <= 8
+
+
+class TestCreateVideoFromClips:
+    """测试片段拼接"""
+
+    @pytest.mark.parametrize("transition, method", [("cut", None), ("none", None), ("fade", "compose")])
+    def test_compose_only_for_fade(self, transition, method):
+        """测试只有淡入淡出转场才使用逐帧合成的拼接方式"""
+        with patch.object(compositor_module.VideoCompositor, '_check_videotoolbox_support', return_value=False):
+            compositor = compositor_module.VideoCompositor({'resolution': [64, 48]})
+        clips = [Mock(size=(64, 48)), Mock(size=(32, 24))]
+
+        with patch.object(compositor_module, 'concatenate_videoclips') as concatenate:
+            compositor.create_video_from_clips(clips, transition=transition)
+
+        assert concatenate.call_args.kwargs.get('method') == method
+
+    def test_skip_resize_for_matching_clips(self):
+        """测试已是目标分辨率的片段不再缩放"""
+        with patch.object(compositor_module.VideoCompositor, '_check_videotoolbox_support', return_value=False):
+            compositor = compositor_module.VideoCompositor({'resolution': [64, 48]})
+        matching = Mock(size=[64, 48])
+        other = Mock(size=(128, 96))
+
+        with patch.object(compositor_module, 'concatenate_videoclips') as concatenate:
+            compositor.create_video_from_clips([matching, other])
+
+        matching.resize.assert_not_called()
+        other.resize.assert_called_once_with((64, 48))
+        assert concatenate.call_args.args[0] == [matching, other.resize.return_value]
+
+
+class TestZoomCropRects:
+    """测试缩放效果的裁剪区域"""
+
+    @pytest.mark.parametrize("zoom_factor, center", [(1.2, (0.5, 0.5)), (1.5, (0.1, 0.9)), (0.8, (0.5, 0.5))])
+    def test_matches_per_frame_formula(self, zoom_factor, center):
+        """测试预先计算的裁剪区域与逐帧计算的结果相同"""
+        w, h, duration, fps = 1920, 1080, 2.5, 30
+        rects = compositor_module._zoom_crop_rects((w, h), duration, fps, zoom_factor, center)
+
+        assert rects.shape == (76, 4)
+        for i, rect in enumerate(rects):
+            current_zoom = 1 + (zoom_factor - 1) * ((i / fps) / duration)
+            cx, cy = int(w * center[0]), int(h * center[1])
+            new_w, new_h = int(w / current_zoom), int(h / current_zoom)
+            x1, y1 = max(0, cx - new_w // 2), max(0, cy - new_h // 2)
+            assert tuple(rect) == (x1, y1, min(w, x1 + new_w), min(h, y1 + new_h))
+
+
+class TestConcatVideoFiles:
+    """测试视频文件拼接"""
+
+    def create_compositor(self):
+        """创建不检测硬件编码器的合成器"""
+        with patch.object(compositor_module.VideoCompositor, '_check_videotoolbox_support', return_value=False):
+            return compositor_module.VideoCompositor({'resolution': [64, 48]})
+
+    def probe_output(self, width):
+        """构造 ffprobe 的 JSON 输出"""
+        streams = [
+            {'codec_type': 'video', 'codec_name': 'h264', 'width': width, 'height': 48,
+             'pix_fmt': 'yuv420p', 'r_frame_rate': '30/1'},
+            {'codec_type': 'audio', 'codec_name': 'aac', 'sample_rate': '44100', 'channels': 2},
+        ]
+        return Mock(returncode=0, stdout=json.dumps({'streams': streams}))
+
+    def test_matching_streams_copied(self, tmp_path):
+        """测试流参数一致时用 concat 分离器复制码流"""
+        compositor = self.create_compositor()
+        paths = [str(tmp_path / "a.mp4"), str(tmp_path / "it's.mp4")]
+        concat_lists = []
+
+        def run(cmd, **kwargs):
+            if cmd[0] == 'ffprobe':
+                return self.probe_output(64)
+            concat_lists.append(open(cmd[cmd.index('-i') + 1], encoding='utf-8').read())
+            return Mock(returncode=0)
+
+        with patch.object(compositor_module.subprocess, 'run', side_effect=run) as mock_run, \
+                patch.object(compositor, 'render_video') as render_video:
+            output = compositor.concat_video_files(paths, str(tmp_path / "out" / "final.mp4"))
+
+        ffmpeg_cmd = mock_run.call_args.args[0]
+        assert ffmpeg_cmd[ffmpeg_cmd.index('-c') + 1] == 'copy'
+        root = tmp_path.resolve()
+        assert concat_lists == [f"file '{root}/a.mp4'\nfile '{root}/it'\\''s.mp4'\n"]
+        assert output == tmp_path / "out" / "final.mp4"
+        assert not list((tmp_path / "out").glob("*.concat.txt"))
+        render_video.assert_not_called()
+
+    def test_mismatched_streams_reencoded(self, tmp_path):
+        """测试流参数不一致时回退到重新编码"""
+        compositor = self.create_compositor()
+        probes = [self.probe_output(64), self.probe_output(32)]
+
+        with patch.object(compositor_module.subprocess, 'run', side_effect=probes) as mock_run, \
+                patch('moviepy.editor.VideoFileClip', create=True) as video_file_clip, \
+                patch.object(compositor, 'create_video_from_clips') as create_video, \
+                patch.object(compositor, 'render_video', return_value=tmp_path / "final.mp4") as render_video:
+            output = compositor.concat_video_files(["a.mp4", "b.mp4"], str(tmp_path / "final.mp4"))
+
+        assert mock_run.call_count == 2
+        assert len(create_video.call_args.args[0]) == 2
+        render_video.assert_called_once_with(create_video.return_value, str(tmp_path / "final.mp4"))
+        assert video_file_clip.return_value.close.call_count == 2
+        assert output == tmp_path / "final.mp4"
@@ -0,0 +1,222 @@
+"""
+测试视频效果
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("moviepy.editor")
+from moviepy.editor import ImageClip
+import video_engine.effects as effects_module
+from video_engine.effects import VideoEffects, EffectPipeline
+
+
+def create_clip(frame: np.ndarray) -> ImageClip:
+    """用单帧图像创建 1 秒的视频片段"""
+    return ImageClip(frame).set_duration(1.0)
+
+
+@pytest.fixture
+def frame():
+    """随机 RGB 测试帧"""
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, (36, 64, 3), dtype=np.uint8)
+
+
+class TestBlackAndWhite:
+    """测试黑白效果"""
+
+    @pytest.mark.parametrize("use_numba", [False, True])
+    def test_matches_float_weights(self, frame, use_numba, monkeypatch):
+        """测试定点灰度与浮点权重的结果最多相差 1"""
+        if use_numba and not effects_module.NUMBA_AVAILABLE:
+            pytest.skip("需要 numba")
+        monkeypatch.setattr(effects_module, 'NUMBA_AVAILABLE', use_numba)
+
+        result = VideoEffects.black_and_white(create_clip(frame)).get_frame(0)
+
+        expected = np.dot(frame, [0.299, 0.587, 0.114]).astype(np.uint8)
+        assert result.dtype == np.uint8
+        assert result.shape == frame.shape
+        assert np.array_equal(result[..., 0], result[..., 2])
+        assert np.abs(result[..., 0].astype(int) - expected).max() <= 1
+
+
+class TestVignette:
+    """测试暗角效果"""
+
+    @pytest.mark.parametrize("use_numba", [False, True])
+    def test_matches_float_mask(self, frame, use_numba, monkeypatch):
+        """测试定点蒙版与浮点蒙版的结果最多相差 1，且中心保持原值"""
+        if use_numba and not effects_module.NUMBA_AVAILABLE:
+            pytest.skip("需要 numba")
+        monkeypatch.setattr(effects_module, 'NUMBA_AVAILABLE', use_numba)
+
+        clip = VideoEffects.vignette(create_clip(frame), strength=0.5)
+        result = clip.get_frame(0)
+
+        h, w = frame.shape[:2]
+        Y, X = np.ogrid[:h, :w]
+        dist = np.sqrt((X - w / 2) ** 2 + (Y - h / 2) ** 2)
+        mask = np.clip(1 - dist / np.sqrt((w / 2) ** 2 + (h / 2) ** 2) * 0.5, 0, 1)
+        expected = (frame * mask[:, :, np.newaxis]).astype(np.uint8)
+
+        assert result.dtype == np.uint8
+        assert np.abs(result.astype(int) - expected).max() <= 1
+        assert np.array_equal(clip.get_frame(0.5), result)
+
+
+class TestLookupTableEffects:
+    """测试查找表实现的亮度、对比度和怀旧色调"""
+
+    @pytest.mark.parametrize("use_cv2", [False, True])
+    def test_brightness_matches_arithmetic(self, frame, use_cv2, monkeypatch):
+        """测试亮度查找表与逐像素计算结果相同"""
+        if use_cv2 and not effects_module.CV2_AVAILABLE:
+            pytest.skip("需要 OpenCV")
+        monkeypatch.setattr(effects_module, 'CV2_AVAILABLE', use_cv2)
+
+        result = VideoEffects.adjust_brightness(create_clip(frame), 1.3).get_frame(0)
+
+        assert np.array_equal(result, np.clip(frame * 1.3, 0, 255).astype(np.uint8))
+
+    def test_contrast_close_to_full_mean(self):
+        """测试采样均值下的对比度结果与全帧均值最多相差 1"""
+        rng = np.random.default_rng(0)
+        frame = rng.integers(0, 256, (720, 1280, 3), dtype=np.uint8)
+        result = VideoEffects.adjust_contrast(create_clip(frame), 1.5).get_frame(0)
+
+        mean = frame.mean()
+        expected = np.clip((frame - mean) * 1.5 + mean, 0, 255).astype(np.uint8)
+        assert np.abs(result.astype(int) - expected).max() <= 1
+
+    @pytest.mark.parametrize("use_cv2", [False, True])
+    def test_sepia_matches_matrix(self, frame, use_cv2, monkeypatch):
+        """测试怀旧色调与浮点矩阵变换最多相差 1"""
+        if use_cv2 and not effects_module.CV2_AVAILABLE:
+            pytest.skip("需要 OpenCV")
+        monkeypatch.setattr(effects_module, 'CV2_AVAILABLE', use_cv2)
+
+        result = VideoEffects.sepia(create_clip(frame)).get_frame(0)
+
+        expected = np.clip(frame.dot(effects_module.SEPIA_MATRIX.T.astype(np.float64)), 0, 255).astype(np.uint8)
+        assert result.dtype == np.uint8
+        assert np.abs(result.astype(int) - expected).max() <= 1
+
+
+class TestBlur:
+    """测试模糊效果"""
+
+    @pytest.mark.parametrize("blur_radius", [2, 5])
+    def test_cv2_close_to_pillow(self, frame, blur_radius, monkeypatch):
+        """测试 cv2.GaussianBlur 与 Pillow GaussianBlur 的结果接近"""
+        if not effects_module.CV2_AVAILABLE:
+            pytest.skip("需要 OpenCV")
+
+        results = {}
+        for use_cv2 in (True, False):
+            monkeypatch.setattr(effects_module, 'CV2_AVAILABLE', use_cv2)
+            results[use_cv2] = VideoEffects.blur(create_clip(frame), blur_radius).get_frame(0)
+
+        assert results[True].dtype == np.uint8
+        assert results[True].shape == frame.shape
+        # Pillow 用多次盒式滤波近似高斯，边缘处理也不同，只比较整体和内部区域
+        diff = np.abs(results[True].astype(int) - results[False])
+        border = 3 * blur_radius
+        assert diff.mean() < 2
+        assert diff[border:-border, border:-border].max() <= 4
+
+
+class TestMirror:
+    """测试镜像效果"""
+
+    @pytest.mark.parametrize("use_cv2", [False, True])
+    def test_mirror_contiguous(self, frame, use_cv2, monkeypatch):
+        """测试镜像结果与 numpy 翻转一致且为连续数组"""
+        if use_cv2 and not effects_module.CV2_AVAILABLE:
+            pytest.skip("需要 OpenCV")
+        monkeypatch.setattr(effects_module, 'CV2_AVAILABLE', use_cv2)
+
+        horizontal = VideoEffects.mirror_horizontal(create_clip(frame)).get_frame(0)
+        vertical = VideoEffects.mirror_vertical(create_clip(frame)).get_frame(0)
+
+        assert np.array_equal(horizontal, np.fliplr(frame))
+        assert np.array_equal(vertical, np.flipud(frame))
+        assert horizontal.flags['C_CONTIGUOUS']
+        assert vertical.flags['C_CONTIGUOUS']
+
+
+class TestEffectPipeline:
+    """测试逐像素效果融合流水线"""
+
+    @pytest.mark.parametrize("use_numba", [False, True])
+    def test_matches_sequential_effects(self, frame, use_numba, monkeypatch):
+        """测试融合结果与逐个应用效果完全相同"""
+        if use_numba and not effects_module.NUMBA_AVAILABLE:
+            pytest.skip("需要 numba")
+        monkeypatch.setattr(effects_module, 'NUMBA_AVAILABLE', use_numba)
+        clip = create_clip(frame)
+
+        pipeline = (
+            EffectPipeline()
+            .adjust_brightness(1.2)
+            .adjust_contrast(1.4)
+            .vignette(0.6)
+            .adjust_contrast(0.8)
+            .black_and_white()
+        )
+        expected = VideoEffects.black_and_white(VideoEffects.adjust_contrast(VideoEffects.vignette(
+            VideoEffects.adjust_contrast(VideoEffects.adjust_brightness(clip, 1.2), 1.4), 0.6), 0.8))
+
+        assert np.array_equal(pipeline(clip).get_frame(0), expected.get_frame(0))
+
+    def test_sepia_close_to_sequential(self, frame):
+        """测试包含怀旧色调时与逐个应用效果最多相差 1"""
+        clip = create_clip(frame)
+
+        result = EffectPipeline().adjust_brightness(0.9).sepia()(clip).get_frame(0)
+        expected = VideoEffects.sepia(VideoEffects.adjust_brightness(clip, 0.9)).get_frame(0)
+
+        assert result.dtype == np.uint8
+        assert np.abs(result.astype(int) - expected).max() <= 1
+
+    def test_barrier_and_apply_multiple_effects(self, frame):
+        """测试不可融合的效果作为边界，流水线可作为效果函数传入"""
+        clip = create_clip(frame)
+        pipeline = EffectPipeline().adjust_brightness(1.1).then(VideoEffects.mirror_horizontal).vignette(0.5)
+
+        result = VideoEffects.apply_multiple_effects(clip, [pipeline]).get_frame(0)
+        expected = VideoEffects.vignette(
+            VideoEffects.mirror_horizontal(VideoEffects.adjust_brightness(clip, 1.1)), 0.5
+        ).get_frame(0)
+
+        assert np.array_equal(result, expected)
+
+
+class TestStaticFrameCache:
+    """测试静态画面跳过重复计算"""
+
+    def test_read_only_source_computed_once(self, frame):
+        """测试只读源帧不变时效果链只计算一次"""
+        frame.flags.writeable = False
+        clip = VideoEffects.vignette(VideoEffects.adjust_brightness(create_clip(frame), 1.2), 0.5)
+
+        first = clip.get_frame(0)
+        second = clip.get_frame(0.5)
+
+        assert second is first
+        assert not first.flags.writeable
+
+    def test_writable_source_recomputed(self, frame):
+        """测试可写源帧每次重新计算，原地修改后结果随之变化"""
+        calls = []
+        effect = effects_module._memoize_static_frames(lambda img: (calls.append(1), img + 1)[1])
+        get_frame = lambda t: frame
+
+        first = effect(get_frame, 0)
+        frame[:] = 0
+        second = effect(get_frame, 0.5)
+
+        assert len(calls) == 2
+        assert first.flags.writeable
+        assert np.all(second == 1)